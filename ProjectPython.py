@@ -1,79 +1,85 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, simpledialog, ttk
+import csv
 import json
-import os
-from datetime import datetime, timedelta # Đã thêm timedelta
-import requests
+import logging
 import uuid # Thêm thư viện để tạo ID duy nhất
-import re # Để kiểm tra định dạng ngày và tìm kiếm
-notified_tasks = set()  # Lưu ID task đã thông báo nhắc nhở
-
-
-# --- Cấu hình và Hằng số ---
-DATA_FILE = 'tasks.json'
-API_URL = "https://jsonplaceholder.typicode.com/todos" # API mẫu để lấy dữ liệu
-
-
-
-# --- Hàm quản lý File JSON ---
-def init_data_file():
-    """Khởi tạo file JSON nếu chưa tồn tại hoặc rỗng."""
-    if not os.path.exists(DATA_FILE) or os.path.getsize(DATA_FILE) == 0:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump([], f, ensure_ascii=False, indent=4)
+import atexit # Ghi nốt các thay đổi đang chờ khi thoát
+import queue
+import sqlite3 # Lỗi ghi của kiểu lưu trữ SQLite
+import sys
+import threading # Ghi file lưu trữ trên luồng phụ
+from datetime import date, timedelta
+
+# Toàn bộ phần xử lý dữ liệu nằm trong gói taskmanager (dùng được cả khi không có giao diện)
+from taskmanager import instrument
+from taskmanager.archive import TaskArchive
+from taskmanager.config import ARCHIVE_INTERVAL_MS, HISTORY_PERSIST, INSTRUMENT_DUMP_FILE, INSTRUMENT_DUMP_MS, ROW_HEIGHT, SEARCH_DEBOUNCE_MS, WATCH_INTERVAL_MS
+from taskmanager.history import UndoHistory, describe_step, history_path
+from taskmanager.model import apply_bulk_changes, is_valid_date
+from taskmanager.recurrence import (NO_REPEAT_LABEL, REPEAT_BY_LABEL, REPEAT_LABELS, describe_repeat, make_repeat,
+                                    parse_repeat, roll_forward)
+from taskmanager.reminders import ReminderScheduler
+from taskmanager.repository import TaskConflictError, TaskRepository
+from taskmanager.storage import create_storage, init_data_file
+from taskmanager.sync import ApiImportJob, apply_api_sync, is_request_error, sync_api_tasks
+from taskmanager.tkview import VirtualTaskView, task_row
+from taskmanager.transfer import detect_format, export_tasks, import_tasks
+
+
+# --- Kho dữ liệu ---
+class MessageboxLogHandler(logging.Handler):
+    """Hiện các cảnh báo của phần lõi (ví dụ: khôi phục file hỏng) bằng hộp thoại."""
+
+    def emit(self, record):
+        if record.levelno >= logging.ERROR:
+            messagebox.showerror("Lỗi dữ liệu", record.getMessage())
+        else:
+            messagebox.showwarning("Khôi phục dữ liệu", record.getMessage())
 
-def load_tasks():
-    """Đọc dữ liệu từ file JSON."""
-    init_data_file() # Đảm bảo file tồn tại trước khi đọc
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        messagebox.showerror("Lỗi dữ liệu", "File JSON bị hỏng. Đang tạo lại file mới.")
-        init_data_file() # Tạo lại file nếu JSON bị lỗi
-        return []
+logging.getLogger("taskmanager").addHandler(MessageboxLogHandler(logging.WARNING))
 
-def save_tasks(tasks):
-    """Lưu dữ liệu vào file JSON."""
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(tasks, f, ensure_ascii=False, indent=4)
+if "--instrument" in sys.argv: # Hoặc đặt biến môi trường TASK_INSTRUMENT=1
+    instrument.enable()
+if instrument.enabled:
+    logging.basicConfig(level=logging.INFO) # Ghi thông báo cProfile ra stderr
 
-# --- Hàm kiểm tra và xử lý dữ liệu ---
-def is_valid_date(date_str):
-    """Kiểm tra định dạng ngày dd/mm/yyyy và phải lớn hơn hoặc bằng ngày hiện tại."""
-    if not re.match(r"^\d{2}/\d{2}/\d{4}$", date_str):
-        return False
-    try:
-        input_date = datetime.strptime(date_str, '%d/%m/%Y').date()
-        today = datetime.now().date()
-        return input_date >= today
-    except ValueError:
-        return False
+task_repo = TaskRepository(create_storage(), archive=TaskArchive(), # Công việc hoàn thành từ lâu nằm trong file lưu trữ nén
+                           history=UndoHistory(history_path() if HISTORY_PERSIST else None)) # Hoàn tác/làm lại
+atexit.register(task_repo.flush) # Không để mất các thay đổi còn trong cửa sổ gom ghi
 
 # Hàm sắp xếp Treeview theo cột (click header)
+sort_state = None # (cột, đảo ngược) đang chọn; None = thứ tự mặc định
+
 def treeview_sort_column(tv, col, reverse):
-    """Sắp xếp dữ liệu trong Treeview khi click vào header cột."""
-    l = [(tv.set(k, col), k) for k in tv.get_children('')]
-    
-    # Định nghĩa thứ tự cho độ ưu tiên và trạng thái
-    priority_order = {"Cao": 0, "Thấp": 1}
-    status_order = {"Cần thực hiện": 0, "Đang thực hiện": 1, "Đã hoàn thành": 2}
-
-    if col == 'due_date':
-        # Sắp xếp theo ngày, nếu ngày không hợp lệ sẽ đẩy xuống cuối
-        l.sort(key=lambda t: datetime.strptime(t[0], '%d/%m/%Y') if is_valid_date(t[0]) else datetime.max, reverse=reverse)
-    elif col == 'priority':
-        l.sort(key=lambda t: priority_order.get(t[0], 99), reverse=reverse) # 99 là giá trị mặc định nếu không khớp
-    elif col == 'status':
-        l.sort(key=lambda t: status_order.get(t[0], 99), reverse=reverse)
-    else: # Các cột text khác (title, description)
-        l.sort(key=lambda t: t[0].lower(), reverse=reverse)
-
-    for index, (val, k) in enumerate(l):
-        tv.move(k, '', index)
+    """Sắp xếp danh sách theo cột khi click vào header (sắp xếp trên dữ liệu bằng khóa đã tính sẵn)."""
+    global sort_state
+    sort_state = (col, reverse)
+    refresh_task_list()
     tv.heading(col, command=lambda: treeview_sort_column(tv, col, not reverse)) # Đảo ngược thứ tự cho lần click tiếp theo
 
 # --- Chức năng CRUD ---
+editing_rev = None # Phiên bản (rev) của công việc lúc được chọn để sửa
+
+def read_repeat(existing=None):
+    """Trường "repeat" theo form (None nếu không lặp, False nếu ngày kết thúc không hợp lệ).
+
+    Giữ nguyên quy tắc cũ của công việc (`existing`) nếu form không đổi kiểu lặp
+    và ngày kết thúc (form không hiện khoảng cách/số lần đặt từ dòng lệnh).
+    """
+    freq = REPEAT_BY_LABEL.get(repeat_var.get())
+    if freq is None:
+        return None
+    until = entry_repeat_until.get().strip()
+    if until and not is_valid_date(until):
+        messagebox.showwarning("Cảnh báo", "Ngày kết thúc lặp lại không hợp lệ! Vui lòng nhập đúng định dạng dd/mm/yyyy.")
+        return False
+    old = existing.get("repeat") if existing is not None else None
+    rule = parse_repeat(old)
+    if rule is not None and rule.freq == freq and old.get("until", "") == until:
+        return old
+    return make_repeat(freq, until=until or None)
+
 def add_task():
     """Thêm công việc mới."""
     title = entry_title.get().strip()
@@ -90,6 +96,10 @@ def add_task():
         messagebox.showwarning("Cảnh báo", "Ngày hết hạn không hợp lệ! Vui lòng nhập đúng định dạng dd/mm/yyyy và lớn hơn hoặc bằng ngày hiện tại.")
         return
 
+    repeat = read_repeat()
+    if repeat is False:
+        return
+
     new_task = {
         "id": str(uuid.uuid4()), # Tạo ID duy nhất cho mỗi công việc
         "title": title,
@@ -98,41 +108,83 @@ def add_task():
         "priority": priority,
         "status": status # Thêm trạng thái
     }
+    if repeat:
+        new_task["repeat"] = repeat # Công việc lặp lại: các lần sau được tính khi cần, không tạo bản sao
 
-    tasks = load_tasks()
-    tasks.append(new_task)
-    save_tasks(tasks)
+    with instrument.span("ui.add_task"):
+        task_repo.add(new_task)
     messagebox.showinfo("Thông báo", "Công việc đã được thêm thành công!")
     clear_entries()
     refresh_task_list()
 
+def selected_task_ids():
+    """ID của các công việc đang được chọn (Treeview cho phép chọn nhiều hàng)."""
+    return [treeview_tasks.item(item, 'tags')[0] for item in treeview_tasks.selection()]
+
 def delete_task():
-    """Xóa công việc đã chọn."""
-    selected_item = treeview_tasks.selection()
-    if not selected_item:
+    """Xóa các công việc đã chọn."""
+    task_ids = selected_task_ids()
+    if not task_ids:
         messagebox.showwarning("Cảnh báo", "Vui lòng chọn công việc để xóa!")
         return
 
-    # Lấy ID của công việc từ tags của Treeview item (đã lưu khi chèn)
-    task_id_to_delete = treeview_tasks.item(selected_item[0], 'tags')[0] 
-    title_to_delete = treeview_tasks.item(selected_item[0], 'values')[0]
-
-    if messagebox.askyesno("Xác nhận xóa", f"Bạn có chắc chắn muốn xóa công việc: '{title_to_delete}' không?"):
-        tasks = load_tasks()
-        # Lọc danh sách để tạo danh sách mới không chứa công việc có ID cần xóa
-        tasks = [task for task in tasks if task.get("id") != task_id_to_delete]
-        save_tasks(tasks)
-        messagebox.showinfo("Thông báo", "Công việc đã được xóa thành công!")
+    if len(task_ids) == 1:
+        title_to_delete = treeview_tasks.item(treeview_tasks.selection()[0], 'values')[0]
+        question = f"Bạn có chắc chắn muốn xóa công việc: '{title_to_delete}' không?"
+    else:
+        question = f"Bạn có chắc chắn muốn xóa {len(task_ids)} công việc đã chọn không?"
+    if messagebox.askyesno("Xác nhận xóa", question):
+        with instrument.span("ui.delete_task"):
+            count = task_repo.delete_many(task_ids) # Một lần ghi cho cả nhóm
+            if len(task_ids) == 1 and count == 1:
+                task_view.remove(task_ids[0]) # Chỉ xóa đúng hàng này khỏi Treeview
+            else:
+                refresh_task_list()
+        messagebox.showinfo("Thông báo", f"Đã xóa {count} công việc!")
         clear_entries()
-        refresh_task_list()
 
 def delete_all_tasks():
     """Xóa tất cả các công việc."""
-    if messagebox.askyesno("Xác nhận xóa tất cả", "Bạn có chắc chắn muốn xóa TẤT CẢ các công việc không? Thao tác này không thể hoàn tác."):
-        save_tasks([]) # Lưu danh sách rỗng
+    if messagebox.askyesno("Xác nhận xóa tất cả", "Bạn có chắc chắn muốn xóa TẤT CẢ các công việc không? Có thể hoàn tác bằng Ctrl+Z."):
+        with instrument.span("ui.delete_all_tasks"):
+            task_repo.clear() # Lưu danh sách rỗng
+            task_view.clear()
         messagebox.showinfo("Thông báo", "Tất cả công việc đã được xóa!")
         clear_entries()
-        refresh_task_list()
+
+def undo_last(event=None):
+    """Hoàn tác thao tác gần nhất (Ctrl+Z)."""
+    with instrument.span("ui.undo"):
+        step = task_repo.undo()
+        if step is not None:
+            refresh_task_list()
+    api_status_var.set(f"Đã hoàn tác: {describe_step(step)}.{skipped_note()}" if step is not None else "Không còn thao tác để hoàn tác.")
+    update_undo_buttons()
+    deselect_tasks()
+
+def redo_last(event=None):
+    """Làm lại thao tác vừa hoàn tác (Ctrl+Y)."""
+    with instrument.span("ui.redo"):
+        step = task_repo.redo()
+        if step is not None:
+            refresh_task_list()
+    api_status_var.set(f"Đã làm lại: {describe_step(step)}.{skipped_note()}" if step is not None else "Không có thao tác để làm lại.")
+    update_undo_buttons()
+    deselect_tasks()
+
+def skipped_note():
+    """Ghi chú các công việc bị bỏ qua khi hoàn tác/làm lại vì đã bị sửa ở nơi khác."""
+    conflicts = read_external_changes()
+    return f" Bỏ qua {len(conflicts)} công việc vừa bị sửa ở nơi khác." if conflicts else ""
+
+def update_undo_buttons(*_):
+    """Bật/tắt nút Hoàn tác/Làm lại theo lịch sử (listener của kho dữ liệu).
+
+    Không đọc file lịch sử: khi chưa đọc, nút được bật nếu file có dữ liệu.
+    """
+    history = task_repo.history
+    button_undo.config(state=tk.NORMAL if history.may_undo() else tk.DISABLED)
+    button_redo.config(state=tk.NORMAL if history.may_redo() else tk.DISABLED)
 
 def edit_task():
     """Chỉnh sửa công việc đã chọn."""
@@ -157,29 +209,104 @@ def edit_task():
         messagebox.showwarning("Cảnh báo", "Ngày hết hạn không hợp lệ! Vui lòng nhập đúng định dạng dd/mm/yyyy và lớn hơn hoặc bằng ngày hiện tại.")
         return
 
-    tasks = load_tasks()
-    
-    # Duyệt qua danh sách và cập nhật công việc dựa trên ID
-    for i, task in enumerate(tasks):
-        if task.get("id") == task_id_to_edit:
-            tasks[i] = {
-                "id": task_id_to_edit, # Giữ nguyên ID
-                "title": title,
-                "description": description,
-                "due_date": due_date,
-                "priority": priority,
-                "status": status
-            }
-            save_tasks(tasks)
-            messagebox.showinfo("Thông báo", "Công việc đã được chỉnh sửa thành công!")
-            clear_entries()
-            refresh_task_list()
-            return # Thoát khỏi hàm sau khi tìm và cập nhật
-    messagebox.showerror("Lỗi", "Không tìm thấy công việc để chỉnh sửa.")
+    repeat = read_repeat(task_repo.get(task_id_to_edit))
+    if repeat is False:
+        return
+    task = {
+        "id": task_id_to_edit, # Giữ nguyên ID
+        "title": title,
+        "description": description,
+        "due_date": due_date,
+        "priority": priority,
+        "status": status,
+        "rev": editing_rev # Báo xung đột nếu công việc đã bị sửa ở nơi khác sau khi được chọn
+    }
+    if repeat:
+        task["repeat"] = repeat
+    task = roll_forward(task) # Hoàn thành một lần của công việc lặp lại: chuyển sang lần kế tiếp
+
+    # Cập nhật trực tiếp theo ID trong kho dữ liệu
+    try:
+        with instrument.span("ui.edit_task"):
+            updated = task_repo.update(task)
+    except TaskConflictError:
+        messagebox.showwarning("Xung đột", "Công việc này vừa được sửa ở nơi khác. Nội dung mới đã được tải lại, vui lòng sửa lại nếu cần.")
+        refresh_task_list()
+        show_task_details(None)
+        return
+    if not updated:
+        messagebox.showerror("Lỗi", "Không tìm thấy công việc để chỉnh sửa.")
+        return
+    if task["due_date"] != due_date:
+        messagebox.showinfo("Thông báo", f"Đã hoàn thành lần này. Lần lặp kế tiếp: {task['due_date']}.")
+    else:
+        messagebox.showinfo("Thông báo", "Công việc đã được chỉnh sửa thành công!")
+    refresh_task_list()
+    deselect_tasks() # Sửa tiếp thì chọn lại: form và rev được đọc lại từ bản vừa ghi
+
+# --- Thao tác hàng loạt ---
+def bulk_update(**changes):
+    """Áp dụng cùng một thay đổi cho mọi công việc đang chọn, ghi một lần."""
+    task_ids = selected_task_ids()
+    if not task_ids:
+        messagebox.showwarning("Cảnh báo", "Vui lòng chọn một hoặc nhiều công việc!")
+        return
+    with instrument.span("ui.bulk_update"):
+        tasks = [roll_forward(apply_bulk_changes(task_repo.get(task_id), **changes))
+                 for task_id in task_ids if task_repo.get(task_id)]
+        count = task_repo.update_many(tasks)
+        refresh_task_list()
+    reload_selected_task()
+    messagebox.showinfo("Thông báo", f"Đã cập nhật {count} công việc!")
+
+def bulk_set_status():
+    """Đổi trạng thái các công việc đã chọn thành trạng thái đang chọn trên form."""
+    bulk_update(status=status_var.get())
+
+def bulk_set_priority():
+    """Đổi độ ưu tiên các công việc đã chọn thành độ ưu tiên đang chọn trên form."""
+    bulk_update(priority=priority_var.get())
+
+def bulk_shift_due_date():
+    days = simpledialog.askinteger("Dời hạn", "Dời ngày hết hạn thêm bao nhiêu ngày? (số âm để lùi lại)", parent=root)
+    if days:
+        bulk_update(shift_days=days)
+
+FILE_TYPES = [("CSV", "*.csv"), ("JSON-lines", "*.jsonl"), ("JSON", "*.json")]
+
+def import_from_file():
+    """Nhập công việc từ file CSV/JSON/JSON-lines (đọc theo luồng, ghi một lần)."""
+    path = filedialog.askopenfilename(title="Nhập công việc", filetypes=FILE_TYPES)
+    if not path:
+        return
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f, instrument.span("ui.import"):
+            count = import_tasks(task_repo, f, detect_format(path))
+    except (OSError, ValueError, csv.Error) as e:
+        messagebox.showerror("Lỗi", f"Không thể nhập file: {e}")
+        return
+    refresh_task_list()
+    reload_selected_task()
+    messagebox.showinfo("Thông báo", f"Đã nhập {count} công việc!")
+
+def export_to_file():
+    """Xuất các công việc đang hiển thị (theo bộ lọc hiện tại) ra file."""
+    path = filedialog.asksaveasfilename(title="Xuất công việc", defaultextension=".csv", filetypes=FILE_TYPES)
+    if not path:
+        return
+    tasks = current_query()
+    try:
+        with open(path, "w", encoding="utf-8", newline="") as f, instrument.span("ui.export"):
+            export_tasks(tasks, f, detect_format(path) or "json")
+    except OSError as e:
+        messagebox.showerror("Lỗi", f"Không thể xuất file: {e}")
+        return
+    messagebox.showinfo("Thông báo", f"Đã xuất {len(tasks)} công việc!")
 
 # --- Hiển thị và Làm mới ---
 def show_task_details(event):
     """Hiển thị chi tiết công việc được chọn lên các trường nhập liệu."""
+    global editing_rev
     selected_item = treeview_tasks.selection()
     if not selected_item:
         # Nếu không có gì được chọn (ví dụ: click ra ngoài)
@@ -189,6 +316,8 @@ def show_task_details(event):
     # Lấy các giá trị từ hàng được chọn trong Treeview
     # values = (title, due_date, priority, status, description)
     item_values = treeview_tasks.item(selected_item[0], 'values')
+    task = task_repo.get(treeview_tasks.item(selected_item[0], 'tags')[0])
+    editing_rev = task.get("rev", 0) if task is not None else None
     
     if len(item_values) >= 5: # Đảm bảo có đủ các giá trị
         entry_title.delete(0, tk.END)
@@ -202,69 +331,47 @@ def show_task_details(event):
         
         priority_var.set(item_values[2]) # Độ ưu tiên
         status_var.set(item_values[3]) # Trạng thái
+
+        repeat = task.get("repeat") if task is not None else None
+        rule = parse_repeat(repeat)
+        repeat_var.set(REPEAT_LABELS[rule.freq] if rule is not None else NO_REPEAT_LABEL)
+        entry_repeat_until.delete(0, tk.END)
+        if rule is not None:
+            entry_repeat_until.insert(0, repeat.get("until", ""))
     else:
         messagebox.showwarning("Lỗi", "Không đủ dữ liệu cho mục đã chọn.")
         clear_entries()
-def parse_due_date_safe(date_str):
-    try:
-        return datetime.strptime(date_str, '%d/%m/%Y')
-    except (ValueError, TypeError):
-        return datetime.strptime("01/01/2100", '%d/%m/%Y')
+def current_query():
+    """Các công việc khớp ô tìm kiếm/bộ lọc, theo thứ tự đang hiển thị."""
+    # Lọc, tìm kiếm và sắp xếp (đẩy xuống SQL nếu dùng SQLite); đổi qua lại bộ lọc thì lấy từ bộ nhớ đệm
+    # Lọc "Hoàn thành" hoặc chọn "Cả lưu trữ" thì đọc thêm file lưu trữ (chỉ khi đó)
+    return task_repo.query(search_entry.get().strip().lower(), filter_priority_var.get(), filter_status_var.get(),
+                           sort_state, include_archive=search_archive_var.get())
+
+@instrument.timed("ui.refresh")
 def refresh_task_list():
     """Làm mới danh sách công việc trên Treeview dựa trên bộ lọc và tìm kiếm."""
-    for item in treeview_tasks.get_children():
-        treeview_tasks.delete(item)
-
-    tasks = load_tasks()
-    
-    # Áp dụng tìm kiếm
-    search_term = search_entry.get().strip().lower()
-    if search_term:
-        tasks = [task for task in tasks if 
-                 search_term in task.get("title", "").lower() or 
-                 search_term in task.get("description", "").lower()]
-    
-    # Áp dụng bộ lọc ưu tiên
-    filter_priority = filter_priority_var.get()
-    if filter_priority != "Tất cả":
-        tasks = [task for task in tasks if task.get("priority") == filter_priority]
-
-    # Áp dụng bộ lọc trạng thái
-    filter_status = filter_status_var.get()
-    if filter_status != "Tất cả":
-        tasks = [task for task in tasks if task.get("status") == filter_status]
-  # Ngày mặc định rất xa để xếp cuối
-
-    # Sắp xếp lại danh sách sau khi lọc và tìm kiếm
-    sorted_tasks = sorted(tasks, key=lambda x: (
-    0 if x.get("priority") == "Cao" else 1,
-    parse_due_date_safe(x.get("due_date", "01/01/2100"))
-))
-    
-    # Chèn dữ liệu vào Treeview
-    for task in sorted_tasks:
-        # Gán tags cho từng hàng để dễ dàng lấy ID khi xóa/sửa
-        # Đảm bảo các trường tồn tại trước khi truy cập
-        task_id = task.get("id", "")
-        title = task.get("title", "")
-        due_date = task.get("due_date", "")
-        priority = task.get("priority", "")
-        status = task.get("status", "")
-        description = task.get("description", "") # Cột mô tả sẽ được ẩn
-
-        # Xác định màu sắc dựa trên ưu tiên và trạng thái
-        tags = (task_id,) # Tag đầu tiên là ID của công việc
-        if status == "Hoàn thành":
-            tags += ("done_task",) # Màu xanh lá
-        elif priority == "Cao":
-            tags += ("high_priority",) # Màu đỏ
-        elif priority == "Thấp":
-            tags += ("low_priority",) # Màu xanh dương nhạt
-
-        treeview_tasks.insert("", tk.END, values=(title, due_date, priority, status, description), tags=tags)
-        
-        # Nhắc nhở công việc sắp đến hạn (Hiển thị popup)
-        check_due_date_reminder(task)
+    # Chỉ cập nhật các hàng thay đổi thay vì xóa hết rồi chèn lại
+    task_view.set_tasks(current_query())
+
+search_after_id = None # Lượt tìm kiếm đang chờ (root.after)
+last_search_text = "" # Nội dung ô tìm kiếm ở lần lên lịch gần nhất
+
+def schedule_search(event=None):
+    """Chờ người dùng ngừng gõ rồi mới tìm; lượt tìm cũ bị hủy khi có phím mới."""
+    global search_after_id, last_search_text
+    text = search_entry.get()
+    if text == last_search_text:
+        return # Phím không đổi nội dung (Shift, mũi tên...)
+    last_search_text = text
+    if search_after_id is not None:
+        root.after_cancel(search_after_id)
+    search_after_id = root.after(SEARCH_DEBOUNCE_MS, run_scheduled_search)
+
+def run_scheduled_search():
+    global search_after_id
+    search_after_id = None
+    refresh_task_list()
 
 def clear_entries():
     """Xóa nội dung của các trường nhập liệu."""
@@ -273,106 +380,241 @@ def clear_entries():
     entry_due_date.delete(0, tk.END)
     priority_var.set("Cao")
     status_var.set("Cần thực hiện")
+    repeat_var.set(NO_REPEAT_LABEL)
+    entry_repeat_until.delete(0, tk.END)
+
+def deselect_tasks():
+    """Bỏ chọn và xóa form; lần "Sửa" tiếp theo phải chọn lại công việc (đọc lại rev mới nhất)."""
+    global editing_rev
+    selection = treeview_tasks.selection()
+    if selection:
+        treeview_tasks.selection_remove(selection)
+    editing_rev = None
+    clear_entries()
 
-def check_due_date_reminder(task):
-    """Kiểm tra và hiển thị nhắc nhở nếu công việc sắp đến hạn, chỉ hiện 1 lần mỗi task."""
-    global notified_tasks
+def reload_selected_task():
+    """Đọc lại form và rev của công việc đang chọn sau một thao tác của chính ứng dụng.
 
-    task_id = task.get("id")
-    if not task_id:
-        return
+    Không gọi khi đọc thay đổi từ tiến trình khác (watch_data_file): khi đó
+    rev cũ phải được giữ để lần "Sửa" tới báo xung đột.
+    """
+    if treeview_tasks.selection():
+        show_task_details(None)
 
-    if task.get("status") == "Hoàn thành":  # Không nhắc công việc đã hoàn thành
-        return
+# --- Theo dõi file dữ liệu ---
+def read_external_changes():
+    """check_external_changes() của kho; lỗi của lượt ghi nền được báo bằng hộp thoại (thay đổi vẫn chờ ghi lại)."""
+    try:
+        return task_repo.check_external_changes()
+    except (OSError, sqlite3.Error) as e:
+        messagebox.showerror("Lỗi", f"Không thể lưu thay đổi vào file dữ liệu: {e}\n"
+                                    "Các thay đổi vẫn được giữ và sẽ được ghi lại ở lần lưu sau.")
+        return []
 
-    # Nếu task đã được thông báo rồi thì không hiện nữa
-    if task_id in notified_tasks:
+def watch_data_file():
+    """Định kỳ kiểm tra file dữ liệu; thay đổi của tiến trình khác chỉ cập nhật các hàng liên quan."""
+    version = task_repo.version
+    conflicts = read_external_changes()
+    if task_repo.version != version:
+        refresh_task_list()
+    if conflicts:
+        api_status_var.set(f"Đã bỏ thay đổi của {len(conflicts)} công việc vì chúng vừa được sửa ở nơi khác.")
+    root.after(WATCH_INTERVAL_MS, watch_data_file)
+
+# --- Lưu trữ ---
+def archive_periodically():
+    """Định kỳ chuyển công việc hoàn thành từ lâu sang lưu trữ; nén và ghi file trên luồng phụ."""
+    tasks = task_repo.archive_candidates()
+    if not tasks:
+        root.after(ARCHIVE_INTERVAL_MS, archive_periodically)
         return
+    result = queue.Queue()
+
+    def work():
+        try:
+            task_repo.archive.append(tasks)
+            result.put(None)
+        except OSError as e:
+            result.put(e)
+
+    def finish():
+        try:
+            error = result.get_nowait()
+        except queue.Empty:
+            root.after(100, finish)
+            return
+        if error is not None:
+            api_status_var.set(f"Không ghi được file lưu trữ: {error}")
+        elif task_repo.drop_archived(tasks): # Bỏ khỏi dữ liệu chính trên luồng giao diện
+            refresh_task_list()
+        root.after(ARCHIVE_INTERVAL_MS, archive_periodically)
 
-    try:
-        due_date_dt = datetime.strptime(task.get("due_date"), '%d/%m/%Y').date()
-        today = datetime.now().date()
-        days_left = (due_date_dt - today).days
+    threading.Thread(target=work, name="archive", daemon=True).start()
+    root.after(100, finish)
+
+# --- Nhắc nhở ---
+REMINDER_MAX_TITLES = 10 # Số công việc liệt kê tối đa trong một thông báo
 
-        if 0 <= days_left <= 3:
-            messagebox.showinfo("Nhắc nhở công việc",
-                                f"Công việc '{task.get('title')}' sắp đến hạn!\n"
-                                f"Ngày hết hạn: {task.get('due_date')}\n"
-                                f"Còn {days_left} ngày.")
-            notified_tasks.add(task_id)  # Đánh dấu đã thông báo
-    except (ValueError, TypeError):
-        pass
+def show_due_reminders(due_now):
+    """Hiện chung một thông báo cho các công việc đến hạn cùng lúc."""
+    # Ngày của lần đến hạn (công việc lặp lại có thể khác ngày hết hạn đang lưu)
+    lines = [f"- '{task.get('title')}' (hạn {(date.today() + timedelta(days=days_left)).strftime('%d/%m/%Y')}, còn {days_left} ngày)"
+             for days_left, task in due_now[:REMINDER_MAX_TITLES]]
+    if len(due_now) > REMINDER_MAX_TITLES:
+        lines.append(f"... và {len(due_now) - REMINDER_MAX_TITLES} công việc khác.")
+    messagebox.showinfo("Nhắc nhở công việc",
+                        f"Có {len(due_now)} công việc sắp đến hạn!\n" + "\n".join(lines))
 
 
 # --- Chức năng Tải dữ liệu từ API ---
+api_job = None # Lượt tải từ API đang chạy
+
 def fetch_and_add_from_api():
-    """Tải dữ liệu công việc từ API mẫu và chỉ thêm các công việc có ID cụ thể với nội dung tùy chỉnh."""
-    try:
-        response = requests.get(API_URL)
-        response.raise_for_status() # Kiểm tra lỗi HTTP (ví dụ: 404, 500)
-        api_data = response.json()
-
-        tasks_to_add = []
-        for item in api_data:
-            original_id = item.get("id", "N/A")
-
-            # --- BẮT ĐẦU PHẦN TÙY CHỈNH NỘI DUNG VÀ LỌC ---
-
-            custom_title = ""
-            custom_description = ""
-            custom_due_date = ""
-            custom_priority = ""
-            custom_status = ""
-
-            if original_id == 1:
-                custom_title = "Đi học"
-                custom_description = "Chuẩn bị sách vở, đồng phục và đến trường đúng giờ. Đừng quên bài tập về nhà!"
-                custom_due_date = (datetime.now() + timedelta(days=1)).strftime('%d/%m/%Y') 
-                custom_priority = "Cao"
-                custom_status = "Cần thực hiện"
-            elif original_id == 2:
-                custom_title = "Đi làm thêm ca tối"
-                custom_description = "Hoàn thành các nhiệm vụ được giao tại nơi làm thêm. Giao tiếp tốt với đồng nghiệp và về nhà an toàn."
-                custom_due_date = (datetime.now() + timedelta(days=3)).strftime('%d/%m/%Y') 
-                custom_priority = "Cao"
-                custom_status = "Đang thực hiện"
-            elif original_id == 3:
-                custom_title = "đi chơi "
-                custom_description = "giải trính."
-                custom_due_date = (datetime.now() + timedelta(days=6)).strftime('%d/%m/%Y') 
-                custom_priority = "Thấp"
-                custom_status = "Hoàn thành"
-            else:
-                # Nếu không khớp với bất kỳ ID cụ thể nào, BỎ QUA công việc này
-                continue # Dòng này sẽ bỏ qua các công việc không khớp điều kiện
-
-            # --- KẾT THÚC PHẦN TÙY CHỈNH NỘI DUNG VÀ LỌC ---
-
-            # Chỉ thêm vào danh sách nếu nó khớp với một ID cụ thể
-            tasks_to_add.append({
-                "id": str(uuid.uuid4()), # Luôn tạo ID duy nhất cho ứng dụng
-                "title": custom_title,
-                "description": custom_description,
-                "due_date": custom_due_date,
-                "priority": custom_priority,
-                "status": custom_status
-            })
-
-        if tasks_to_add:
-            current_tasks = load_tasks()
-            current_tasks.extend(tasks_to_add) # Thêm các công việc đã biến đổi vào danh sách hiện có
-            save_tasks(current_tasks)
-            messagebox.showinfo("Thông báo", f"Đã tải và thêm {len(tasks_to_add)} công việc từ API thành công!")
+    """Đồng bộ công việc từ API mẫu (không chặn giao diện); chỉ các công việc có ID cụ thể được thêm/cập nhật với nội dung tùy chỉnh."""
+    global api_job
+    if api_job is not None:
+        return
+    api_job = ApiImportJob(root, sync_api_tasks, api_status_var.set, finish_api_import)
+    button_fetch_api.config(state=tk.DISABLED)
+    button_cancel_api.config(state=tk.NORMAL)
+    api_status_var.set("Đang kết nối API...")
+    api_job.start()
+
+def cancel_api_import():
+    if api_job is not None:
+        api_job.cancel()
+        api_status_var.set("Đang hủy...")
+
+def finish_api_import(kind, payload):
+    """Xử lý kết quả tải từ API trên luồng giao diện."""
+    global api_job
+    instrument.observe("ui.api_import", api_job.elapsed_ms()) # Cả lượt tải, từ lúc bấm nút đến khi có kết quả
+    api_job = None
+    button_fetch_api.config(state=tk.NORMAL)
+    button_cancel_api.config(state=tk.DISABLED)
+    api_status_var.set("")
+
+    if kind == "cancelled":
+        api_status_var.set("Đã hủy tải từ API.")
+    elif kind == "done":
+        try:
+            added, updated = apply_api_sync(payload, task_repo)
+        except (OSError, sqlite3.Error) as e:
+            refresh_task_list() # Các công việc đã thêm trước khi lỗi vẫn được hiển thị
+            reload_selected_task()
+            messagebox.showerror("Lỗi", f"Không thể lưu kết quả đồng bộ từ API: {e}")
+            return
+        if added or updated:
             refresh_task_list()
+            reload_selected_task()
+            messagebox.showinfo("Thông báo", f"Đồng bộ từ API thành công: thêm {added}, cập nhật {updated} công việc.")
         else:
-            messagebox.showinfo("Thông báo", "Không có công việc nào được tải từ API theo điều kiện đã đặt.")
-
-    except requests.exceptions.RequestException as e:
-        messagebox.showerror("Lỗi kết nối API", f"Không thể kết nối hoặc tải dữ liệu từ API: {e}")
-    except json.JSONDecodeError:
+            messagebox.showinfo("Thông báo", "Không có thay đổi nào từ API theo điều kiện đã đặt.")
+    elif is_request_error(payload):
+        messagebox.showerror("Lỗi kết nối API", f"Không thể kết nối hoặc tải dữ liệu từ API: {payload}")
+    elif isinstance(payload, json.JSONDecodeError):
         messagebox.showerror("Lỗi dữ liệu API", "Dữ liệu nhận được từ API không phải định dạng JSON hợp lệ.")
-    except Exception as e:
-        messagebox.showerror("Lỗi", f"Đã xảy ra lỗi không mong muốn khi tải dữ liệu từ API: {e}")
+    else:
+        messagebox.showerror("Lỗi", f"Đã xảy ra lỗi không mong muốn khi tải dữ liệu từ API: {payload}")
+# --- Lịch công việc (agenda) ---
+AGENDA_DAYS = 14 # Số ngày hiển thị mỗi trang lịch
+WEEKDAYS = ["Thứ Hai", "Thứ Ba", "Thứ Tư", "Thứ Năm", "Thứ Sáu", "Thứ Bảy", "Chủ Nhật"]
+agenda_window = None
+
+def open_agenda():
+    """Cửa sổ lịch: các lần đến hạn (kể cả từng lần của công việc lặp lại) trong AGENDA_DAYS ngày."""
+    global agenda_window
+    if agenda_window is not None and agenda_window.winfo_exists():
+        agenda_window.lift()
+        return
+    agenda_window = tk.Toplevel(root)
+    agenda_window.title("Lịch công việc")
+    agenda_window.geometry("700x450")
+    start = [date.today().toordinal()] # Ngày đầu trang lịch đang xem
+
+    nav = tk.Frame(agenda_window)
+    nav.pack(fill=tk.X, padx=5, pady=5)
+    range_var = tk.StringVar()
+    columns = ('day', 'title', 'priority', 'status', 'repeat')
+    tree = ttk.Treeview(agenda_window, columns=columns, show='headings')
+    for col, text, width in (('day', 'Ngày', 150), ('title', 'Tiêu đề', 250), ('priority', 'Ưu tiên', 70),
+                             ('status', 'Trạng thái', 110), ('repeat', 'Lặp lại', 150)):
+        tree.heading(col, text=text, anchor=tk.W)
+        tree.column(col, width=width)
+    for tag, colors in (("high_priority", ("#FFEBEE", "#E53935")), ("low_priority", ("#E3F2FD", "#2196F3")),
+                        ("done_task", ("#E8F5E9", "#4CAF50"))):
+        tree.tag_configure(tag, background=colors[0], foreground=colors[1])
+    tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+
+    def refresh(*_):
+        if not tree.winfo_exists():
+            task_repo.remove_listener(refresh)
+            return
+        first, last = start[0], start[0] + AGENDA_DAYS - 1
+        range_var.set(f"{date.fromordinal(first):%d/%m/%Y} - {date.fromordinal(last):%d/%m/%Y}")
+        tree.delete(*tree.get_children())
+        for ordinal, task in task_repo.due_between(first, last): # Chỉ mục ngày: không duyệt mọi công việc
+            day = date.fromordinal(ordinal)
+            values, tags = task_row(task)
+            tree.insert("", "end", values=(f"{WEEKDAYS[day.weekday()]} {day:%d/%m/%Y}", values[0], values[2], values[3],
+                                           describe_repeat(task.get("repeat"))), tags=tags[1:])
+
+    def move(days):
+        start[0] = date.today().toordinal() if days is None else start[0] + days
+        refresh()
+
+    tk.Button(nav, text="◀ Trước", command=lambda: move(-AGENDA_DAYS)).pack(side=tk.LEFT, padx=5)
+    tk.Button(nav, text="Hôm nay", command=lambda: move(None)).pack(side=tk.LEFT, padx=5)
+    tk.Button(nav, text="Sau ▶", command=lambda: move(AGENDA_DAYS)).pack(side=tk.LEFT, padx=5)
+    tk.Label(nav, textvariable=range_var, font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=10)
+    task_repo.add_listener(refresh) # Cập nhật khi dữ liệu đổi (kể cả từ tiến trình khác)
+    refresh()
+
+# --- Bảng gỡ lỗi (chỉ khi bật đo đạc) ---
+debug_panel = None
+
+def open_debug_panel(event=None):
+    """Cửa sổ hiển thị p50/p95/p99 của từng công đoạn, tự cập nhật mỗi giây."""
+    global debug_panel
+    if not instrument.enabled:
+        return
+    if debug_panel is not None and debug_panel.winfo_exists():
+        debug_panel.lift()
+        return
+    debug_panel = tk.Toplevel(root)
+    debug_panel.title("Số liệu hiệu năng")
+    columns = ('count', 'p50', 'p95', 'p99', 'max')
+    tree = ttk.Treeview(debug_panel, columns=columns, height=18)
+    tree.heading('#0', text='Công đoạn (ms) / số đo', anchor=tk.W)
+    tree.column('#0', width=220)
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=80, anchor=tk.E)
+    tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    buttons = tk.Frame(debug_panel)
+    buttons.pack(fill=tk.X, padx=5, pady=(0, 5))
+    tk.Button(buttons, text="Profile lần làm mới tới", command=lambda: instrument.profile_next("ui.refresh")).pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons, text="Ghi JSON", command=lambda: instrument.dump_json(INSTRUMENT_DUMP_FILE)).pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons, text="Đặt lại", command=instrument.reset).pack(side=tk.LEFT, padx=5)
+
+    def update_panel():
+        if not tree.winfo_exists():
+            return
+        data = instrument.snapshot()
+        tree.delete(*tree.get_children())
+        for section, label in (("timings_ms", "Thời gian"), ("counts", "Số lượng")):
+            parent = tree.insert("", "end", text=label, open=True)
+            for name, h in data[section].items():
+                tree.insert(parent, "end", text=name, values=(h["count"],) + tuple(f"{h[key]:.2f}" for key in ("p50", "p95", "p99", "max")))
+        cache = data["caches"]["due_date_ordinal"]
+        tree.insert("", "end", text=f"Cache ngày: {cache['hits']} trúng / {cache['misses']} trượt")
+        debug_panel.after(1000, update_panel)
+    update_panel()
+
+def dump_metrics_periodically():
+    instrument.dump_json(INSTRUMENT_DUMP_FILE)
+    root.after(INSTRUMENT_DUMP_MS, dump_metrics_periodically)
+
 # --- Khởi tạo ứng dụng GUI ---
 init_data_file()
 root = tk.Tk()
@@ -383,8 +625,10 @@ root.minsize(700, 550) # Đặt kích thước tối thiểu để tránh các t
 # Cấu hình grid của cửa sổ chính (root) để các hàng và cột giãn nở
 root.grid_rowconfigure(0, weight=0) # Hàng input form, không giãn
 root.grid_rowconfigure(1, weight=0) # Hàng buttons, không giãn
-root.grid_rowconfigure(2, weight=0) # Hàng filter/search, không giãn
-root.grid_rowconfigure(3, weight=1) # Hàng Treeview, sẽ giãn nở theo chiều dọc
+root.grid_rowconfigure(2, weight=0) # Hàng thao tác hàng loạt, không giãn
+root.grid_rowconfigure(3, weight=0) # Hàng filter/search, không giãn
+root.grid_rowconfigure(4, weight=1) # Hàng Treeview, sẽ giãn nở theo chiều dọc
+root.grid_rowconfigure(5, weight=0) # Hàng trạng thái tải API, không giãn
 root.grid_columnconfigure(0, weight=1) # Cột chính, sẽ giãn nở theo chiều ngang
 
 
@@ -416,6 +660,14 @@ status_menu = ttk.Combobox(frame_input, textvariable=status_var, values=status_o
 status_menu.grid(row=4, column=1, padx=5, pady=5, sticky=tk.W)
 status_menu.set("Cần thực hiện")
 
+tk.Label(frame_input, text="Lặp lại:", font=('Arial', 10, 'bold')).grid(row=5, column=0, padx=5, pady=5, sticky=tk.W)
+repeat_var = tk.StringVar(value=NO_REPEAT_LABEL)
+repeat_menu = ttk.Combobox(frame_input, textvariable=repeat_var, values=[NO_REPEAT_LABEL] + list(REPEAT_BY_LABEL), state="readonly", width=15, font=('Arial', 10))
+repeat_menu.grid(row=5, column=1, padx=5, pady=5, sticky=tk.W)
+tk.Label(frame_input, text="đến ngày (trống = không kết thúc):", font=('Arial', 10)).grid(row=5, column=1, padx=(160, 5), pady=5, sticky=tk.W)
+entry_repeat_until = tk.Entry(frame_input, font=('Arial', 10), width=12)
+entry_repeat_until.grid(row=5, column=1, padx=(390, 5), pady=5, sticky=tk.W)
+
 # Cấu hình các cột của frame_input để giãn nở. Cột 1 (chứa Entry, Text, Combobox) sẽ giãn nở.
 frame_input.grid_columnconfigure(0, weight=0) # Cột label, không giãn
 frame_input.grid_columnconfigure(1, weight=1) # Cột input, giãn
@@ -443,10 +695,39 @@ button_fetch_api.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
 button_delete_all = tk.Button(frame_buttons, text="Xóa Tất Cả", command=delete_all_tasks, font=('Arial', 10, 'bold'), bg='#607D8B', fg='white')
 button_delete_all.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
 
+button_undo = tk.Button(frame_buttons, text="Hoàn tác", command=undo_last, font=('Arial', 10))
+button_undo.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
+button_redo = tk.Button(frame_buttons, text="Làm lại", command=redo_last, font=('Arial', 10))
+button_redo.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
+
+# --- Frame thao tác hàng loạt (frame_bulk): áp dụng cho mọi hàng đang chọn ---
+frame_bulk = tk.Frame(root, padx=15)
+frame_bulk.grid(row=2, column=0, padx=10, pady=0, sticky="ew")
+
+button_bulk_status = tk.Button(frame_bulk, text="Đổi trạng thái", command=bulk_set_status, font=('Arial', 10))
+button_bulk_status.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
+button_bulk_priority = tk.Button(frame_bulk, text="Đổi ưu tiên", command=bulk_set_priority, font=('Arial', 10))
+button_bulk_priority.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
+button_bulk_shift = tk.Button(frame_bulk, text="Dời hạn", command=bulk_shift_due_date, font=('Arial', 10))
+button_bulk_shift.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
+button_import = tk.Button(frame_bulk, text="Nhập file", command=import_from_file, font=('Arial', 10))
+button_import.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
+button_export = tk.Button(frame_bulk, text="Xuất file", command=export_to_file, font=('Arial', 10))
+button_export.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
+button_agenda = tk.Button(frame_bulk, text="Lịch", command=open_agenda, font=('Arial', 10))
+button_agenda.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5, pady=5)
+
 
 # --- Frame tìm kiếm và lọc (frame_filter) ---
 frame_filter = tk.Frame(root, padx=15, pady=10, bd=2, relief="sunken")
-frame_filter.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
+frame_filter.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
 
 # Cấu hình grid_columnconfigure cho frame_filter
 # Cột 1 (chứa search_entry) sẽ giãn nở nhiều nhất
@@ -462,7 +743,7 @@ frame_filter.grid_columnconfigure(6, weight=1) # Một cột trống cuối cùn
 tk.Label(frame_filter, text="Tìm kiếm:", font=('Arial', 10, 'bold')).grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
 search_entry = tk.Entry(frame_filter, font=('Arial', 10)) # Bỏ width để nó tự giãn theo cột
 search_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew") # Rất quan trọng: sticky="ew"
-search_entry.bind("<KeyRelease>", lambda event: refresh_task_list())
+search_entry.bind("<KeyRelease>", schedule_search) # Tìm kiếm có debounce
 
 tk.Label(frame_filter, text="Lọc ưu tiên:", font=('Arial', 10, 'bold')).grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
 filter_priority_var = tk.StringVar(value="Tất cả")
@@ -478,14 +759,18 @@ filter_status_menu = ttk.Combobox(frame_filter, textvariable=filter_status_var,
 filter_status_menu.grid(row=0, column=5, padx=5, pady=5, sticky="ew") # Sticky "ew" để Combobox cũng giãn nhẹ
 filter_status_menu.bind("<<ComboboxSelected>>", lambda event: refresh_task_list())
 
+search_archive_var = tk.BooleanVar(value=False)
+tk.Checkbutton(frame_filter, text="Cả lưu trữ", variable=search_archive_var, command=refresh_task_list,
+               font=('Arial', 10)).grid(row=0, column=6, padx=5, pady=5, sticky=tk.W)
+
 
 # --- Frame hiển thị danh sách công việc (Treeview) ---
 frame_tasks = tk.Frame(root, padx=10, pady=10)
-frame_tasks.grid(row=3, column=0, padx=10, pady=10, sticky="nsew") # Rất quan trọng: sticky="nsew" để giãn cả 4 hướng
+frame_tasks.grid(row=4, column=0, padx=10, pady=10, sticky="nsew") # Rất quan trọng: sticky="nsew" để giãn cả 4 hướng
 
 # Định nghĩa các cột cho Treeview
 columns = ('title', 'due_date', 'priority', 'status', 'description')
-treeview_tasks = ttk.Treeview(frame_tasks, columns=columns, show='headings')
+treeview_tasks = ttk.Treeview(frame_tasks, columns=columns, show='headings', selectmode='extended') # Ctrl/Shift+click để chọn nhiều
 
 # Cấu hình tiêu đề và độ rộng của từng cột
 treeview_tasks.heading('title', text='Tiêu đề', anchor=tk.W, command=lambda: treeview_sort_column(treeview_tasks, 'title', False))
@@ -506,16 +791,17 @@ treeview_tasks.column('description', width=0, stretch=tk.NO) # Vẫn là cột 
 treeview_tasks.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
 # Thanh cuộn cho Treeview
-scrollbar_y = ttk.Scrollbar(frame_tasks, orient=tk.VERTICAL, command=treeview_tasks.yview)
+scrollbar_y = ttk.Scrollbar(frame_tasks, orient=tk.VERTICAL)
 scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-treeview_tasks.configure(yscrollcommand=scrollbar_y.set)
+# Thanh cuộn do VirtualTaskView điều khiển: danh sách lớn chỉ hiển thị vùng nhìn thấy
+task_view = VirtualTaskView(treeview_tasks, scrollbar_y)
 
 # Ràng buộc sự kiện khi chọn một dòng trong Treeview
 treeview_tasks.bind('<<TreeviewSelect>>', show_task_details)
 
 # Định nghĩa Style cho Treeview (màu sắc)
 style = ttk.Style()
-style.configure("Treeview", rowheight=25)
+style.configure("Treeview", rowheight=ROW_HEIGHT)
 style.configure("Treeview.Heading", font=('Arial', 10, 'bold'))
 style.map("Treeview", background=[('selected', '#B0D7FF')])
 
@@ -524,8 +810,42 @@ treeview_tasks.tag_configure("high_priority", background="#FFEBEE", foreground="
 treeview_tasks.tag_configure("low_priority", background="#E3F2FD", foreground="#2196F3")
 treeview_tasks.tag_configure("done_task", background="#E8F5E9", foreground="#4CAF50")
 
+
+# --- Frame trạng thái tải API (frame_status) ---
+frame_status = tk.Frame(root, padx=15)
+frame_status.grid(row=5, column=0, padx=10, pady=(0, 10), sticky="ew")
+
+api_status_var = tk.StringVar(value="")
+tk.Label(frame_status, textvariable=api_status_var, font=('Arial', 9), anchor=tk.W).pack(side=tk.LEFT, fill=tk.X, expand=True)
+button_cancel_api = tk.Button(frame_status, text="Hủy tải API", command=cancel_api_import, font=('Arial', 9), state=tk.DISABLED)
+button_cancel_api.pack(side=tk.RIGHT)
+if instrument.enabled:
+    tk.Button(frame_status, text="Gỡ lỗi (F12)", command=open_debug_panel, font=('Arial', 9)).pack(side=tk.RIGHT, padx=5)
+    root.bind("<F12>", open_debug_panel)
+
 # Làm mới danh sách công việc khi khởi động
 refresh_task_list()
 
+# Hoàn tác/làm lại: phím tắt và trạng thái nút theo lịch sử
+for sequence in ("<Control-z>", "<Control-Z>"):
+    root.bind(sequence, undo_last)
+for sequence in ("<Control-y>", "<Control-Y>"):
+    root.bind(sequence, redo_last)
+task_repo.add_listener(update_undo_buttons)
+update_undo_buttons()
+
+# Nhận thay đổi từ các tiến trình khác (cửa sổ khác, CLI, script) dùng chung file dữ liệu
+root.after(WATCH_INTERVAL_MS, watch_data_file)
+
+# Chuyển công việc hoàn thành từ lâu sang lưu trữ (lần đầu ngay sau khi mở)
+root.after(WATCH_INTERVAL_MS, archive_periodically)
+
+# Lịch nhắc nhở chạy độc lập với việc làm mới danh sách
+reminder_scheduler = ReminderScheduler(root, task_repo, show_due_reminders)
+reminder_scheduler.start()
+if instrument.enabled:
+    root.after(INSTRUMENT_DUMP_MS, dump_metrics_periodically)
+    atexit.register(instrument.dump_json, INSTRUMENT_DUMP_FILE)
+
 # Chạy ứng dụng
 root.mainloop()
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""Đo hiệu năng các đường nóng của quản lý công việc (tải, lưu, lọc, tìm kiếm, sắp xếp, Treeview).
+
+    python -m benchmarks.dataset --count 100000 -o tasks_100k.json
+    python -m benchmarks.run --sizes 1000 10000 100000 -o ket_qua.json
+    python -m benchmarks.run --sizes 10000 --compare ket_qua_cu.json
+
+Chạy từ thư mục gốc của repo. Không cần màn hình: Treeview được thay bằng bản
+giả (stubtree); thêm --tk để dùng ttk.Treeview thật (ví dụ dưới xvfb-run).
+"""
@@ -0,0 +1,62 @@
+"""Sinh file tasks.json giả lập (tiếng Việt, ngày hết hạn trải đều) để đo hiệu năng.
+
+Cùng `--seed` và `--count` luôn cho ra cùng một file.
+"""
+import argparse
+import random
+import uuid
+from datetime import date, timedelta
+
+from taskmanager.transfer import export_tasks
+
+VERBS = ["Làm", "Viết", "Đọc", "Ôn tập", "Nộp", "Họp về", "Gọi điện về", "Mua", "Sửa", "Chuẩn bị",
+         "Kiểm tra", "Dọn dẹp", "Đăng ký", "Thanh toán", "Gửi email về", "Học", "Luyện tập", "Lên kế hoạch"]
+OBJECTS = ["báo cáo tuần", "bài tập Toán", "đồ án Python", "tài liệu hướng dẫn", "hợp đồng khách hàng",
+           "bài thuyết trình", "hóa đơn điện nước", "vé máy bay đi Đà Nẵng", "quà sinh nhật mẹ", "phòng ngủ",
+           "lịch thi học kỳ", "tiếng Anh giao tiếp", "giáo trình Cơ sở dữ liệu", "xe máy", "ngân sách tháng",
+           "câu lạc bộ bóng đá", "luận văn tốt nghiệp", "đơn xin nghỉ phép", "bảo hiểm y tế", "thực đơn tuần"]
+PLACES = ["ở công ty", "ở nhà", "tại thư viện", "ở trường", "trên Zoom", "ở quán cà phê", "tại Hà Nội", "ở TP. Hồ Chí Minh"]
+DETAILS = ["Nhớ mang theo laptop.", "Hỏi lại anh Tuấn trước khi gửi.", "Ưu tiên làm buổi sáng.",
+           "Cần xác nhận với chị Hương.", "Đã làm được một nửa.", "Xem lại ghi chú buổi họp trước.",
+           "Không quên sao lưu dữ liệu.", "Hạn chót không được lùi.", "Chuẩn bị số liệu quý trước.",
+           "Đặt nhắc nhở trên điện thoại."]
+PRIORITIES = [("Cao", 0.4), ("Thấp", 0.6)]
+STATUSES = [("Cần thực hiện", 0.5), ("Đang thực hiện", 0.25), ("Hoàn thành", 0.25)]
+
+def weighted_choice(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+def generate_tasks(count, seed=0, today=None):
+    """Sinh lần lượt `count` công việc; hạn chót dồn nhiều vào vài tuần tới, một ít đã quá hạn."""
+    rng = random.Random(seed)
+    today = today or date(2026, 1, 1) # Ngày cố định để kết quả lặp lại được
+    for i in range(count):
+        offset = int(rng.triangular(-30, 365, 7)) # Từ 30 ngày trước đến một năm sau, đỉnh ở tuần tới
+        verb, obj = rng.choice(VERBS), rng.choice(OBJECTS)
+        yield {
+            "title": f"{verb} {obj}" + (f" {rng.choice(PLACES)}" if rng.random() < 0.3 else ""),
+            "description": " ".join(rng.sample(DETAILS, rng.randint(1, 3))) + f" (#{i})",
+            "due_date": (today + timedelta(days=offset)).strftime('%d/%m/%Y'),
+            "priority": weighted_choice(rng, PRIORITIES),
+            "status": weighted_choice(rng, STATUSES),
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        }
+
+def write_dataset(path, count, seed=0):
+    """Ghi tập dữ liệu ra file JSON (cùng định dạng tasks.json) theo luồng."""
+    with open(path, "w", encoding="utf-8") as f:
+        export_tasks(generate_tasks(count, seed), f, "json")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks.dataset", description="Sinh tasks.json giả lập.")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="tasks_bench.json")
+    args = parser.parse_args(argv)
+    write_dataset(args.output, args.count, args.seed)
+    print(f"Đã ghi {args.count} công việc ra {args.output}.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
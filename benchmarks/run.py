@@ -0,0 +1,258 @@
+"""Chạy bộ đo hiệu năng trên dữ liệu giả lập và ghi kết quả dạng JSON.
+
+Mỗi phép đo chạy `--repeat` lần, ghi lại thời gian từng lần (ms), nhỏ nhất và
+trung vị. `--compare FILE` so trung vị với một lần chạy trước và trả về mã lỗi 1
+nếu có phép đo chậm hơn ngưỡng `--threshold`.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from taskmanager.config import FILTER_ALL, VIRTUAL_LIST_THRESHOLD
+from taskmanager.repository import TaskRepository
+from taskmanager.storage import create_storage, load_tasks, save_tasks
+from taskmanager.tkview import VirtualTaskView
+
+from .dataset import write_dataset
+from .stubtree import StubScrollbar, StubTreeview
+
+SEARCH_TYPING = ["ô", "ôn", "ôn ", "ôn t", "ôn tậ", "ôn tập"] # Từng phím gõ vào ô tìm kiếm
+SORT_COLUMNS = ["title", "due_date", "priority", "status"]
+
+# --- Widget: Treeview giả hoặc ttk.Treeview thật ---
+class StubWidgets:
+    name = "stub"
+
+    def new(self):
+        return StubTreeview(), StubScrollbar()
+
+    def settle(self):
+        pass
+
+    def dispose(self, tree):
+        pass
+
+class TkWidgets:
+    """ttk.Treeview thật; cần màn hình (hoặc xvfb-run). Thời gian đo gồm cả lượt vẽ lại của Tk."""
+    name = "tk"
+
+    def __init__(self, root, ttk):
+        self.root = root
+        self.ttk = ttk
+        ttk.Style().configure("Treeview", rowheight=25)
+
+    def new(self):
+        frame = self.ttk.Frame(self.root)
+        tree = self.ttk.Treeview(frame, columns=('title', 'due_date', 'priority', 'status', 'description'), show='headings', height=30)
+        scrollbar = self.ttk.Scrollbar(frame)
+        tree.pack(side="left")
+        scrollbar.pack(side="right", fill="y")
+        frame.pack()
+        self.root.update()
+        return tree, scrollbar
+
+    def settle(self):
+        self.root.update()
+
+    def dispose(self, tree):
+        tree.master.destroy()
+
+def open_widgets(use_tk):
+    if not use_tk:
+        return StubWidgets()
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+    except ImportError:
+        print("Không có tkinter, dùng Treeview giả.", file=sys.stderr)
+        return StubWidgets()
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Không mở được Tk ({e}), dùng Treeview giả.", file=sys.stderr)
+        return StubWidgets()
+    return TkWidgets(root, ttk)
+
+# --- Đo ---
+def measure(func, repeat, setup=None):
+    """Chạy func `repeat` lần, trả về thời gian từng lần (ms). setup() chạy trước mỗi lần, không tính giờ,
+    kết quả của nó được truyền cho func."""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is not None:
+            func(arg)
+        else:
+            func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, size, storage, name, func, setup=None, repeat=None):
+        times = measure(func, repeat or self.repeat, setup)
+        result = {"size": size, "storage": storage, "name": name, "runs_ms": [round(t, 3) for t in times],
+                  "min_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3)}
+        self.results.append(result)
+        print(f"{size:>8} {storage:<8} {name:<24} {result['median_ms']:>10.2f} ms", file=sys.stderr)
+
+def dataset_path(data_dir, size, seed):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"tasks_{size}_seed{seed}.json")
+    if not os.path.exists(path):
+        write_dataset(path, size, seed)
+    return path
+
+def bench_view(bench, widgets, size, storage, repo, full_tree_max):
+    """Hiển thị lên Treeview: lần đầu, sau khi lọc và sau khi click sắp xếp cột (như refresh_task_list)."""
+    tasks = repo.query()
+
+    def populate(threshold):
+        def run():
+            tree, scrollbar = widgets.new()
+            VirtualTaskView(tree, scrollbar, threshold=threshold).set_tasks(tasks)
+            widgets.settle()
+            widgets.dispose(tree)
+        return run
+    bench.run(size, storage, "treeview_populate", populate(VIRTUAL_LIST_THRESHOLD))
+    if size <= full_tree_max: # Không dùng danh sách ảo: mọi hàng đều nằm trong Treeview
+        bench.run(size, storage, "treeview_populate_full", populate(float("inf")))
+
+    tree, scrollbar = widgets.new()
+    view = VirtualTaskView(tree, scrollbar)
+
+    def show_all():
+        view.set_tasks(tasks)
+        widgets.settle()
+
+    def refresh_filtered(_):
+        view.set_tasks(repo.query("", FILTER_ALL, "Hoàn thành"))
+        widgets.settle()
+
+    def refresh_sorted(_):
+        view.set_tasks(repo.sort_by_column(repo.query(), "due_date", True))
+        widgets.settle()
+    bench.run(size, storage, "refresh_filter_status", refresh_filtered, setup=show_all)
+    bench.run(size, storage, "refresh_sort_column", refresh_sorted, setup=show_all)
+    widgets.dispose(tree)
+
+def bench_size(bench, widgets, size, storage, source, work_dir, full_tree_max):
+    path = os.path.join(work_dir, f"{storage}_{size}.json")
+    shutil.copyfile(source, path)
+    if storage == "json":
+        tasks = load_tasks(path)
+        bench.run(size, storage, "load_tasks", lambda: load_tasks(path))
+        bench.run(size, storage, "save_tasks", lambda: save_tasks(tasks, path))
+        del tasks
+    create_storage(storage, path) # Lần mở đầu chuyển dữ liệu từ JSON (journal/sqlite), không tính giờ
+    bench.run(size, storage, "repository_load", lambda: TaskRepository(create_storage(storage, path)).all())
+
+    repo = TaskRepository(create_storage(storage, path), commit_window_ms=0)
+    first = repo.all()[0]
+    bench.run(size, storage, "commit_one_edit", lambda: repo.update(dict(first)))
+    # Truy vấn đầu tiên sau khi sửa phải dựng lại dữ liệu lọc (TaskColumns): đo riêng
+    bench.run(size, storage, "query_after_edit", lambda _: repo.query(), setup=lambda: repo.update(dict(first)))
+
+    repo.query() # Làm nóng: các phép lọc dưới đây chỉ đo phần lọc
+    cold = repo.drop_query_cache # Bỏ kết quả đã lưu trước mỗi lần đo: đo truy vấn thật
+    bench.run(size, storage, "filter_priority", lambda _: repo.query("", "Cao", FILTER_ALL), setup=cold)
+    bench.run(size, storage, "filter_status", lambda _: repo.query("", FILTER_ALL, "Đang thực hiện"), setup=cold)
+    bench.run(size, storage, "filter_both", lambda _: repo.query("", "Thấp", "Cần thực hiện"), setup=cold)
+    bench.run(size, storage, "search_word_scan", lambda _: repo.query("ôn tập"), setup=cold, repeat=1) # Chỉ mục chưa dựng
+    repo.ensure_search_index()
+    bench.run(size, storage, "search_word", lambda _: repo.query("ôn tập"), setup=cold)
+    bench.run(size, storage, "search_typing", lambda _: [repo.query(text) for text in SEARCH_TYPING], setup=cold)
+    # Đổi qua lại bộ lọc khi dữ liệu không đổi: lấy từ QueryCache
+    bench.run(size, storage, "filter_toggle_cached",
+              lambda: [repo.query("", FILTER_ALL, status) for status in (FILTER_ALL, "Hoàn thành")])
+    tasks = repo.query()
+    for col in SORT_COLUMNS:
+        bench.run(size, storage, f"sort_{col}", lambda col=col: repo.sort_by_column(tasks, col))
+    bench_view(bench, widgets, size, storage, repo, full_tree_max)
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# --- So sánh ---
+def compare(old_results, new_results, threshold):
+    """In bảng so sánh trung vị; trả về số phép đo chậm hơn `threshold` lần."""
+    old = {(r["size"], r["storage"], r["name"]): r["median_ms"] for r in old_results}
+    regressions = 0
+    print(f"{'size':>8} {'storage':<8} {'name':<24} {'cũ (ms)':>10} {'mới (ms)':>10} {'tỉ lệ':>7}")
+    for r in new_results:
+        key = (r["size"], r["storage"], r["name"])
+        if key not in old:
+            continue
+        ratio = r["median_ms"] / old[key] if old[key] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  CHẬM HƠN"
+            regressions += 1
+        print(f"{r['size']:>8} {r['storage']:<8} {r['name']:<24} {old[key]:>10.2f} {r['median_ms']:>10.2f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description="Đo hiệu năng các đường nóng.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Số công việc của từng tập dữ liệu (vd. 1000 10000 100000 1000000)")
+    parser.add_argument("--storage", nargs="+", default=["json"], choices=["json", "journal", "sqlite"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+                        help="Nơi lưu các tập dữ liệu đã sinh (dùng lại giữa các lần chạy)")
+    parser.add_argument("--full-tree-max", type=int, default=100000,
+                        help="Chỉ đo Treeview không ảo với tập dữ liệu tối đa chừng này công việc")
+    parser.add_argument("--tk", action="store_true", help="Dùng ttk.Treeview thật (cần màn hình/xvfb-run)")
+    parser.add_argument("-o", "--output", default="-", help="File JSON kết quả ('-' là stdout)")
+    parser.add_argument("--compare", metavar="FILE", help="So với kết quả JSON của một lần chạy trước")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Tỉ lệ chậm đi bị coi là suy giảm")
+    args = parser.parse_args(argv)
+
+    widgets = open_widgets(args.tk)
+    bench = Bench(args.repeat)
+    work_dir = tempfile.mkdtemp(prefix="taskbench-")
+    try:
+        for size in args.sizes:
+            source = dataset_path(args.data_dir, size, args.seed)
+            for storage in args.storage:
+                bench_size(bench, widgets, size, storage, source, work_dir, args.full_tree_max)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {"created": datetime.now().isoformat(timespec="seconds"), "git": git_revision(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "widgets": widgets.name, "repeat": args.repeat, "seed": args.seed},
+        "results": bench.results,
+    }
+    if args.output == "-":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old_report = json.load(f)
+        if compare(old_report["results"], bench.results, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+"""Treeview/Scrollbar giả, đủ các lệnh mà taskmanager.tkview dùng, để đo khi không có màn hình.
+
+Mỗi lệnh gửi tới widget được đếm trong `calls` (với Tk thật, mỗi lệnh là một lượt gọi Tcl).
+"""
+from taskmanager.config import ROW_HEIGHT
+
+class StubTreeview:
+    def __init__(self, visible_rows=30):
+        self.height = (visible_rows + 1) * ROW_HEIGHT
+        self.rows = {} # iid -> (values, tags)
+        self.children = []
+        self.calls = 0
+        self._focus = ""
+
+    def insert(self, parent, index, iid, values=(), tags=()):
+        self.calls += 1
+        self.rows[iid] = (values, tags)
+        if index == "end":
+            self.children.append(iid)
+        else:
+            self.children.insert(index, iid)
+        return iid
+
+    def item(self, iid, values=None, tags=None):
+        self.calls += 1
+        self.rows[iid] = (values, tags)
+
+    def delete(self, *iids):
+        self.calls += 1
+        gone = set(iids)
+        self.children = [iid for iid in self.children if iid not in gone]
+        for iid in iids:
+            self.rows.pop(iid, None)
+
+    def detach(self, *iids):
+        self.calls += 1
+        gone = set(iids)
+        self.children = [iid for iid in self.children if iid not in gone]
+
+    def move(self, iid, parent, index):
+        self.calls += 1
+        if iid in self.children:
+            self.children.remove(iid)
+        self.children.insert(index, iid)
+
+    def set_children(self, parent, *iids):
+        self.calls += 1
+        self.children = list(iids)
+
+    def get_children(self, parent=""):
+        return tuple(self.children)
+
+    def focus(self, iid=None):
+        if iid is None:
+            return self._focus
+        self._focus = iid
+
+    def selection_set(self, iid):
+        self.calls += 1
+
+    def winfo_height(self):
+        return self.height
+
+    def yview(self, *args):
+        return (0.0, 1.0)
+
+    def yview_moveto(self, fraction):
+        self.calls += 1
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, sequence, func):
+        pass
+
+class StubScrollbar:
+    def configure(self, **options):
+        pass
+
+    def set(self, first, last):
+        pass
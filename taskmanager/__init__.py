@@ -0,0 +1,9 @@
+"""Lõi quản lý công việc cá nhân, không phụ thuộc Tk.
+
+Dùng được từ giao diện (ProjectPython.py), từ dòng lệnh (`python -m taskmanager`)
+hoặc từ script/CI không có màn hình.
+"""
+from .repository import TaskConflictError, TaskRepository
+from .storage import create_storage
+
+__all__ = ["TaskConflictError", "TaskRepository", "create_storage"]
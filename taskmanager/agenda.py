@@ -0,0 +1,91 @@
+"""Chỉ mục ngày hết hạn: trả lời "những gì đến hạn từ ngày X đến ngày Y" mà không duyệt mọi công việc."""
+import bisect
+from array import array
+
+from .model import NO_DUE_ORDINAL, due_date_ordinal
+from .recurrence import occurrences, series_end, task_recurrence
+
+class DueDateIndex:
+    """Chỉ mục theo ngày hết hạn, cập nhật tăng dần khi thêm/sửa/xóa.
+
+    Công việc một lần nằm trong mảng ordinal đã sắp xếp (song song với danh
+    sách ID): một khoảng ngày là hai lần bisect, O(log N + số kết quả). Công
+    việc lặp lại được giữ như một khoảng [lần đầu, lần cuối] sắp theo ngày bắt
+    đầu; các lần lặp chỉ được sinh cho phần giao với khoảng cần tìm.
+    """
+
+    def __init__(self):
+        self._ordinals = array('l') # Ngày hết hạn (ordinal) của công việc một lần, tăng dần
+        self._ids = [] # ID song song với _ordinals
+        self._one_off = {} # id -> ordinal trong _ordinals
+        self._series_starts = [] # (ordinal lần đầu, id) của công việc lặp lại, tăng dần
+        self._series = {} # id -> (lần đầu, Recurrence, lần cuối hoặc None)
+
+    def rebuild(self, tasks):
+        pairs = []
+        self._series_starts = []
+        self._series = {}
+        for task in tasks:
+            if not self._add_series(task):
+                ordinal = due_date_ordinal(task.get("due_date"))
+                if ordinal != NO_DUE_ORDINAL:
+                    pairs.append((ordinal, task["id"]))
+        pairs.sort()
+        self._ordinals = array('l', [ordinal for ordinal, _ in pairs])
+        self._ids = [task_id for _, task_id in pairs]
+        self._one_off = {task_id: ordinal for ordinal, task_id in pairs}
+        self._series_starts.sort()
+
+    def _add_series(self, task):
+        recurrence = task_recurrence(task)
+        if recurrence is None:
+            return False
+        start, rule = recurrence
+        self._series[task["id"]] = (start, rule, series_end(start, rule))
+        bisect.insort(self._series_starts, (start, task["id"]))
+        return True
+
+    def add(self, task):
+        """Thêm hoặc cập nhật chỉ mục cho một công việc."""
+        task_id = task["id"]
+        self.remove(task_id)
+        if self._add_series(task):
+            return
+        ordinal = due_date_ordinal(task.get("due_date"))
+        if ordinal == NO_DUE_ORDINAL:
+            return
+        i = bisect.bisect_right(self._ordinals, ordinal)
+        self._ordinals.insert(i, ordinal)
+        self._ids.insert(i, task_id)
+        self._one_off[task_id] = ordinal
+
+    def remove(self, task_id):
+        ordinal = self._one_off.pop(task_id, None)
+        if ordinal is not None:
+            i = bisect.bisect_left(self._ordinals, ordinal)
+            i = self._ids.index(task_id, i) # Chỉ duyệt các công việc cùng ngày
+            del self._ordinals[i]
+            del self._ids[i]
+            return
+        series = self._series.pop(task_id, None)
+        if series is not None:
+            self._series_starts.remove((series[0], task_id))
+
+    def between(self, first, last):
+        """Danh sách (ordinal, id) đến hạn trong [first, last], kể cả từng lần lặp, theo ngày tăng dần."""
+        i = bisect.bisect_left(self._ordinals, first)
+        j = bisect.bisect_right(self._ordinals, last)
+        hits = list(zip(self._ordinals[i:j], self._ids[i:j]))
+        # Chuỗi lặp bắt đầu sau `last` không thể giao khoảng cần tìm
+        end = bisect.bisect_left(self._series_starts, (last + 1,))
+        if end:
+            for _, task_id in self._series_starts[:end]:
+                start, rule, series_last = self._series[task_id]
+                if series_last is not None and series_last < first:
+                    continue
+                hits.extend((ordinal, task_id) for ordinal in occurrences(start, rule, first, last))
+            hits.sort()
+        return hits
+
+    def __len__(self):
+        return len(self._ids) + len(self._series)
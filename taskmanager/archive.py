@@ -0,0 +1,229 @@
+"""Kho lưu trữ lạnh: công việc đã hoàn thành từ lâu được chuyển ra một file nén riêng.
+
+File là gzip JSON-lines (mỗi dòng một công việc). Mỗi lượt lưu trữ ghi nối
+thêm một đoạn gzip mới (gzip đọc liền được nhiều đoạn nối nhau), nên không
+phải viết lại các đoạn cũ. File chỉ được đọc khi thật sự cần (lọc "Hoàn thành"
+hoặc tìm kiếm cả lưu trữ); dữ liệu chính chỉ còn các công việc đang làm.
+
+Nếu một công việc có mặt ở cả dữ liệu chính và lưu trữ (vd. dừng giữa chừng
+khi đang chuyển), bản trong dữ liệu chính được dùng.
+"""
+import gzip
+import itertools
+import json
+import os
+import tempfile
+import threading # Luồng ghi lưu trữ và luồng giao diện cùng dùng
+from datetime import date
+
+from .config import ARCHIVE_FILE, DATA_FILE, FILTER_ALL
+from .model import NO_DUE_ORDINAL, Status, TaskColumns, TaskRecord, due_date_ordinal, gc_paused, normalize_text, task_to_json
+from .search import SearchIndex
+from .storage import copy_file_mode, file_lock, file_stamp, fsync_directory, sibling_path
+
+COMPLETED_FIELD = "completed_on" # Ngày chuyển sang "Hoàn thành" (dd/mm/yyyy), dùng để tính tuổi khi lưu trữ
+
+def archive_path(data_file=DATA_FILE):
+    """File lưu trữ nằm cạnh `data_file` (tasks.json -> tasks.archive.jsonl.gz)."""
+    return sibling_path(data_file, '.archive.jsonl.gz', ARCHIVE_FILE)
+
+def stamp_completion(record, old):
+    """Ghi ngày hoàn thành vào `record` khi công việc vừa chuyển sang "Hoàn thành"; bỏ đi khi mở lại."""
+    extra = record.extra or {}
+    if record.status == Status.DONE:
+        if COMPLETED_FIELD in extra or old is None: # Công việc thêm mới/nhập vào: tính tuổi theo ngày hết hạn
+            return
+        if old.status == Status.DONE:
+            completed = old.get(COMPLETED_FIELD) # Sửa công việc đã hoàn thành: giữ ngày cũ (nếu có)
+            if completed is None:
+                return
+        else:
+            completed = date.today().strftime('%d/%m/%Y')
+        record.extra = dict(extra, **{COMPLETED_FIELD: completed})
+    elif COMPLETED_FIELD in extra:
+        extra = dict(extra)
+        del extra[COMPLETED_FIELD]
+        record.extra = extra or None
+
+def encode_segment(tasks):
+    """Nén `tasks` thành một đoạn gzip JSON-lines (bytes)."""
+    lines = "".join(json.dumps(task, ensure_ascii=False, default=task_to_json) + "\n" for task in tasks)
+    return gzip.compress(lines.encode('utf-8'))
+
+def write_segment(raw, segment):
+    """Ghi một đoạn đã nén vào file nhị phân `raw` đang mở, rồi fsync."""
+    raw.write(segment)
+    raw.flush()
+    os.fsync(raw.fileno())
+
+def read_archive(path):
+    """Đọc file lưu trữ thành dict id -> task (dòng sau thay dòng trước); file chưa có là rỗng."""
+    tasks = {}
+    if os.path.exists(path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    task = json.loads(line)
+                    tasks[task["id"]] = task
+    return tasks
+
+def completed_ordinal(task):
+    """Ngày hoàn thành (ordinal); dữ liệu cũ chưa có ngày này thì lấy ngày hết hạn."""
+    ordinal = due_date_ordinal(task.get(COMPLETED_FIELD))
+    if ordinal == NO_DUE_ORDINAL:
+        return task.due_ordinal
+    return ordinal
+
+class TaskArchive:
+    """File lưu trữ gzip JSON-lines, đọc lười và giữ trong bộ nhớ đến khi file đổi.
+
+    Ghi file (nén, fsync) và dựng lại dữ liệu trong bộ nhớ đều làm ngoài
+    `_lock`; khóa chỉ được giữ khi thay dữ liệu mới vào, nên truy vấn trên
+    luồng giao diện không phải chờ luồng lưu trữ ghi xong.
+    """
+
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = path
+        self._tasks = None # id -> TaskRecord; None khi chưa đọc
+        self._stamp = None
+        self._columns = None # TaskColumns: lọc theo ưu tiên/trạng thái, đã sắp theo thứ tự mặc định
+        self._search = None # SearchIndex của các công việc lưu trữ
+        self._last = None # (dấu vết file, truy vấn, kết quả) của lần truy vấn gần nhất
+        self._lock = threading.RLock() # Giữ khi đọc/thay dữ liệu trong bộ nhớ (lấy trước khóa file)
+        self._appending = 0 # > 0 khi đang ghi nối thêm: dữ liệu trong bộ nhớ vẫn dùng được, không đọc lại file
+        self._ids = None # (dấu vết file, frozenset ID) khi chỉ cần biết công việc nào đang trong lưu trữ
+
+    @property
+    def loaded(self):
+        return self._tasks is not None
+
+    def _load(self):
+        """Đọc (lại) file nếu chưa đọc hoặc file đã bị sửa; file chưa có coi như lưu trữ rỗng."""
+        if self._tasks is not None and (self._appending or file_stamp(self.path) == self._stamp):
+            return
+        with file_lock(self.path):
+            tasks = read_archive(self.path).values()
+            stamp = file_stamp(self.path)
+        self._install(self._build(tasks), stamp)
+
+    @staticmethod
+    def _build(tasks):
+        """Dựng (công việc theo id, TaskColumns, SearchIndex) cho `tasks`; không chạm vào dữ liệu đang dùng."""
+        records = {}
+        seq = itertools.count()
+        with gc_paused():
+            for task in tasks:
+                record = TaskRecord(task)
+                record.seq = next(seq)
+                records[record.id] = record
+            search = SearchIndex()
+            search.rebuild(records.values())
+            return records, TaskColumns(records.values()), search
+
+    def _install(self, state, stamp):
+        """Thay dữ liệu trong bộ nhớ (gọi khi đang giữ `_lock`)."""
+        self._tasks, self._columns, self._search = state
+        self._stamp = stamp
+        self._last = None
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._tasks)
+
+    def get(self, task_id):
+        with self._lock:
+            self._load()
+            return self._tasks.get(task_id)
+
+    def archived_ids(self, task_ids):
+        """Các ID trong `task_ids` đang có trong lưu trữ. Chưa đọc lưu trữ thì chỉ giữ tập ID (đến khi file đổi)."""
+        stamp = file_stamp(self.path)
+        if stamp is None:
+            return set()
+        with self._lock:
+            if self._tasks is not None and (self._appending or stamp == self._stamp):
+                return {task_id for task_id in task_ids if task_id in self._tasks}
+            ids = self._ids
+        if ids is None or ids[0] != stamp:
+            with file_lock(self.path):
+                ids = (file_stamp(self.path), frozenset(read_archive(self.path)))
+            self._ids = ids
+        return {task_id for task_id in task_ids if task_id in ids[1]}
+
+    def query(self, search_term="", filter_priority=FILTER_ALL, filter_status=FILTER_ALL):
+        """Các công việc lưu trữ khớp từ khóa/bộ lọc, theo thứ tự mặc định."""
+        term = normalize_text(search_term)
+        key = (term, filter_priority, filter_status)
+        with self._lock:
+            self._load()
+            if self._last is not None and self._last[:2] == (self._stamp, key):
+                return self._last[2]
+            ids = self._search.search(term) if term else None
+            tasks = self._columns.select(filter_priority, filter_status, ids)
+            self._last = (self._stamp, key, tasks)
+            return tasks
+
+    def append(self, tasks):
+        """Ghi nối thêm một đoạn gzip chứa `tasks`; fsync trước khi trả về."""
+        if not tasks:
+            return
+        segment = encode_segment(tasks)
+        with self._lock:
+            loaded, stamp = self._tasks, self._stamp
+            self._appending += 1
+        state, new_stamp = None, None # new_stamp: dấu vết file sau khi ghi, nếu bộ nhớ khớp file trước khi ghi
+        try:
+            if loaded is not None: # Dựng sẵn dữ liệu mới thay vì đọc lại cả file sau khi ghi
+                appended = {task["id"] for task in tasks}
+                state = self._build(itertools.chain((task for task in loaded.values() if task.id not in appended),
+                                                    tasks))
+            with file_lock(self.path):
+                existed = os.path.exists(self.path)
+                up_to_date = stamp == file_stamp(self.path)
+                with open(self.path, 'ab') as raw:
+                    write_segment(raw, segment)
+                if up_to_date:
+                    new_stamp = file_stamp(self.path)
+            if not existed:
+                fsync_directory(os.path.dirname(os.path.abspath(self.path)))
+        finally:
+            with self._lock:
+                self._appending -= 1
+                if state is not None and new_stamp is not None and self._tasks is loaded: # Chưa bị đọc lại trong lúc ghi
+                    self._install(state, new_stamp)
+
+    def clear(self):
+        """Xóa toàn bộ lưu trữ."""
+        with self._lock, file_lock(self.path):
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._install(self._build([]), None)
+
+    def remove(self, task_ids):
+        """Bỏ các công việc khỏi lưu trữ (viết lại file thành một đoạn, ghi nguyên tử)."""
+        task_ids = set(task_ids)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with file_lock(self.path):
+            tasks = read_archive(self.path) # Bản mới nhất trên đĩa, đọc trong khóa
+            if not task_ids & tasks.keys():
+                return
+            tasks = [task for task_id, task in tasks.items() if task_id not in task_ids]
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as raw:
+                    write_segment(raw, encode_segment(tasks))
+                copy_file_mode(self.path, tmp_path)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            stamp = file_stamp(self.path)
+            self._ids = (stamp, frozenset(task["id"] for task in tasks))
+        fsync_directory(directory)
+        if self.loaded:
+            state = self._build(tasks)
+            with self._lock:
+                if file_stamp(self.path) == stamp: # Không ai ghi thêm trong lúc dựng
+                    self._install(state, stamp)
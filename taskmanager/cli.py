@@ -0,0 +1,258 @@
+"""Dòng lệnh cho quản lý công việc: thêm, liệt kê/lọc, sửa/xóa hàng loạt, nhập/xuất dữ liệu và đồng bộ API.
+
+Ví dụ:
+    python -m taskmanager add "Đi học" --due 20/10/2026 --priority Cao
+    python -m taskmanager add --from tasks.jsonl
+    python -m taskmanager add "Tập thể dục" --due 20/10/2026 --repeat weekly --until 31/12/2026
+    python -m taskmanager agenda --days 14
+    python -m taskmanager archive --days 30
+    python -m taskmanager list --search "báo cáo" --archive
+    python -m taskmanager list --status "Cần thực hiện" --search hoc
+    python -m taskmanager export --format csv -o tasks.csv
+    python -m taskmanager import tasks.csv
+    python -m taskmanager update --status "Đang thực hiện" --set-status "Hoàn thành"
+    python -m taskmanager delete --status "Hoàn thành" --yes
+    python -m taskmanager undo
+"""
+import argparse
+import sys
+from datetime import date
+
+from . import instrument
+from .archive import TaskArchive, archive_path
+from .config import ARCHIVE_AFTER_DAYS, DATA_FILE, FILTER_ALL, HISTORY_PERSIST, STORAGE_MODE
+from .history import UndoHistory, describe_step, history_path
+from .model import COLUMN_SORT_KEYS, NO_DUE_ORDINAL, apply_bulk_changes, due_date_ordinal
+from .recurrence import FREQUENCIES, describe_repeat, make_repeat, roll_forward
+from .repository import TaskRepository
+from .storage import create_storage
+from .transfer import detect_format, export_tasks, import_tasks, iter_task_records, normalize_record
+
+PRIORITIES = ["Cao", "Thấp"]
+STATUSES = ["Cần thực hiện", "Đang thực hiện", "Hoàn thành"]
+
+def open_repository(args):
+    # Ghi ngay từng lệnh: không cần cửa sổ gom ghi như ở giao diện. Mỗi lệnh tìm kiếm nhiều nhất một lần:
+    # quét tuần tự rẻ hơn dựng chỉ mục tìm kiếm (chỉ mục ngày chỉ được dựng khi xem lịch)
+    return TaskRepository(create_storage(args.storage, args.data_file), commit_window_ms=0,
+                          archive=TaskArchive(archive_path(args.data_file)),
+                          history=UndoHistory(history_path(args.data_file) if HISTORY_PERSIST else None),
+                          search_index=False)
+
+def report_conflicts(repo):
+    """In số công việc có thay đổi bị bỏ khi ghi vì vừa bị sửa ở nơi khác; trả về số đó."""
+    conflicts = set(repo.check_external_changes())
+    if conflicts:
+        print(f"Bỏ qua {len(conflicts)} công việc vừa bị sửa ở nơi khác.")
+    return len(conflicts)
+
+def open_input(path):
+    """Mở file nhập ('-' là stdin)."""
+    if path == "-":
+        return sys.stdin
+    return open(path, "r", encoding="utf-8", newline="")
+
+def cmd_add(args):
+    repo = open_repository(args)
+    if args.from_file:
+        with open_input(args.from_file) as stream:
+            tasks = [normalize_record(record) for record in iter_task_records(stream, detect_format(args.from_file))]
+    else:
+        if not args.title:
+            raise SystemExit("Cần nhập tiêu đề (hoặc dùng --from FILE).")
+        record = {"title": args.title, "description": args.description, "due_date": args.due,
+                  "priority": args.priority, "status": args.status}
+        if args.repeat:
+            if args.every < 1 or (args.count is not None and args.count < 1):
+                raise SystemExit("--every và --count phải lớn hơn 0.")
+            if args.until and due_date_ordinal(args.until) == NO_DUE_ORDINAL:
+                raise SystemExit(f"Ngày kết thúc lặp lại không hợp lệ (dd/mm/yyyy): {args.until!r}")
+            record["repeat"] = make_repeat(args.repeat, args.every, args.until, args.count)
+        tasks = [normalize_record(record)]
+    for task in tasks:
+        if due_date_ordinal(task.get("due_date")) == NO_DUE_ORDINAL:
+            raise SystemExit(f"Ngày hết hạn không hợp lệ (dd/mm/yyyy): {task.get('due_date')!r}")
+    repo.add_many(tasks)
+    print(f"Đã thêm {len(tasks)} công việc.")
+    return 0
+
+def cmd_import(args):
+    """Nhập theo luồng, không kiểm tra hạn (dữ liệu sao lưu có thể chứa công việc đã quá hạn)."""
+    repo = open_repository(args)
+    with open_input(args.file) as stream:
+        count = import_tasks(repo, stream, args.format or detect_format(args.file))
+    print(f"Đã nhập {count} công việc.")
+    return 0
+
+def query_tasks(args, repo=None):
+    repo = repo or open_repository(args)
+    sort = (args.sort, args.reverse) if args.sort else None
+    return repo.query(args.search.strip().lower(), args.priority, args.status, sort, include_archive=args.archive)
+
+def write_tasks(tasks, fmt, stream):
+    if fmt in ("json", "jsonl", "csv"):
+        export_tasks(tasks, stream, fmt)
+    else: # Bảng dễ đọc
+        for task in tasks:
+            print(f"{task.get('due_date', ''):<10}  {task.get('priority', ''):<4}  {task.get('status', ''):<14}  {task.get('title', '')}", file=stream)
+
+def cmd_list(args):
+    write_tasks(query_tasks(args), args.format, sys.stdout)
+    return 0
+
+def cmd_export(args):
+    tasks = query_tasks(args)
+    if args.output == "-":
+        write_tasks(tasks, args.format, sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            write_tasks(tasks, args.format, f)
+        print(f"Đã xuất {len(tasks)} công việc ra {args.output}.")
+    return 0
+
+def cmd_update(args):
+    if not (args.set_status or args.set_priority or args.shift_days):
+        raise SystemExit("Cần ít nhất một trong --set-status, --set-priority, --shift-days.")
+    repo = open_repository(args)
+    # Công việc lặp lại được đánh dấu hoàn thành thì chuyển sang lần kế tiếp
+    tasks = [roll_forward(apply_bulk_changes(task, args.set_status, args.set_priority, args.shift_days))
+             for task in query_tasks(args, repo)]
+    count = repo.update_many(tasks)
+    print(f"Đã cập nhật {count - report_conflicts(repo)} công việc.")
+    return 0
+
+def cmd_agenda(args):
+    """Các lần đến hạn trong một khoảng ngày, kể cả từng lần của công việc lặp lại."""
+    first = due_date_ordinal(args.from_date) if args.from_date else date.today().toordinal()
+    if first == NO_DUE_ORDINAL:
+        raise SystemExit(f"Ngày bắt đầu không hợp lệ (dd/mm/yyyy): {args.from_date!r}")
+    hits = open_repository(args).due_between(first, first + args.days - 1)
+    for ordinal, task in hits:
+        print(f"{date.fromordinal(ordinal):%d/%m/%Y}  {task.get('priority', ''):<4}  {task.get('status', ''):<14}  "
+              f"{task.get('title', '')}  {describe_repeat(task.get('repeat'))}".rstrip())
+    return 0
+
+def cmd_delete(args):
+    repo = open_repository(args)
+    task_ids = [task["id"] for task in query_tasks(args, repo)]
+    if not args.yes:
+        print(f"Sẽ xóa {len(task_ids)} công việc; thêm --yes để xác nhận.")
+        return 1
+    count = repo.delete_many(task_ids)
+    print(f"Đã xóa {count - report_conflicts(repo)} công việc.")
+    return 0
+
+def cmd_undo(args):
+    repo = open_repository(args)
+    step = repo.redo() if args.command == "redo" else repo.undo()
+    if step is None:
+        print("Không có thao tác để " + ("làm lại." if args.command == "redo" else "hoàn tác."))
+        return 1
+    print(("Đã làm lại: " if args.command == "redo" else "Đã hoàn tác: ") + describe_step(step) + ".")
+    conflicts = repo.check_external_changes()
+    if conflicts:
+        print(f"Bỏ qua {len(conflicts)} công việc đã bị sửa ở nơi khác sau thao tác này.")
+    return 0
+
+def cmd_archive(args):
+    count = open_repository(args).archive_completed(args.days)
+    print(f"Đã chuyển {count} công việc sang lưu trữ.")
+    return 0
+
+def cmd_sync(args):
+    import threading
+    from .sync import apply_api_sync, sync_api_tasks, sync_state_path # Chỉ tải `requests` khi cần đồng bộ
+    state_path = sync_state_path(args.data_file) # Mỗi file dữ liệu có ánh xạ ID từ xa riêng
+    result = sync_api_tasks(threading.Event(), lambda text: None, state_path=state_path)
+    added, updated = apply_api_sync(result, open_repository(args), state_path=state_path)
+    print(f"Đồng bộ xong: thêm {added}, cập nhật {updated}, không đổi {result['unchanged']}.")
+    return 0
+
+def add_filter_arguments(parser):
+    parser.add_argument("--search", default="", help="Tìm trong tiêu đề/mô tả (không phân biệt dấu)")
+    parser.add_argument("--priority", default=FILTER_ALL, choices=[FILTER_ALL] + PRIORITIES)
+    parser.add_argument("--status", default=FILTER_ALL, choices=[FILTER_ALL] + STATUSES)
+    parser.add_argument("--sort", choices=sorted(COLUMN_SORT_KEYS), help="Sắp xếp theo cột thay vì thứ tự mặc định")
+    parser.add_argument("--reverse", action="store_true")
+    parser.add_argument("--archive", action="store_true",
+                        help="Tìm cả trong lưu trữ (lọc --status \"Hoàn thành\" thì luôn có lưu trữ)")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="taskmanager", description="Quản lý công việc cá nhân (không cần giao diện).")
+    parser.add_argument("--data-file", default=DATA_FILE, help="File dữ liệu (mặc định: %(default)s)")
+    parser.add_argument("--storage", default=STORAGE_MODE, choices=["json", "journal", "sqlite"])
+    parser.add_argument("--instrument", action="store_true", help="Đo thời gian từng công đoạn và in p50/p95/p99 ra stderr")
+    parser.add_argument("--metrics", metavar="FILE", help="Ghi số liệu đo được ra FILE (JSON); ngầm bật --instrument")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Thêm một hoặc nhiều công việc")
+    add.add_argument("title", nargs="?")
+    add.add_argument("--description", default="")
+    add.add_argument("--due", default="", help="Ngày hết hạn dd/mm/yyyy")
+    add.add_argument("--priority", default="Cao", choices=PRIORITIES)
+    add.add_argument("--status", default="Cần thực hiện", choices=STATUSES)
+    add.add_argument("--from", dest="from_file", metavar="FILE", help="Thêm hàng loạt từ file JSON/JSON-lines ('-' là stdin)")
+    add.add_argument("--repeat", choices=FREQUENCIES, help="Lặp lại hằng ngày/tuần/tháng từ ngày hết hạn")
+    add.add_argument("--every", type=int, default=1, help="Khoảng cách giữa hai lần lặp (mặc định: 1)")
+    add.add_argument("--until", help="Ngày lặp cuối cùng dd/mm/yyyy")
+    add.add_argument("--count", type=int, help="Số lần lặp")
+    add.set_defaults(func=cmd_add)
+
+    agenda = commands.add_parser("agenda", help="Lịch các lần đến hạn (kể cả công việc lặp lại)")
+    agenda.add_argument("--from", dest="from_date", metavar="DD/MM/YYYY", help="Ngày bắt đầu (mặc định: hôm nay)")
+    agenda.add_argument("--days", type=int, default=7, help="Số ngày (mặc định: %(default)s)")
+    agenda.set_defaults(func=cmd_agenda)
+
+    list_cmd = commands.add_parser("list", help="Liệt kê/lọc công việc")
+    add_filter_arguments(list_cmd)
+    list_cmd.add_argument("--format", default="table", choices=["table", "json", "jsonl", "csv"])
+    list_cmd.set_defaults(func=cmd_list)
+
+    export = commands.add_parser("export", help="Xuất công việc ra file")
+    add_filter_arguments(export)
+    export.add_argument("--format", default="json", choices=["json", "jsonl", "csv"])
+    export.add_argument("-o", "--output", default="-", help="File đích ('-' là stdout)")
+    export.set_defaults(func=cmd_export)
+
+    import_cmd = commands.add_parser("import", help="Nhập công việc từ file CSV/JSON/JSON-lines (theo luồng)")
+    import_cmd.add_argument("file", help="File nguồn ('-' là stdin)")
+    import_cmd.add_argument("--format", choices=["json", "jsonl", "csv"], help="Mặc định: đoán theo đuôi file")
+    import_cmd.set_defaults(func=cmd_import)
+
+    update = commands.add_parser("update", help="Sửa hàng loạt các công việc khớp bộ lọc")
+    add_filter_arguments(update)
+    update.add_argument("--set-status", choices=STATUSES)
+    update.add_argument("--set-priority", choices=PRIORITIES)
+    update.add_argument("--shift-days", type=int, default=0, help="Dời ngày hết hạn (số ngày, có thể âm)")
+    update.set_defaults(func=cmd_update)
+
+    delete = commands.add_parser("delete", help="Xóa hàng loạt các công việc khớp bộ lọc")
+    add_filter_arguments(delete)
+    delete.add_argument("--yes", action="store_true", help="Xác nhận xóa")
+    delete.set_defaults(func=cmd_delete)
+
+    undo = commands.add_parser("undo", help="Hoàn tác thao tác gần nhất (cần TASK_HISTORY_PERSIST, mặc định bật)")
+    undo.set_defaults(func=cmd_undo)
+    redo = commands.add_parser("redo", help="Làm lại thao tác vừa hoàn tác")
+    redo.set_defaults(func=cmd_undo)
+
+    archive = commands.add_parser("archive", help="Chuyển công việc đã hoàn thành từ lâu sang lưu trữ nén")
+    archive.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                         help="Hoàn thành quá số ngày này (mặc định: %(default)s)")
+    archive.set_defaults(func=cmd_archive)
+
+    sync = commands.add_parser("sync", help="Đồng bộ từ API todos")
+    sync.set_defaults(func=cmd_sync)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.instrument or args.metrics:
+        instrument.enable()
+    try:
+        return args.func(args)
+    finally:
+        if instrument.enabled:
+            print(instrument.format_report(), file=sys.stderr)
+            if args.metrics:
+                instrument.dump_json(args.metrics)
@@ -0,0 +1,42 @@
+"""Cấu hình và hằng số dùng chung cho phần lõi và giao diện."""
+import os
+
+DATA_FILE = 'tasks.json'
+API_URL = os.environ.get("TASK_API_URL", "https://jsonplaceholder.typicode.com/todos") # API mẫu để lấy dữ liệu (có thể trỏ tới máy chủ thử nghiệm cục bộ)
+API_CONNECT_TIMEOUT = 5 # Giây chờ kết nối
+API_READ_TIMEOUT = 15 # Giây chờ dữ liệu
+API_RETRIES = 3 # Số lần thử lại khi lỗi kết nối/5xx
+API_BACKOFF_SECONDS = 0.5 # Thời gian chờ tăng dần giữa các lần thử lại
+API_PAGE_SIZE = 50 # Số mục mỗi trang khi tải (_start/_limit)
+SYNC_STATE_FILE = 'api_sync.json' # ETag/Last-Modified và ánh xạ ID từ xa -> ID công việc
+FILTER_ALL = "Tất cả" # Giá trị bộ lọc không giới hạn
+STORAGE_MODE = os.environ.get("TASK_STORAGE", "json") # "json" (ghi lại cả file), "journal" (nhật ký chỉ ghi thêm) hoặc "sqlite"
+JOURNAL_FILE = 'tasks.journal.jsonl' # Nhật ký thay đổi khi dùng chế độ "journal"
+JOURNAL_COMPACT_BYTES = int(os.environ.get("TASK_JOURNAL_COMPACT_BYTES", 1024 * 1024)) # Gộp nhật ký khi vượt quá kích thước này
+SQLITE_FILE = 'tasks.db' # CSDL khi dùng chế độ "sqlite"
+BACKUP_SUFFIX = '.bak' # Bản sao lưu tốt gần nhất, dùng để khôi phục khi file bị hỏng
+LOCK_SUFFIX = '.lock' # File khóa dùng chung giữa các tiến trình cùng mở một file dữ liệu
+WATCH_INTERVAL_MS = 1000 # Chu kỳ kiểm tra file dữ liệu có bị tiến trình khác sửa không
+VIRTUAL_LIST_THRESHOLD = int(os.environ.get("TASK_VIRTUAL_THRESHOLD", 2000)) # Nhiều hàng hơn mức này thì chỉ hiển thị vùng nhìn thấy
+VIRTUAL_BUFFER_ROWS = 10 # Số hàng dự phòng ngoài vùng nhìn thấy ở chế độ danh sách ảo
+REMINDER_FILE = 'reminders.json' # Các nhắc nhở đã hiện (id -> ngày hết hạn)
+REMINDER_DAYS_BEFORE = 3 # Nhắc khi còn từ 0 đến 3 ngày
+REMINDER_WINDOW_DAYS = 31 # Lịch nhắc chỉ giữ các công việc đến hạn trong chừng này ngày tới, hết thì lấy tiếp từ chỉ mục ngày
+SEARCH_DEBOUNCE_MS = 200 # Chờ người dùng ngừng gõ trong khoảng này rồi mới tìm kiếm
+ROW_HEIGHT = 25 # Chiều cao mỗi hàng Treeview (px)
+COMMIT_WINDOW_MS = int(os.environ.get("TASK_COMMIT_WINDOW_MS", 200)) # Gom các thay đổi trong khoảng này thành một lần ghi (0 = ghi ngay)
+ARCHIVE_FILE = 'tasks.archive.jsonl.gz' # Lưu trữ lạnh: công việc đã hoàn thành từ lâu (gzip JSON-lines)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("TASK_ARCHIVE_AFTER_DAYS", 30)) # Hoàn thành quá số ngày này thì được chuyển sang lưu trữ
+ARCHIVE_INTERVAL_MS = 60 * 60 * 1000 # Chu kỳ chạy lưu trữ ở giao diện
+HISTORY_FILE = 'tasks.history.jsonl' # Lịch sử hoàn tác/làm lại (chỉ các công việc đã đổi của mỗi thao tác)
+HISTORY_PERSIST = os.environ.get("TASK_HISTORY_PERSIST", "1") not in ("", "0") # Ghi lịch sử ra file để dùng lại sau khi mở lại
+HISTORY_MAX_STEPS = 100 # Số thao tác tối đa có thể hoàn tác
+HISTORY_MAX_BYTES = int(os.environ.get("TASK_HISTORY_MAX_BYTES", 64 * 1024 * 1024)) # Giới hạn bộ nhớ ước tính của lịch sử
+HISTORY_MAX_STEP_BYTES = int(os.environ.get("TASK_HISTORY_MAX_STEP_BYTES", 16 * 1024 * 1024)) # Thao tác lớn hơn mức này (vd. nhập cả file) thì không hoàn tác được
+HISTORY_COMPACT_BYTES = 4 * 1024 * 1024 # Viết lại file lịch sử (bỏ các bước đã bị bỏ) khi vượt quá kích thước này
+QUERY_CACHE_SIZE = 16 # Số kết quả truy vấn (tìm kiếm/lọc/sắp xếp) gần nhất được giữ lại
+INSTRUMENT_ENABLED = os.environ.get("TASK_INSTRUMENT", "") not in ("", "0") # Đo thời gian/số lượng theo công đoạn (taskmanager.instrument)
+INSTRUMENT_SLOW_MS = float(os.environ.get("TASK_SLOW_MS", 250)) # Công đoạn chậm hơn mức này thì lần sau được ghi cProfile
+INSTRUMENT_PROFILE_DIR = os.environ.get("TASK_PROFILE_DIR", ".") # Nơi ghi các file profile-*.prof
+INSTRUMENT_DUMP_FILE = 'metrics.json' # Số liệu đo được ghi định kỳ ra file này
+INSTRUMENT_DUMP_MS = 60000 # Chu kỳ ghi số liệu (ms)
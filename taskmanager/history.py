@@ -0,0 +1,292 @@
+"""Lịch sử hoàn tác/làm lại: mỗi thao tác chỉ lưu các công việc nó đã đổi, không chép lại cả dữ liệu.
+
+Một bước (Step) là danh sách (id, trước, sau) của các công việc bị thao tác
+thay đổi; None nghĩa là không có (trước None = vừa thêm, sau None = vừa xóa).
+Hoàn tác đưa từng công việc về bản "trước", làm lại đưa về bản "sau": chi phí
+tỉ lệ với số công việc đã đổi, kể cả khi xóa hàng nghìn công việc một lúc.
+
+Các bản "trước"/"sau" là TaskRecord dùng chung với kho (không sao chép).
+Lịch sử bị giới hạn theo số bước và theo dung lượng ước tính; bước cũ nhất
+bị bỏ trước. Một thao tác lớn hơn `max_step_bytes` (vd. nhập hàng trăm nghìn
+công việc) không được ghi thành bước: lịch sử được xóa hết (không hoàn tác
+được qua thao tác đó) thay vì giữ và ghi ra file bản sao của cả dữ liệu.
+Nếu có `path`, lịch sử được ghi nối thêm vào file JSON-lines (như nhật ký) để dùng lại sau khi mở lại ứng dụng hoặc từ dòng lệnh. File chỉ
+được đọc khi cần đến các bước (hoàn tác/làm lại); thêm bước mới chỉ ghi nối thêm.
+"""
+import json
+import logging
+import os
+import tempfile
+import uuid
+from collections import namedtuple
+
+from .config import (DATA_FILE, HISTORY_COMPACT_BYTES, HISTORY_FILE, HISTORY_MAX_BYTES, HISTORY_MAX_STEP_BYTES,
+                     HISTORY_MAX_STEPS)
+from .model import TaskRecord, task_rev, task_to_json
+from .storage import copy_file_mode, file_lock, fsync_directory, sibling_path
+
+logger = logging.getLogger(__name__)
+
+# changes: danh sách (id, TaskRecord trước hoặc None, TaskRecord sau hoặc None); size: dung lượng ước tính (byte)
+Step = namedtuple("Step", "id changes size")
+
+ROW_BYTES = 250 # Ước lượng bộ nhớ cho một TaskRecord, chưa tính tiêu đề/mô tả
+
+def history_path(data_file=DATA_FILE):
+    """File lịch sử nằm cạnh `data_file` (tasks.json -> tasks.history.jsonl)."""
+    return sibling_path(data_file, '.history.jsonl', HISTORY_FILE)
+
+def record_size(task):
+    if task is None:
+        return 0
+    return ROW_BYTES + len(task.title or "") + len(task.description or "")
+
+def make_step(changes, step_id=None):
+    size = sum(record_size(before) + record_size(after) for _, before, after in changes)
+    return Step(step_id or uuid.uuid4().hex[:12], changes, size)
+
+def describe_step(step):
+    """Mô tả ngắn một bước, ví dụ "xóa 1200 công việc" hoặc "thêm 2, sửa 1 công việc"."""
+    added = sum(1 for _, before, after in step.changes if before is None and after is not None)
+    removed = sum(1 for _, before, after in step.changes if before is not None and after is None)
+    edited = len(step.changes) - added - removed
+    parts = [f"{verb} {count}" for verb, count in (("thêm", added), ("sửa", edited), ("xóa", removed)) if count]
+    return ", ".join(parts) + " công việc"
+
+def _load_record(task):
+    return None if task is None else TaskRecord(task)
+
+def _with_rev(record, rev):
+    record = record.copy()
+    record.rev = rev
+    return record
+
+class UndoHistory:
+    """Hai ngăn xếp bước hoàn tác/làm lại, giới hạn theo `max_steps`, `max_bytes` và `max_step_bytes`."""
+
+    def __init__(self, path=None, max_steps=HISTORY_MAX_STEPS, max_bytes=HISTORY_MAX_BYTES,
+                 compact_bytes=HISTORY_COMPACT_BYTES, max_step_bytes=HISTORY_MAX_STEP_BYTES):
+        self.path = path
+        self.max_steps = max_steps
+        self.max_bytes = max_bytes
+        self.max_step_bytes = min(max_step_bytes, max_bytes)
+        self.compact_bytes = compact_bytes
+        self._undo = [] # Bước mới nhất ở cuối
+        self._redo = [] # Bước vừa hoàn tác gần nhất ở cuối
+        self._bytes = 0
+        self._compacted_size = 0 # Kích thước file sau lần gộp gần nhất
+        self._loaded = path is None # File chỉ được đọc ở lần đầu cần đến các bước
+        self._may_redo = True # Khi chưa đọc file: False nếu chắc chắn không còn bước để làm lại (đã thêm bước mới)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load()
+
+    # --- Ngăn xếp ---
+    def can_undo(self):
+        self._ensure_loaded()
+        return bool(self._undo)
+
+    def can_redo(self):
+        self._ensure_loaded()
+        return bool(self._redo)
+
+    def may_undo(self):
+        """Như can_undo() nhưng không đọc file: chưa đọc thì coi là có nếu file lịch sử không rỗng."""
+        if self._loaded:
+            return bool(self._undo)
+        return self._has_file()
+
+    def may_redo(self):
+        """Như can_redo() nhưng không đọc file."""
+        if self._loaded:
+            return bool(self._redo)
+        return self._may_redo and self._has_file()
+
+    def _has_file(self):
+        try:
+            return os.path.getsize(self.path) > 0
+        except OSError:
+            return False
+
+    def peek_undo(self):
+        self._ensure_loaded()
+        return self._undo[-1] if self._undo else None
+
+    def peek_redo(self):
+        self._ensure_loaded()
+        return self._redo[-1] if self._redo else None
+
+    def push(self, changes):
+        """Thêm bước mới cho một thao tác; các bước đang chờ làm lại bị bỏ.
+
+        Nếu file chưa được đọc thì chỉ ghi nối thêm: lần đọc sau sẽ dựng lại cả bước này.
+        """
+        if not changes:
+            return
+        step = make_step(changes)
+        if step.size > self.max_step_bytes:
+            logger.info("Thao tác đổi %d công việc (khoảng %d byte) vượt giới hạn một bước; xóa lịch sử hoàn tác",
+                        len(changes), step.size)
+            self.clear()
+            return
+        if self._loaded:
+            self._push(step)
+        self._may_redo = False
+        self._append({"push": step.id, "changes": step.changes})
+
+    def _push(self, step):
+        self._bytes -= sum(s.size for s in self._redo)
+        self._redo.clear()
+        self._undo.append(step)
+        self._bytes += step.size
+        self._trim()
+
+    def clear(self):
+        """Bỏ mọi bước, cả trong file (không cần đọc file trước)."""
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+        self._loaded = True
+        if self.path is not None and os.path.exists(self.path):
+            self._compact()
+
+    def _trim(self):
+        """Bỏ các bước cũ nhất khi vượt giới hạn; bước mới nhất luôn được giữ."""
+        while len(self._undo) > 1 and (len(self._undo) > self.max_steps or self._bytes > self.max_bytes):
+            self._bytes -= self._undo.pop(0).size
+
+    def undone(self, step, written=None):
+        """Báo bước `step` (đỉnh ngăn hoàn tác) đã được hoàn tác; `written` là id -> bản kho vừa ghi (hoặc None)."""
+        self._ensure_loaded()
+        if self._move(self._undo, self._redo, step.id):
+            self._append({"undo": step.id, "revs": self._rebase_written(step, True, written or {})})
+
+    def redone(self, step, written=None):
+        """Báo bước `step` (đỉnh ngăn làm lại) đã được làm lại."""
+        self._ensure_loaded()
+        if self._move(self._redo, self._undo, step.id):
+            self._append({"redo": step.id, "revs": self._rebase_written(step, False, written or {})})
+
+    def _rebase(self, step, undo, replace, task_ids):
+        """Sau khi hoàn tác/làm lại `step`, thay các bản mà lần đi tiếp theo sẽ so rev bằng replace(id, bản cũ).
+
+        Với mỗi công việc trong `task_ids`: bản của chính `step` cho lần đi
+        ngược lại, và bản của bước kế tiếp cùng chiều (gần đỉnh ngăn nhất) có
+        chứa công việc đó.
+        """
+        self._replace_side(step, not undo, replace, set(task_ids))
+        remaining = set(task_ids)
+        for other in reversed(self._undo if undo else self._redo):
+            if not remaining:
+                break
+            self._replace_side(other, undo, replace, remaining)
+
+    @staticmethod
+    def _replace_side(step, after_side, replace, task_ids):
+        """Thay bản "sau" ở thay đổi cuối (after_side) hoặc bản "trước" ở thay đổi đầu của mỗi công việc trong
+        `task_ids`; các công việc đã thay được bỏ khỏi `task_ids`."""
+        changes = step.changes
+        for i in (reversed(range(len(changes))) if after_side else range(len(changes))):
+            task_id, before, after = changes[i]
+            if task_id not in task_ids:
+                continue
+            task_ids.discard(task_id)
+            if after_side:
+                changes[i] = (task_id, before, replace(task_id, after))
+            else:
+                changes[i] = (task_id, replace(task_id, before), after)
+
+    def _rebase_written(self, step, undo, written):
+        """Dùng các bản kho vừa ghi (rev mới) trong lịch sử; trả về id -> rev để ghi vào file."""
+        revs = {task_id: task_rev(record) for task_id, record in written.items() if record is not None}
+        self._rebase(step, undo, lambda task_id, old: written[task_id], revs)
+        return revs
+
+    def _rebase_revs(self, step, undo, revs):
+        """Như _rebase_written khi đọc lại file: chỉ có rev mới, nội dung giữ nguyên."""
+        self._rebase(step, undo, lambda task_id, old: _with_rev(old, revs[task_id]) if old is not None else old, revs)
+
+    @staticmethod
+    def _move(source, target, step_id):
+        if not source or source[-1].id != step_id:
+            return False
+        target.append(source.pop())
+        return True
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._undo)
+
+    @property
+    def size(self):
+        """Dung lượng ước tính (byte) của mọi bước đang giữ."""
+        self._ensure_loaded()
+        return self._bytes
+
+    # --- Ghi file ---
+    def _load(self):
+        """Dựng lại hai ngăn xếp từ file; bỏ dòng cuối bị ghi dở."""
+        if not os.path.exists(self.path):
+            return
+        good_offset = 0
+        with file_lock(self.path):
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_offset += len(line)
+                    if "push" in record:
+                        changes = [(task_id, _load_record(before), _load_record(after))
+                                   for task_id, before, after in record["changes"]]
+                        self._push(make_step(changes, record["push"]))
+                    elif "undo" in record:
+                        if self._move(self._undo, self._redo, record["undo"]):
+                            self._rebase_revs(self._redo[-1], True, record.get("revs", {}))
+                    elif "redo" in record:
+                        if self._move(self._redo, self._undo, record["redo"]):
+                            self._rebase_revs(self._undo[-1], False, record.get("revs", {}))
+            if good_offset < os.path.getsize(self.path):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(good_offset)
+        self._compacted_size = good_offset
+
+    def _append(self, record):
+        if self.path is None:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=task_to_json) + "\n"
+        with file_lock(self.path):
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                size = f.tell()
+        # Gộp khi file lớn gấp đôi lần gộp trước: các bước đã bị bỏ không còn chiếm chỗ trên đĩa.
+        # Chưa đọc file thì không biết lần gộp trước: chỉ gộp khi file vượt xa giới hạn bộ nhớ của lịch sử
+        if size > max(self.compact_bytes, 2 * (self._compacted_size if self._loaded else self.max_bytes)):
+            self._ensure_loaded()
+            self._compact()
+
+    def _compact(self):
+        """Viết lại file chỉ với các bước đang giữ (ghi nguyên tử)."""
+        chronological = self._undo + self._redo[::-1]
+        lines = [{"push": step.id, "changes": step.changes} for step in chronological]
+        lines += [{"undo": step.id} for step in self._redo]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with file_lock(self.path):
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for record in lines:
+                        f.write(json.dumps(record, ensure_ascii=False, default=task_to_json) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._compacted_size = f.tell()
+                copy_file_mode(self.path, tmp_path)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        fsync_directory(directory)
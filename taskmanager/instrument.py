@@ -0,0 +1,190 @@
+"""Đo thời gian và số lượng theo từng công đoạn (tùy chọn), để biết ứng dụng chậm ở đâu.
+
+Bật bằng biến môi trường TASK_INSTRUMENT=1 hoặc `enable()` (CLI: --instrument,
+giao diện: python ProjectPython.py --instrument). Khi tắt, mỗi điểm đo chỉ tốn
+một phép kiểm tra.
+
+    with instrument.span("repo.query"):
+        ...
+    instrument.count("view.rows_rendered", n)
+
+Kết quả nằm trong các histogram trong bộ nhớ (p50/p95/p99 qua `snapshot()`),
+có thể ghi ra JSON bằng `dump_json()`. Công đoạn nào chậm hơn INSTRUMENT_SLOW_MS
+thì lần chạy kế tiếp của nó được ghi lại bằng cProfile (mỗi công đoạn một lần).
+"""
+import cProfile
+import functools
+import io
+import logging
+import math
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import INSTRUMENT_ENABLED, INSTRUMENT_PROFILE_DIR, INSTRUMENT_SLOW_MS
+from .model import due_date_ordinal
+
+logger = logging.getLogger(__name__)
+
+enabled = INSTRUMENT_ENABLED
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+class Histogram:
+    """Histogram thang log (mỗi bậc rộng ~19%): bộ nhớ cố định dù ghi bao nhiêu mẫu."""
+
+    BUCKETS_PER_OCTAVE = 4
+
+    def __init__(self):
+        self.buckets = {} # chỉ số bậc -> số mẫu
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        index = math.floor(math.log2(value) * self.BUCKETS_PER_OCTAVE) if value > 0 else None
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, p):
+        """Giá trị (cận trên của bậc) mà p% số mẫu không vượt quá."""
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets, key=lambda i: -math.inf if i is None else i):
+            seen += self.buckets[index]
+            if seen >= rank:
+                if index is None:
+                    return 0.0
+                return min(self.max, 2 ** ((index + 1) / self.BUCKETS_PER_OCTAVE))
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "total": round(self.total, 3),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+_lock = threading.Lock() # Luồng giao diện, luồng ghi nền và luồng tải API cùng ghi số liệu
+_timings = {} # tên công đoạn -> Histogram (ms)
+_counts = {} # tên số đo -> Histogram (giá trị mỗi lần)
+_profile_pending = set() # Công đoạn sẽ được chạy dưới cProfile ở lần tới
+_profiled = set() # Công đoạn đã có bản cProfile (chỉ ghi một lần mỗi công đoạn)
+
+def _record(table, name, value):
+    with _lock:
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table[name] = Histogram()
+        histogram.record(value)
+
+def observe(name, elapsed_ms):
+    """Ghi thời gian (ms) của một công đoạn đã được đo ở nơi khác (vd. bắt đầu và kết thúc ở hai hàm khác nhau)."""
+    if enabled:
+        _record(_timings, name, elapsed_ms)
+
+def count(name, value):
+    """Ghi một số đo (số hàng quét, số hàng hiển thị, số byte ghi...)."""
+    if enabled:
+        _record(_counts, name, value)
+
+def profile_next(name):
+    """Chạy lần kế tiếp của công đoạn `name` dưới cProfile."""
+    with _lock:
+        _profile_pending.add(name)
+
+@contextmanager
+def span(name):
+    """Đo thời gian một công đoạn (ms)."""
+    if not enabled:
+        yield
+        return
+    with _lock:
+        profiling = name in _profile_pending and threading.current_thread() is threading.main_thread()
+        if profiling:
+            _profile_pending.discard(name)
+    profiler = cProfile.Profile() if profiling else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        elapsed = (time.perf_counter() - start) * 1000
+        _record(_timings, name, elapsed)
+        if profiler is not None:
+            _save_profile(name, profiler, elapsed)
+        elif elapsed >= INSTRUMENT_SLOW_MS and name not in _profiled:
+            logger.info("%s chậm (%.0f ms): sẽ ghi cProfile ở lần chạy tới", name, elapsed)
+            with _lock:
+                _profiled.add(name)
+                _profile_pending.add(name)
+
+def timed(name):
+    """Decorator: đo mỗi lần gọi hàm như một công đoạn."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _save_profile(name, profiler, elapsed):
+    """Ghi file .prof (xem bằng snakeviz/pstats) và in 15 hàm tốn thời gian nhất vào log."""
+    path = os.path.join(INSTRUMENT_PROFILE_DIR, f"profile-{name}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+    logger.info("cProfile %s (%.0f ms) đã ghi vào %s\n%s", name, elapsed, path, out.getvalue())
+
+def snapshot():
+    """Toàn bộ số liệu hiện tại (dùng cho bảng gỡ lỗi và file JSON)."""
+    with _lock:
+        timings = {name: h.snapshot() for name, h in sorted(_timings.items())}
+        counts = {name: h.snapshot() for name, h in sorted(_counts.items())}
+    cache = due_date_ordinal.cache_info()
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "timings_ms": timings,
+        "counts": counts,
+        "caches": {"due_date_ordinal": {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize}},
+    }
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _counts.clear()
+
+def dump_json(path):
+    """Ghi snapshot() ra file JSON."""
+    from .storage import atomic_write_json # storage cũng ghi số liệu vào module này
+    atomic_write_json(path, snapshot())
+
+def format_report(data=None):
+    """Bảng văn bản p50/p95/p99 cho các công đoạn (dùng trong log/CLI)."""
+    data = data or snapshot()
+    lines = [f"{'công đoạn':<28} {'lần':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+    for section in ("timings_ms", "counts"):
+        for name, h in data[section].items():
+            lines.append(f"{name:<28} {h['count']:>7} " + " ".join(f"{h[key]:>9.2f}" for key in ("p50", "p95", "p99", "max")))
+    return "\n".join(lines)
@@ -0,0 +1,283 @@
+"""Mô hình công việc: kiểm tra ngày, bản ghi công việc gọn, lọc và sắp xếp."""
+import re # Để kiểm tra định dạng ngày và tìm kiếm
+import enum
+import functools
+import gc
+import itertools
+import operator
+import sys
+import unicodedata # Bỏ dấu tiếng Việt khi tìm kiếm
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from .config import FILTER_ALL
+
+def is_valid_date(date_str):
+    """Kiểm tra định dạng ngày dd/mm/yyyy và phải lớn hơn hoặc bằng ngày hiện tại."""
+    if not re.match(r"^\d{2}/\d{2}/\d{4}$", date_str):
+        return False
+    try:
+        input_date = datetime.strptime(date_str, '%d/%m/%Y').date()
+        today = datetime.now().date()
+        return input_date >= today
+    except ValueError:
+        return False
+
+class _AccentFolding(dict):
+    """Bảng str.translate: mỗi ký tự không phải ASCII -> dạng bỏ dấu, tính lần đầu gặp rồi giữ lại."""
+
+    def __missing__(self, code):
+        text = unicodedata.normalize('NFD', chr(code)).replace('đ', 'd')
+        folded = self[code] = ''.join(ch for ch in text if not unicodedata.combining(ch))
+        return folded
+
+_ACCENT_FOLDING = _AccentFolding()
+
+def normalize_text(text):
+    """Chuẩn hóa để tìm kiếm: chữ thường, bỏ dấu tiếng Việt ("Đi học" -> "di hoc")."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return text.translate(_ACCENT_FOLDING) # Nhanh gấp đôi NFD cả chuỗi rồi lọc từng ký tự
+
+NO_DUE_ORDINAL = date(2100, 1, 1).toordinal() # Ngày mặc định rất xa để xếp cuối
+
+@functools.lru_cache(maxsize=8192) # Ngày hết hạn lặp lại rất nhiều giữa các công việc
+def due_date_ordinal(date_str):
+    """Ngày hết hạn dd/mm/yyyy dạng số nguyên (ordinal) để so sánh/đánh chỉ mục; ngày lỗi được xếp cuối."""
+    if not isinstance(date_str, str) or not re.match(r"^\d{1,2}/\d{1,2}/\d{4}$", date_str):
+        return NO_DUE_ORDINAL
+    day, month, year = date_str.split('/')
+    try:
+        return date(int(year), int(month), int(day)).toordinal()
+    except ValueError:
+        return NO_DUE_ORDINAL
+
+def shift_due_date(date_str, days):
+    """Dời ngày hết hạn dd/mm/yyyy thêm `days` ngày; ngày không hợp lệ giữ nguyên."""
+    ordinal = due_date_ordinal(date_str)
+    if ordinal == NO_DUE_ORDINAL:
+        return date_str
+    return (date.fromordinal(ordinal) + timedelta(days=days)).strftime('%d/%m/%Y')
+
+def apply_bulk_changes(task, status=None, priority=None, shift_days=0):
+    """Bản sao công việc sau khi đổi trạng thái/ưu tiên và dời hạn (dùng cho thao tác hàng loạt)."""
+    task = dict(task)
+    if status:
+        task["status"] = status
+    if priority:
+        task["priority"] = priority
+    if shift_days:
+        task["due_date"] = shift_due_date(task.get("due_date"), shift_days)
+    return task
+
+class Priority(enum.IntEnum):
+    """Độ ưu tiên; sắp xếp theo PRIORITY_SORT_RANK (Cao trước)."""
+    HIGH = 0
+    LOW = 1
+    UNKNOWN = 2 # Ưu tiên lạ hoặc trống: không khớp bộ lọc "Cao"/"Thấp", xếp như "Thấp"
+
+class Status(enum.IntEnum):
+    """Trạng thái; giá trị cũng là thứ tự sắp xếp."""
+    TODO = 0
+    IN_PROGRESS = 1
+    DONE = 2
+    UNKNOWN = 99 # Trạng thái không khớp: xếp cuối
+
+PRIORITY_LABELS = {Priority.HIGH: "Cao", Priority.LOW: "Thấp"}
+STATUS_LABELS = {Status.TODO: "Cần thực hiện", Status.IN_PROGRESS: "Đang thực hiện", Status.DONE: "Hoàn thành"}
+PRIORITY_BY_LABEL = {label: code for code, label in PRIORITY_LABELS.items()}
+STATUS_BY_LABEL = {label: code for code, label in STATUS_LABELS.items()}
+
+PRIORITY_SORT_RANK = (0, 1, 1) # Theo mã Priority
+
+def priority_rank(priority):
+    """Thứ tự sắp xếp của một nhãn ưu tiên (nhãn lạ xếp như "Thấp")."""
+    return PRIORITY_SORT_RANK[PRIORITY_BY_LABEL.get(priority, Priority.UNKNOWN)]
+
+class TaskRecord(Mapping):
+    """Một công việc trong bộ nhớ, gọn hơn dict: __slots__, mã số cho ưu tiên/trạng thái, ngày tính sẵn dạng ordinal.
+
+    Vẫn đọc được như dict (task["title"], task.get(...)) nhưng chỉ để đọc;
+    muốn sửa thì sao ra dict bằng `to_dict()`. Chỉ đổi về dict khi ghi ra
+    ngoài (json với default=task_to_json). Ưu tiên/trạng thái lạ được giữ
+    nguyên chuỗi gốc trong `extra` (mã UNKNOWN; ưu tiên lạ được xếp như "Thấp").
+    `rev` là số phiên bản của công việc, tăng mỗi lần sửa (None với dữ liệu cũ).
+    """
+
+    __slots__ = ("id", "title", "description", "due_date", "priority", "status", "rev", "due_ordinal", "seq", "extra")
+    FIELDS = ("id", "title", "description", "due_date", "priority", "status", "rev") # Thứ tự khóa như trong tasks.json
+    _PLAIN_FIELDS = frozenset(("id", "title", "description", "due_date", "rev"))
+
+    def __init__(self, task):
+        extra = {key: value for key, value in task.items() if key not in self.FIELDS} # Giữ lại các trường khác (nếu có)
+        priority = PRIORITY_BY_LABEL.get(task.get("priority"))
+        if priority is None:
+            extra["priority"] = task.get("priority")
+            priority = Priority.UNKNOWN
+        status = STATUS_BY_LABEL.get(task.get("status"))
+        if status is None:
+            extra["status"] = task.get("status")
+            status = Status.UNKNOWN
+        due_date = task.get("due_date")
+        if isinstance(due_date, str):
+            due_date = sys.intern(due_date) # Ngày hết hạn lặp lại rất nhiều giữa các công việc
+        self.id = task.get("id")
+        self.title = task.get("title")
+        self.description = task.get("description")
+        self.due_date = due_date
+        self.priority = priority
+        self.status = status
+        self.rev = task.get("rev")
+        self.due_ordinal = due_date_ordinal(due_date)
+        self.seq = 0 # Thứ tự thêm vào, do TaskRepository gán
+        self.extra = extra or None
+
+    def __getitem__(self, key):
+        if self.extra is not None and key in self.extra:
+            value = self.extra[key]
+        elif key == "priority":
+            value = PRIORITY_LABELS[self.priority]
+        elif key == "status":
+            value = STATUS_LABELS[self.status]
+        elif key in self._PLAIN_FIELDS:
+            value = getattr(self, key)
+        else:
+            value = None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if self.get(key) is not None:
+                yield key
+        if self.extra is not None:
+            for key, value in self.extra.items():
+                if key not in self.FIELDS and value is not None:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        """Bản sao nông (kho gán lại seq/rev cho bản sao mà không đổi bản gốc)."""
+        record = TaskRecord.__new__(TaskRecord)
+        for name in self.__slots__:
+            setattr(record, name, getattr(self, name))
+        return record
+
+    def to_dict(self):
+        """Dạng dict như trong tasks.json."""
+        return {key: self[key] for key in self}
+
+    def same_as(self, task):
+        """`task` (dict đọc từ file) có đúng bằng `to_dict()` không; so từng trường, không dựng dict."""
+        if self.extra is not None:
+            return self.to_dict() == task
+        plain = (self.title, self.description, self.due_date, self.rev)
+        return (task.get("title") == self.title and task.get("description") == self.description
+                and task.get("due_date") == self.due_date and task.get("rev") == self.rev
+                and task.get("priority") == PRIORITY_LABELS[self.priority]
+                and task.get("status") == STATUS_LABELS[self.status]
+                and task.get("id") == self.id
+                and len(task) == 3 + sum(value is not None for value in plain))
+
+    def __repr__(self):
+        return f"TaskRecord({self.to_dict()!r})"
+
+@contextmanager
+def gc_paused():
+    """Tạm tắt bộ thu gom rác vòng khi dựng hàng loạt đối tượng.
+
+    Với hàng trăm nghìn công việc trong bộ nhớ, mỗi lượt thu gom thế hệ cũ
+    phải quét lại toàn bộ heap; dựng TaskColumns cho 100k công việc chậm
+    hơn hơn 10 lần nếu để bộ thu gom chạy.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+def task_rev(task):
+    """Số phiên bản của công việc (0 nếu chưa có)."""
+    return task.get("rev") or 0
+
+def as_record(task):
+    return task if isinstance(task, TaskRecord) else TaskRecord(task)
+
+def task_to_json(obj):
+    """Dùng làm `default=` cho json.dump(s): ghi TaskRecord như dict."""
+    if isinstance(obj, TaskRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def default_sort_key(task):
+    """Thứ tự mặc định: ưu tiên Cao trước, rồi theo ngày hết hạn, rồi theo thứ tự thêm vào."""
+    return (PRIORITY_SORT_RANK[task.priority], task.due_ordinal, task.seq)
+
+# Khóa sắp xếp khi click header từng cột (trên TaskRecord)
+COLUMN_SORT_KEYS = {
+    'title': lambda task: (task.title or "").lower(),
+    'due_date': operator.attrgetter('due_ordinal'), # Ngày không hợp lệ sẽ đẩy xuống cuối
+    'priority': lambda task: PRIORITY_SORT_RANK[task.priority],
+    'status': operator.attrgetter('status'),
+}
+
+class TaskColumns:
+    """Ảnh chụp dạng cột của các công việc, sắp sẵn theo thứ tự mặc định, cho đường lọc nóng.
+
+    Mã ưu tiên/trạng thái nằm trong mảng byte song song với danh sách công
+    việc: lọc chỉ so sánh số nhỏ và không phải sắp xếp lại sau khi lọc.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = sorted(tasks, key=default_sort_key)
+        self.ids = [task.id for task in self.tasks]
+        self.priority = array('b', [task.priority for task in self.tasks])
+        self.status = array('b', [task.status for task in self.tasks])
+
+    def select(self, filter_priority=FILTER_ALL, filter_status=FILTER_ALL, ids=None):
+        """Các công việc khớp bộ lọc (và thuộc tập `ids` nếu có), theo thứ tự mặc định."""
+        masks = [] # Mỗi mặt nạ là một iterator bool song song với self.tasks (chạy ở tầng C)
+        if filter_priority != FILTER_ALL:
+            code = PRIORITY_BY_LABEL.get(filter_priority)
+            if code is None:
+                return []
+            masks.append(map(code.__eq__, self.priority))
+        if filter_status != FILTER_ALL:
+            code = STATUS_BY_LABEL.get(filter_status)
+            if code is None:
+                return []
+            masks.append(map(code.__eq__, self.status))
+        if ids is not None:
+            masks.append(map(ids.__contains__, self.ids))
+        if not masks:
+            return list(self.tasks)
+        keep = masks[0] if len(masks) == 1 else map(all, zip(*masks))
+        return list(itertools.compress(self.tasks, keep))
+
+def filter_tasks(tasks, filter_priority=FILTER_ALL, filter_status=FILTER_ALL):
+    """Lọc theo ưu tiên/trạng thái, giữ nguyên thứ tự."""
+    if filter_priority != FILTER_ALL:
+        code = PRIORITY_BY_LABEL.get(filter_priority)
+        tasks = [task for task in tasks if task.priority == code]
+    if filter_status != FILTER_ALL:
+        code = STATUS_BY_LABEL.get(filter_status)
+        tasks = [task for task in tasks if task.status == code]
+    return tasks
+
+def filter_and_sort_tasks(tasks, filter_priority=FILTER_ALL, filter_status=FILTER_ALL):
+    """Lọc theo ưu tiên/trạng thái rồi sắp xếp theo thứ tự mặc định; dùng cho danh sách nhỏ (vd. kết quả tìm kiếm)."""
+    return sorted(filter_tasks(tasks, filter_priority, filter_status), key=default_sort_key)
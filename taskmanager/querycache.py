@@ -0,0 +1,60 @@
+"""Bộ nhớ đệm LRU cho kết quả truy vấn (tìm kiếm + bộ lọc + sắp xếp) của một phiên bản dữ liệu."""
+from collections import OrderedDict, namedtuple
+
+from .config import FILTER_ALL, QUERY_CACHE_SIZE
+
+# term: từ khóa đã chuẩn hóa (normalize_text); sort: (cột, đảo ngược) hoặc None = thứ tự mặc định
+QueryKey = namedtuple("QueryKey", "term priority status sort")
+
+def covers(wider, narrower):
+    """True nếu kết quả của `wider` chứa mọi kết quả của `narrower` (cùng thứ tự sắp xếp).
+
+    Văn bản chứa từ khóa dài thì cũng chứa mọi đoạn con của nó, và bộ lọc
+    "Tất cả" bao mọi giá trị cụ thể.
+    """
+    return (wider.sort == narrower.sort
+            and wider.term in narrower.term
+            and wider.priority in (FILTER_ALL, narrower.priority)
+            and wider.status in (FILTER_ALL, narrower.status))
+
+class QueryCache:
+    """Giữ tối đa `maxsize` kết quả gần nhất; mọi mục bị bỏ khi phiên bản dữ liệu đổi."""
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version = None # Phiên bản dữ liệu của các mục đang giữ
+        self._entries = OrderedDict() # QueryKey -> danh sách kết quả, cũ nhất ở đầu
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version, key):
+        """Kết quả đã lưu cho đúng truy vấn `key`, hoặc None."""
+        self._check_version(version)
+        tasks = self._entries.get(key)
+        if tasks is not None:
+            self._entries.move_to_end(key)
+        return tasks
+
+    def superset(self, version, key):
+        """Kết quả đã lưu nhỏ nhất bao trùm `key` (để thu hẹp thay vì quét lại), hoặc None."""
+        self._check_version(version)
+        best = None
+        for cached_key, tasks in self._entries.items():
+            if covers(cached_key, key) and (best is None or len(tasks) < len(best)):
+                best = tasks
+        return best
+
+    def put(self, version, key, tasks):
+        if self.version is not None and version < self.version:
+            return # Dữ liệu đã đổi trong lúc truy vấn: kết quả này đã cũ
+        self._check_version(version)
+        self._entries[key] = tasks
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,152 @@
+"""Công việc lặp lại (hằng ngày/tuần/tháng) với điều kiện kết thúc; các lần lặp được sinh khi cần.
+
+Quy tắc nằm trong trường "repeat" của công việc, ngày hết hạn là lần chưa làm
+gần nhất:
+
+    {"freq": "weekly", "interval": 2, "until": "31/12/2026"}  # 2 tuần một lần đến hết năm
+    {"freq": "daily", "count": 10}                            # Còn 10 lần
+
+Không lưu từng lần lặp: `occurrences()` tính các ngày trong một khoảng và
+`roll_forward()` chuyển công việc sang lần kế tiếp khi được đánh dấu hoàn thành.
+"""
+import calendar
+from collections import namedtuple
+from datetime import date
+
+from .model import NO_DUE_ORDINAL, due_date_ordinal
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+REPEAT_LABELS = {"daily": "Hằng ngày", "weekly": "Hằng tuần", "monthly": "Hằng tháng"}
+REPEAT_BY_LABEL = {label: freq for freq, label in REPEAT_LABELS.items()}
+NO_REPEAT_LABEL = "Không lặp"
+MAX_ORDINAL = date.max.toordinal()
+
+# until: ordinal của ngày cuối (hoặc None); count: số lần còn lại (hoặc None); day: ngày trong tháng gốc (chỉ "monthly")
+Recurrence = namedtuple("Recurrence", "freq interval until count day")
+
+def make_repeat(freq, interval=1, until=None, count=None):
+    """Trường "repeat" cho công việc; `until` dạng dd/mm/yyyy."""
+    repeat = {"freq": freq}
+    if interval != 1:
+        repeat["interval"] = interval
+    if until:
+        repeat["until"] = until
+    if count:
+        repeat["count"] = count
+    return repeat
+
+def parse_repeat(repeat):
+    """Recurrence từ trường "repeat", hoặc None nếu không có/không hợp lệ (coi như không lặp)."""
+    if not isinstance(repeat, dict) or repeat.get("freq") not in FREQUENCIES:
+        return None
+    interval = repeat.get("interval", 1)
+    count = repeat.get("count")
+    day = repeat.get("day")
+    if not isinstance(interval, int) or interval < 1:
+        return None
+    if count is not None and (not isinstance(count, int) or count < 1):
+        return None
+    until = due_date_ordinal(repeat.get("until"))
+    return Recurrence(repeat["freq"], interval, None if until == NO_DUE_ORDINAL else until, count,
+                      day if isinstance(day, int) else None)
+
+def task_recurrence(task):
+    """(ordinal của lần đầu, Recurrence) của công việc lặp lại, hoặc None."""
+    rule = parse_repeat(task.get("repeat"))
+    if rule is None:
+        return None
+    start = due_date_ordinal(task.get("due_date"))
+    if start == NO_DUE_ORDINAL:
+        return None
+    return start, rule
+
+def add_months(start, months, day):
+    """Ordinal của ngày `day` sau `months` tháng kể từ `start`; tháng ngắn hơn thì lấy ngày cuối tháng."""
+    d = date.fromordinal(start)
+    years, month = divmod(d.month - 1 + months, 12)
+    year = d.year + years
+    if year > date.max.year:
+        return MAX_ORDINAL + 1 # Sau mọi khoảng ngày hợp lệ: chuỗi dừng ở đây
+    return date(year, month + 1, min(day, calendar.monthrange(year, month + 1)[1])).toordinal()
+
+def occurrence(start, rule, n):
+    """Ordinal của lần lặp thứ `n` (0 là `start`)."""
+    if rule.freq == "daily":
+        return start + n * rule.interval
+    if rule.freq == "weekly":
+        return start + 7 * n * rule.interval
+    return add_months(start, n * rule.interval, rule.day or date.fromordinal(start).day)
+
+def occurrences(start, rule, first, last):
+    """Sinh lần lượt ordinal các lần lặp nằm trong [first, last]."""
+    if first > start: # Nhảy thẳng tới gần `first` thay vì duyệt từ đầu chuỗi
+        if rule.freq == "monthly":
+            a, b = date.fromordinal(start), date.fromordinal(first)
+            n = max(0, ((b.year - a.year) * 12 + b.month - a.month) // rule.interval - 1)
+        else:
+            step = rule.interval * (7 if rule.freq == "weekly" else 1)
+            n = (first - start) // step
+    else:
+        n = 0
+    while rule.count is None or n < rule.count:
+        ordinal = occurrence(start, rule, n)
+        if ordinal > last or (rule.until is not None and ordinal > rule.until):
+            return
+        if ordinal >= first:
+            yield ordinal
+        n += 1
+
+def series_end(start, rule):
+    """Ordinal lần lặp cuối cùng có thể có (chặn trên), hoặc None nếu chuỗi không kết thúc."""
+    ends = []
+    if rule.count is not None:
+        ends.append(occurrence(start, rule, rule.count - 1))
+    if rule.until is not None:
+        ends.append(rule.until)
+    return min(ends) if ends else None
+
+def next_occurrence(task, first):
+    """Ordinal lần lặp đầu tiên từ ngày `first` trở đi, hoặc None (không lặp/đã hết chuỗi)."""
+    recurrence = task_recurrence(task)
+    if recurrence is None:
+        return None
+    return next(occurrences(*recurrence, first, MAX_ORDINAL), None)
+
+def roll_forward(task):
+    """Công việc lặp lại vừa được đánh dấu "Hoàn thành": chuyển sang lần kế tiếp (trạng thái "Cần thực hiện").
+
+    Trả về nguyên `task` nếu không phải công việc lặp lại chưa hết chuỗi.
+    """
+    if task.get("status") != "Hoàn thành":
+        return task
+    recurrence = task_recurrence(task)
+    if recurrence is None:
+        return task
+    start, rule = recurrence
+    following = next(occurrences(start, rule, start + 1, MAX_ORDINAL), None)
+    if following is None:
+        return task # Lần cuối của chuỗi: giữ "Hoàn thành"
+    repeat = dict(task["repeat"])
+    if rule.count is not None:
+        repeat["count"] = rule.count - 1
+    if rule.freq == "monthly" and rule.day is None:
+        repeat["day"] = date.fromordinal(start).day # Giữ ngày gốc (31/01 -> 28/02 -> 31/03)
+    task = dict(task)
+    task["due_date"] = date.fromordinal(following).strftime('%d/%m/%Y')
+    task["status"] = "Cần thực hiện"
+    task["repeat"] = repeat
+    return task
+
+def describe_repeat(repeat):
+    """Mô tả ngắn cho giao diện/CLI, ví dụ "Hằng tuần (mỗi 2), đến 31/12/2026"."""
+    rule = parse_repeat(repeat)
+    if rule is None:
+        return ""
+    text = REPEAT_LABELS[rule.freq]
+    if rule.interval != 1:
+        text += f" (mỗi {rule.interval})"
+    if rule.until is not None:
+        text += f", đến {date.fromordinal(rule.until).strftime('%d/%m/%Y')}"
+    if rule.count is not None:
+        text += f", còn {rule.count} lần"
+    return text
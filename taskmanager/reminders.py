@@ -0,0 +1,148 @@
+"""Lịch nhắc nhở công việc sắp đến hạn."""
+import heapq # Hàng đợi nhắc nhở theo ngày
+import json
+from datetime import date, datetime
+
+from .config import REMINDER_DAYS_BEFORE, REMINDER_FILE, REMINDER_WINDOW_DAYS
+from .model import NO_DUE_ORDINAL
+from .recurrence import next_occurrence, task_recurrence
+from .storage import atomic_write_json
+
+class ReminderScheduler:
+    """Lịch nhắc nhở chạy nền, tách khỏi việc vẽ danh sách.
+
+    Giữ một min-heap theo ngày bắt đầu nhắc (ngày hết hạn - REMINDER_DAYS_BEFORE)
+    và chỉ thức dậy bằng root.after khi lần nhắc kế tiếp đến hạn. Các nhắc nhở
+    đã hiện được lưu vào REMINDER_FILE để không lặp lại sau khi mở lại ứng dụng.
+
+    Heap chỉ chứa các lần đến hạn trong REMINDER_WINDOW_DAYS ngày tới, lấy từ
+    chỉ mục ngày của kho (không duyệt mọi công việc); công việc lặp lại được
+    nhắc từng lần, lần sau được đưa vào heap khi lần trước đã nhắc.
+
+    `root` chỉ cần có after/after_cancel; `notify(due_now)` nhận danh sách
+    (số ngày còn lại, công việc) đến hạn cùng lúc.
+    """
+
+    MAX_SLEEP_MS = 60 * 60 * 1000 # Thức dậy ít nhất mỗi giờ (qua nửa đêm, đổi giờ hệ thống...)
+
+    def __init__(self, root, repo, notify, path=REMINDER_FILE):
+        self.root = root
+        self.repo = repo
+        self.notify = notify
+        self.path = path
+        self._heap = [] # (ngày bắt đầu nhắc, ngày hết hạn, id)
+        self._scheduled = {} # id -> ngày hết hạn đang có trong heap (mục cũ trong heap bị bỏ qua)
+        self._window_end = 0 # Heap có đủ các lần đến hạn đến hết ngày này (ordinal)
+        self._after_id = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._fired = json.load(f) # id -> ngày hết hạn đã nhắc
+        except (OSError, ValueError):
+            self._fired = {}
+        repo.add_listener(self._on_tasks_changed)
+
+    def start(self):
+        self._rebuild()
+
+    def _rebuild(self):
+        self._heap = []
+        self._scheduled = {}
+        today = date.today().toordinal()
+        self._window_end = today + REMINDER_DAYS_BEFORE + REMINDER_WINDOW_DAYS
+        for _, task in self.repo.due_between(today, self._window_end):
+            if task["id"] not in self._scheduled: # Công việc lặp lại: chỉ lần gần nhất
+                self._push(task)
+        heapq.heapify(self._heap)
+        # Bỏ các nhắc nhở đã lưu của công việc không còn tồn tại
+        stale = [task_id for task_id in self._fired if self.repo.get(task_id) is None]
+        for task_id in stale:
+            del self._fired[task_id]
+        if stale:
+            self._save_fired()
+        self._reschedule()
+
+    def _push(self, task, heap_push=False, first=None):
+        """Đưa lần đến hạn gần nhất từ ngày `first` (mặc định hôm nay) của công việc vào heap."""
+        task_id = task["id"]
+        self._scheduled.pop(task_id, None)
+        if task.get("status") == "Hoàn thành": # Không nhắc công việc đã hoàn thành
+            return
+        first = first or date.today().toordinal()
+        if task_recurrence(task) is not None:
+            due_ordinal = next_occurrence(task, first) or NO_DUE_ORDINAL
+        else:
+            due_ordinal = task.due_ordinal # TaskRecord: ngày đã tính sẵn
+        if due_ordinal == NO_DUE_ORDINAL or due_ordinal < first or due_ordinal > self._window_end:
+            return # Ngoài cửa sổ: sẽ được lấy lại từ chỉ mục khi cửa sổ dời tới
+        self._scheduled[task_id] = due_ordinal
+        entry = (max(due_ordinal - REMINDER_DAYS_BEFORE, first), due_ordinal, task_id)
+        if heap_push:
+            heapq.heappush(self._heap, entry)
+        else:
+            self._heap.append(entry)
+
+    def _on_tasks_changed(self, upserted, removed_ids, reset):
+        if reset:
+            self._rebuild()
+            return
+        for task in upserted:
+            self._push(task, heap_push=True) # O(log N) cho mỗi thay đổi
+        for task_id in removed_ids:
+            self._scheduled.pop(task_id, None)
+            if self._fired.pop(task_id, None) is not None:
+                self._save_fired()
+        self._reschedule()
+
+    def _reschedule(self):
+        """Hẹn lần thức dậy kế tiếp đúng lúc nhắc nhở sớm nhất đến hạn."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        # Bỏ các mục đã lỗi thời ở đỉnh heap
+        while self._heap and self._scheduled.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        # Heap rỗng: thức dậy khi cần dời cửa sổ để lấy các công việc xa hơn
+        wake = self._heap[0][0] if self._heap else self._window_end - REMINDER_DAYS_BEFORE + 1
+        remind_at = datetime.combine(date.fromordinal(max(wake, 1)), datetime.min.time())
+        delay_ms = int((remind_at - datetime.now()).total_seconds() * 1000)
+        self._after_id = self.root.after(min(max(delay_ms, 0), self.MAX_SLEEP_MS), self._check)
+
+    def _check(self):
+        """Lấy ra mọi công việc đã đến lúc nhắc và hiện chung trong một thông báo."""
+        self._after_id = None
+        today = date.today().toordinal()
+        if today + REMINDER_DAYS_BEFORE > self._window_end:
+            self._rebuild() # Dời cửa sổ tới (_rebuild hẹn lại lần kiểm tra)
+            return
+        due_now = []
+        while self._heap and self._heap[0][0] <= today:
+            _, due_ordinal, task_id = heapq.heappop(self._heap)
+            if self._scheduled.get(task_id) != due_ordinal:
+                continue # Mục cũ: công việc đã sửa/xóa
+            del self._scheduled[task_id]
+            task = self.repo.get(task_id)
+            if task is None or due_ordinal < today:
+                continue
+            if task_recurrence(task) is not None:
+                # Lần lặp kế tiếp, nhắc sớm nhất từ ngày sau lần này (mỗi ngày chỉ nhắc lần gần nhất)
+                self._push(task, heap_push=True, first=due_ordinal + 1)
+            if self._fired.get(task_id) == self._fired_key(task, due_ordinal):
+                continue # Đã nhắc cho ngày hết hạn này
+            due_now.append((due_ordinal - today, task))
+        if due_now:
+            for days_left, task in due_now:
+                self._fired[task["id"]] = self._fired_key(task, today + days_left) # Đánh dấu đã thông báo
+            self._save_fired()
+            due_now.sort(key=lambda item: item[0])
+            self.notify(due_now)
+        self._reschedule()
+
+    @staticmethod
+    def _fired_key(task, due_ordinal):
+        """Ngày hết hạn được ghi nhận là đã nhắc: ngày của lần lặp với công việc lặp lại."""
+        if task_recurrence(task) is None:
+            return task.get("due_date")
+        return date.fromordinal(due_ordinal).strftime('%d/%m/%Y')
+
+    def _save_fired(self):
+        atomic_write_json(self.path, self._fired)
@@ -0,0 +1,769 @@
+"""Kho công việc trong bộ nhớ, gom các lượt ghi và báo thay đổi cho các thành phần khác."""
+import heapq # Trộn kết quả lưu trữ vào kết quả dữ liệu chính (cả hai đã sắp xếp)
+import itertools
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+from . import instrument
+from .agenda import DueDateIndex
+from .archive import completed_ordinal, stamp_completion
+from .config import ARCHIVE_AFTER_DAYS, COMMIT_WINDOW_MS, FILTER_ALL
+from .model import (COLUMN_SORT_KEYS, STATUS_LABELS, Status, TaskColumns, TaskRecord, as_record, default_sort_key,
+                    filter_and_sort_tasks, filter_tasks, gc_paused, normalize_text, task_rev)
+from .querycache import QueryCache, QueryKey
+from .search import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+class TaskConflictError(Exception):
+    """Công việc đã bị sửa ở nơi khác (tiến trình khác) sau khi được đọc ra để sửa."""
+
+    def __init__(self, task_id):
+        super().__init__(task_id)
+        self.task_id = task_id
+
+def scan_tasks(tasks, term):
+    """Các công việc có tiêu đề hoặc mô tả chứa `term` (đã chuẩn hóa), giữ nguyên thứ tự; cùng cách chuẩn hóa
+    với SearchIndex và cột search_text của SQLite."""
+    return [task for task in tasks if term in normalize_text((task.title or "") + "\n" + (task.description or ""))]
+
+class TaskRepository:
+    """Giữ toàn bộ công việc trong bộ nhớ (dict theo id), chỉ đọc lại khi dữ liệu bị sửa từ bên ngoài.
+
+    Các thay đổi xảy ra trong khoảng `commit_window_ms` được gom lại và ghi
+    xuống đĩa một lần trên luồng nền.
+
+    Nhiều tiến trình có thể dùng chung một file dữ liệu: mỗi lần sửa tăng `rev`
+    của công việc, kiểu lưu trữ kiểm tra `rev` khi ghi (khóa file) và bỏ các
+    thay đổi dựa trên phiên bản cũ. Thay đổi của tiến trình khác được đọc vào
+    từng công việc một (listener nhận đúng các công việc đã đổi).
+
+    Với `archive` (TaskArchive), công việc hoàn thành từ lâu được chuyển sang
+    lưu trữ bằng `archive_completed()`. Lưu trữ chỉ được đọc khi truy vấn lọc
+    "Hoàn thành" hoặc yêu cầu `include_archive`; sửa/xóa một công việc đang
+    trong lưu trữ thì công việc đó được đưa về dữ liệu chính trước.
+
+    Với `history` (UndoHistory), mỗi thao tác (hoặc cả khối `batch()`) được
+    ghi thành một bước gồm bản trước/sau của các công việc đã đổi; `undo()` và
+    `redo()` chỉ áp dụng lại các công việc đó.
+
+    Chỉ mục tìm kiếm không được dựng khi đọc dữ liệu: lần tìm kiếm đầu tiên
+    bắt đầu dựng nó trên luồng nền, trong lúc chờ thì tìm bằng cách quét tuần
+    tự. `search_index=False` thì luôn quét tuần tự (chỉ tìm một lần, vd. dòng lệnh).
+    Chỉ mục ngày hết hạn được dựng ở lần gọi `due_between()` đầu tiên.
+    """
+
+    SMALL_RESULT_RATIO = 8 # Kết quả tìm kiếm ít hơn 1/8 số công việc thì không dùng TaskColumns
+
+    def __init__(self, storage, commit_window_ms=COMMIT_WINDOW_MS, archive=None, history=None, search_index=True):
+        self.storage = storage
+        self.archive = archive
+        self.history = history
+        self.commit_window = commit_window_ms / 1000
+        self._tasks = {} # id -> TaskRecord, giữ nguyên thứ tự thêm vào
+        self._loaded = False
+        self.version = 0 # Tăng mỗi khi dữ liệu thay đổi
+        self._pending = [] # Các thay đổi chưa ghi xuống đĩa
+        self._archive_drops = set() # ID cần bỏ bản trong lưu trữ ở lần ghi tới (đã xóa hoặc đã đưa về dữ liệu chính)
+        self._timer = None
+        self._batch_depth = 0 # > 0 khi đang trong khối batch(): hoãn ghi đến khi ra khỏi khối
+        self._batch_changes = [] # Thay đổi trong khối batch(), ghi thành một bước hoàn tác khi ra khỏi khối
+        self._lock = threading.RLock() # Bảo vệ _tasks/_pending
+        self._flush_lock = threading.Lock() # Chỉ một lượt ghi tại một thời điểm
+        # Chỉ mục tìm kiếm trong bộ nhớ, dựng khi cần; kiểu lưu trữ SQLite tự tìm kiếm bằng SQL
+        self._use_search_index = search_index and not hasattr(storage, "query")
+        self.search_index = None # SearchIndex khi đã dựng xong
+        self._search_thread = None # Luồng đang dựng chỉ mục tìm kiếm
+        self._search_dirty = None # ID các công việc đổi trong lúc dựng, cập nhật vào chỉ mục khi dựng xong
+        self._index_generation = 0 # Tăng khi thay toàn bộ dữ liệu: bỏ kết quả của lượt dựng cũ
+        self.due_index = None # DueDateIndex: tra cứu theo khoảng ngày hết hạn (lịch, nhắc nhở), dựng ở lần tra đầu tiên
+        self._seq = itertools.count() # Thứ tự thêm vào (TaskRecord.seq)
+        self._columns = None # TaskColumns của phiên bản dữ liệu hiện tại, dựng lại khi cần
+        self._query_cache = QueryCache() # Kết quả query() gần nhất của phiên bản dữ liệu hiện tại
+        self._listeners = []
+        self._conflicts = [] # ID các công việc có thay đổi bị bỏ khi ghi vì xung đột
+        self._flush_error = None # Lỗi của lượt ghi nền (cửa sổ gom ghi) chưa báo cho người gọi
+
+    def _ensure_loaded(self):
+        """Chỉ đọc lại khi file khác với lần đọc/ghi trước."""
+        if self._loaded and self._pending:
+            return # Còn thay đổi chờ ghi: dữ liệu trong bộ nhớ là mới nhất
+        # Không chờ lượt ghi đang chạy (luồng nền): bộ nhớ đã có mọi thay đổi của tiến trình này, thay đổi của
+        # nơi khác được đọc ở lần gọi sau. Chỉ lần đọc đầu tiên mới phải chờ.
+        if not self._flush_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            with self._lock:
+                if self._loaded and not self.storage.is_stale():
+                    return
+                with instrument.span("storage.load"), gc_paused():
+                    tasks = self.storage.load()
+                for task in tasks:
+                    if not task.get("id"):
+                        task["id"] = str(uuid.uuid4()) # Bổ sung ID cho dữ liệu cũ thiếu ID
+                if self._loaded: # Tiến trình khác đã ghi: chỉ cập nhật các công việc thay đổi
+                    with instrument.span("repo.merge_external"):
+                        upserted, removed_ids = self._merge_external(tasks)
+                    if not upserted and not removed_ids:
+                        return
+                    self.version += 1
+                else:
+                    with instrument.span("repo.index"), gc_paused(): # Dựng TaskRecord và chỉ mục tìm kiếm
+                        self._reset(tasks)
+                    self._loaded = True
+                    self.version += 1
+                    upserted = None
+        finally:
+            self._flush_lock.release()
+        if upserted is None:
+            self._notify((), (), reset=True)
+        else:
+            self._notify(upserted, removed_ids)
+
+    def _merge_external(self, tasks):
+        """Đưa dữ liệu vừa đọc lại vào bộ nhớ, chỉ dựng lại các công việc khác đi. Trả về (upserted, removed_ids)."""
+        seen = set()
+        upserted = []
+        for task in tasks:
+            task_id = task["id"]
+            seen.add(task_id)
+            old = self._tasks.get(task_id)
+            if old is not None and old.same_as(task):
+                continue
+            record = TaskRecord(task) # Giữ nguyên rev trên đĩa
+            record.seq = old.seq if old is not None else next(self._seq)
+            self._tasks[task_id] = record
+            self._index_add(record)
+            upserted.append(record)
+        removed_ids = [task_id for task_id in self._tasks if task_id not in seen]
+        for task_id in removed_ids:
+            self._remove(task_id)
+        return upserted, removed_ids
+
+    def check_external_changes(self):
+        """Đọc thay đổi của tiến trình khác (nếu file đã đổi) và trả về ID các công việc bị xung đột kể từ lần gọi trước.
+
+        Nếu lượt ghi nền gần nhất bị lỗi thì báo lại lỗi đó (một lần); các
+        thay đổi chưa ghi vẫn được giữ và ghi lại ở lần ghi sau.
+        """
+        with self._lock:
+            error, self._flush_error = self._flush_error, None
+        if error is not None:
+            raise error
+        self._ensure_loaded()
+        with self._lock:
+            conflicts, self._conflicts = self._conflicts, []
+        return conflicts
+
+    def _reset(self, tasks):
+        """Thay toàn bộ dữ liệu trong bộ nhớ; các chỉ mục được dựng lại ở lần dùng tới."""
+        self._tasks = {}
+        for task in tasks:
+            record = TaskRecord(task)
+            record.seq = next(self._seq)
+            self._tasks[record.id] = record
+        self.search_index = None
+        self._search_dirty = None
+        self._index_generation += 1
+        self.due_index = None
+
+    # --- Chỉ mục ---
+    def _index_add(self, record):
+        """Cập nhật các chỉ mục cho công việc vừa thêm/sửa (gọi khi đang giữ khóa)."""
+        if self.search_index is not None:
+            self.search_index.add(record)
+        elif self._search_dirty is not None:
+            self._search_dirty.add(record.id)
+        if self.due_index is not None:
+            self.due_index.add(record)
+
+    def _index_remove(self, task_id):
+        if self.search_index is not None:
+            self.search_index.remove(task_id)
+        elif self._search_dirty is not None:
+            self._search_dirty.add(task_id)
+        if self.due_index is not None:
+            self.due_index.remove(task_id)
+
+    def _start_search_index(self):
+        """Bắt đầu dựng chỉ mục tìm kiếm trên luồng nền nếu chưa có (gọi khi đang giữ khóa)."""
+        if not self._use_search_index or self.search_index is not None or self._search_dirty is not None:
+            return
+        self._search_dirty = set()
+        self._search_thread = threading.Thread(target=self._build_search_index, daemon=True,
+                                               args=(self._index_generation, list(self._tasks.values())))
+        self._search_thread.start()
+
+    def _build_search_index(self, generation, tasks):
+        index = SearchIndex()
+        with instrument.span("search.build"):
+            index.rebuild(tasks)
+        with self._lock:
+            if generation != self._index_generation: # Dữ liệu đã bị thay trong lúc dựng
+                return
+            for task_id in self._search_dirty:
+                record = self._tasks.get(task_id)
+                if record is None:
+                    index.remove(task_id)
+                else:
+                    index.add(record)
+            self._search_dirty = None
+            self.search_index = index
+
+    def ensure_search_index(self):
+        """Dựng chỉ mục tìm kiếm (hoặc chờ lượt dựng đang chạy) để các lần tìm sau dùng chỉ mục."""
+        self._ensure_loaded()
+        with self._lock:
+            self._start_search_index()
+            thread = self._search_thread
+        if thread is not None:
+            thread.join()
+
+    def _search_ids(self, term):
+        """Tập ID khớp `term` theo chỉ mục; None nếu chỉ mục chưa sẵn sàng (người gọi quét tuần tự)."""
+        with self._lock:
+            index = self.search_index
+            if index is None:
+                self._start_search_index()
+                return None
+        with instrument.span("search.lookup"):
+            return index.search(term)
+
+    def _put(self, task):
+        """Lưu công việc (dict hoặc TaskRecord) dưới dạng TaskRecord và trả về bản ghi đó."""
+        record = as_record(task)
+        old = self._tasks.get(record.id)
+        record.seq = old.seq if old is not None else next(self._seq) # Sửa không làm đổi thứ tự
+        record.rev = task_rev(old) + 1 if old is not None else 1
+        stamp_completion(record, old)
+        self._tasks[record.id] = record
+        self._index_add(record)
+        return record
+
+    def _edit(self, task):
+        """Sửa một công việc đang có; trả về thay đổi (op) kèm phiên bản gốc để kiểm tra xung đột khi ghi."""
+        base = task_rev(self._tasks[task["id"]])
+        record = self._put(task)
+        return {"op": "edit", "id": record.id, "task": record, "base": base}
+
+    def _remove(self, task_id):
+        """Xóa khỏi bộ nhớ; trả về thay đổi (op) kèm phiên bản gốc."""
+        record = self._tasks.pop(task_id)
+        self._index_remove(task_id)
+        return {"op": "delete", "id": task_id, "base": task_rev(record)}
+
+    def _check_rev(self, task):
+        """Báo TaskConflictError nếu `task` được sửa từ một phiên bản cũ hơn bản trong bộ nhớ."""
+        rev = task.get("rev")
+        if rev is not None and rev != task_rev(self._tasks[task["id"]]):
+            raise TaskConflictError(task["id"])
+
+    def add_listener(self, listener):
+        """Đăng ký hàm listener(upserted, removed_ids, reset) được gọi sau mỗi thay đổi dữ liệu."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def _record(self, changes):
+        """Ghi bước hoàn tác (id, trước, sau) cho thao tác vừa làm (gọi khi đang giữ khóa)."""
+        if self.history is None:
+            return
+        if self._batch_depth:
+            self._batch_changes.extend(changes)
+        else:
+            self.history.push(changes)
+
+    def _notify(self, upserted, removed_ids, reset=False):
+        for listener in self._listeners:
+            listener(upserted, removed_ids, reset)
+
+    def _commit(self, ops, archive_drops=()):
+        """Ghi nhận thay đổi (gọi khi đang giữ khóa). Trả về True nếu cần ghi ngay.
+
+        `archive_drops`: ID các công việc mà lần ghi tới cũng bỏ khỏi lưu trữ.
+        """
+        self.version += 1
+        self._pending.extend(ops)
+        self._archive_drops.update(archive_drops)
+        return self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Hẹn lượt ghi sau cửa sổ gom ghi (gọi khi đang giữ khóa). Trả về True nếu cần ghi ngay."""
+        if self._batch_depth:
+            return False
+        if self.commit_window <= 0:
+            return True
+        if self._timer is None:
+            self._timer = threading.Timer(self.commit_window, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+        return False
+
+    def flush(self):
+        """Ghi ngay các thay đổi đang chờ thành một lần ghi bền vững.
+
+        Ghi lỗi thì các thay đổi được đưa lại vào hàng chờ (lần ghi sau thử lại)
+        và lỗi được báo cho người gọi.
+
+        Bản lưu trữ của công việc đã xóa được bỏ trước khi ghi (dừng giữa chừng
+        thì công việc chỉ chưa bị xóa), của công việc vừa đưa về dữ liệu chính
+        thì bỏ sau khi ghi (không lúc nào mất cả hai bản).
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                ops, self._pending = self._pending, []
+                drops, self._archive_drops = self._archive_drops, set()
+                tasks = dict(self._tasks)
+            if not ops and not drops:
+                return
+            try:
+                self._drop_archive_copies([task_id for task_id in drops if task_id not in tasks])
+                if ops:
+                    with instrument.span("storage.commit"):
+                        conflicts = self.storage.commit(ops, tasks)
+            except Exception:
+                with self._lock:
+                    self._pending[:0] = ops # Trước các thay đổi mới hơn, giữ đúng thứ tự
+                    self._archive_drops.update(drops)
+                raise
+            with self._lock:
+                self._flush_error = None # Các thay đổi của lượt ghi nền bị lỗi đã được ghi lại
+            try:
+                self._drop_archive_copies([task_id for task_id in drops if task_id in tasks])
+            except Exception:
+                with self._lock:
+                    self._archive_drops.update(task_id for task_id in drops if task_id in tasks)
+                raise
+            if not ops:
+                return
+            instrument.count("storage.ops", len(ops))
+            if conflicts:
+                # Bản trên đĩa được giữ; lần đọc tới sẽ đưa nó vào bộ nhớ
+                logger.info("Bỏ %d thay đổi xung đột với tiến trình khác: %s", len(conflicts), conflicts)
+                with self._lock:
+                    self._conflicts.extend(conflicts)
+
+    def _flush_in_background(self):
+        """Lượt ghi của cửa sổ gom ghi (luồng hẹn giờ): lỗi được giữ lại để check_external_changes() báo."""
+        try:
+            self.flush()
+        except Exception as e:
+            with self._lock:
+                self._flush_error = e
+
+    @contextmanager
+    def batch(self):
+        """Gom mọi thay đổi trong khối `with repo.batch():` thành một lần ghi (hẹn như mọi thay đổi khác) khi ra khỏi khối."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                flush_now = False
+                if self._batch_depth == 0:
+                    changes, self._batch_changes = self._batch_changes, []
+                    self._record(changes)
+                    flush_now = self._pending and self._schedule_flush()
+            if flush_now:
+                self.flush()
+
+    def all(self):
+        """Trả về danh sách công việc hiện tại."""
+        self._ensure_loaded()
+        return list(self._tasks.values())
+
+    def columns(self):
+        """TaskColumns của dữ liệu hiện tại; chỉ dựng lại sau khi dữ liệu thay đổi."""
+        self._ensure_loaded()
+        with self._lock:
+            columns = self._columns
+            if columns is None or columns.version != self.version:
+                with instrument.span("repo.columns_rebuild"), gc_paused():
+                    columns = TaskColumns(self._tasks.values())
+                columns.version = self.version
+                self._columns = columns
+            return columns
+
+    def query(self, search_term="", filter_priority=FILTER_ALL, filter_status=FILTER_ALL, sort=None,
+              include_archive=False):
+        """Lọc và sắp xếp (`sort` = (cột, đảo ngược), None là thứ tự mặc định); đẩy xuống SQL nếu kiểu lưu trữ hỗ trợ.
+
+        Kết quả được giữ trong QueryCache theo phiên bản dữ liệu: hỏi lại cùng
+        truy vấn thì trả ngay, truy vấn hẹp hơn một kết quả đã có (gõ thêm chữ,
+        chọn bộ lọc cụ thể) thì chỉ lọc lại kết quả đó.
+
+        Lọc "Hoàn thành" hoặc `include_archive` thì có cả các công việc trong lưu trữ.
+        """
+        with instrument.span("repo.query"):
+            tasks = self._cached_query(search_term, filter_priority, filter_status, sort)
+            if self.archive is not None and (include_archive or filter_status == STATUS_LABELS[Status.DONE]):
+                tasks = self._merge_archive(tasks, search_term, filter_priority, filter_status, sort)
+        instrument.count("repo.rows_matched", len(tasks))
+        return tasks
+
+    def _merge_archive(self, tasks, search_term, filter_priority, filter_status, sort):
+        """Trộn các công việc lưu trữ khớp truy vấn vào `tasks` (đã sắp xếp), giữ đúng thứ tự."""
+        with instrument.span("archive.query"):
+            archived = self.archive.query(search_term, filter_priority, filter_status)
+        with self._lock:
+            archived = [task for task in archived if task.id not in self._tasks] # Bản trong dữ liệu chính được dùng
+        if not archived:
+            return tasks
+        if sort:
+            key, reverse = COLUMN_SORT_KEYS[sort[0]], sort[1]
+            archived = sorted(archived, key=key, reverse=reverse)
+        else:
+            key, reverse = default_sort_key, False
+        return list(heapq.merge(tasks, archived, key=key, reverse=reverse))
+
+    def _cached_query(self, search_term, filter_priority, filter_status, sort):
+        self._ensure_loaded()
+        key = QueryKey(normalize_text(search_term), filter_priority, filter_status, sort and tuple(sort))
+        with self._lock:
+            version = self.version
+            tasks = self._query_cache.get(version, key)
+            superset = self._query_cache.superset(version, key) if tasks is None else None
+        if tasks is not None:
+            instrument.count("query_cache.hit", 1)
+            return list(tasks) # Bản sao: người gọi có thể sửa danh sách
+        if superset is not None:
+            instrument.count("query_cache.narrow", 1)
+            instrument.count("repo.rows_scanned", len(superset))
+            tasks = self._narrow(superset, key)
+        else:
+            instrument.count("query_cache.miss", 1)
+            tasks = self._query(search_term, filter_priority, filter_status)
+            if sort:
+                tasks = self.sort_by_column(tasks, *sort)
+        with self._lock:
+            self._query_cache.put(version, key, tasks)
+        return list(tasks)
+
+    def drop_query_cache(self):
+        """Bỏ các kết quả truy vấn đã lưu (để đo thời gian truy vấn thật)."""
+        with self._lock:
+            self._query_cache.clear()
+
+    def _narrow(self, tasks, key):
+        """Lọc lại một kết quả rộng hơn (thứ tự giữ nguyên nên không phải sắp xếp lại)."""
+        tasks = filter_tasks(tasks, key.priority, key.status)
+        if key.term:
+            index = self.search_index
+            if index is not None:
+                tasks = index.narrow(tasks, key.term)
+            else:
+                tasks = scan_tasks(tasks, key.term)
+        return tasks
+
+    def _query(self, search_term, filter_priority, filter_status):
+        if not hasattr(self.storage, "query"):
+            self._ensure_loaded()
+            ids = None
+            term = normalize_text(search_term)
+            if term:
+                ids = self._search_ids(term)
+                if ids is None: # Chỉ mục chưa sẵn sàng: quét tuần tự sau khi lọc theo cột
+                    tasks = self.columns().select(filter_priority, filter_status)
+                    instrument.count("repo.rows_scanned", len(tasks))
+                    with instrument.span("search.scan"):
+                        return scan_tasks(tasks, term)
+            if ids is not None and len(ids) * self.SMALL_RESULT_RATIO < len(self._tasks):
+                instrument.count("repo.rows_scanned", len(ids))
+                # Ít kết quả: lấy thẳng theo ID rồi sắp xếp, rẻ hơn quét cả cột
+                return filter_and_sort_tasks([self._tasks[task_id] for task_id in ids if task_id in self._tasks],
+                                             filter_priority, filter_status)
+            instrument.count("repo.rows_scanned", len(self._tasks))
+            return self.columns().select(filter_priority, filter_status, ids)
+        self.flush() # CSDL phải có đủ các thay đổi đang chờ trước khi truy vấn
+        self._ensure_loaded()
+        with instrument.span("storage.query"):
+            ids = self.storage.query(search_term, filter_priority, filter_status)
+        return [self._tasks[task_id] for task_id in ids if task_id in self._tasks]
+
+    def sort_by_column(self, tasks, col, reverse=False):
+        """Sắp xếp theo một cột bằng các trường đã tính sẵn của TaskRecord, không phân tích lại chuỗi ngày."""
+        with instrument.span("repo.sort"):
+            return sorted(tasks, key=COLUMN_SORT_KEYS[col], reverse=reverse)
+
+    def due_between(self, first, last):
+        """Các lần đến hạn trong [first, last] (ordinal), kể cả từng lần của công việc lặp lại.
+
+        Trả về danh sách (ordinal, công việc) theo ngày, cùng ngày thì theo thứ tự mặc định.
+        """
+        self._ensure_loaded()
+        with self._lock, instrument.span("repo.due_between"):
+            if self.due_index is None:
+                with instrument.span("repo.due_index"), gc_paused():
+                    self.due_index = DueDateIndex()
+                    self.due_index.rebuild(self._tasks.values())
+            hits = [(ordinal, self._tasks[task_id]) for ordinal, task_id in self.due_index.between(first, last)]
+        hits.sort(key=lambda hit: (hit[0], default_sort_key(hit[1])))
+        return hits
+
+    def get(self, task_id):
+        """Công việc theo ID; tìm cả trong lưu trữ nếu lưu trữ đã được đọc (đang hiển thị)."""
+        self._ensure_loaded()
+        task = self._tasks.get(task_id)
+        if task is None and self.archive is not None and self.archive.loaded:
+            task = self.archive.get(task_id)
+        return task
+
+    # --- Hoàn tác/làm lại ---
+    def undo(self):
+        """Hoàn tác thao tác gần nhất. Trả về bước đã hoàn tác (history.Step), hoặc None nếu không có gì.
+
+        Công việc đã bị sửa ở nơi khác sau thao tác đó thì được giữ nguyên và
+        báo qua `check_external_changes()` như một xung đột.
+        """
+        step = self.history.peek_undo() if self.history is not None else None
+        if step is None:
+            return None
+        written = self._travel([(task_id, after, before) for task_id, before, after in reversed(step.changes)])
+        self.history.undone(step, written)
+        return step
+
+    def redo(self):
+        """Làm lại thao tác vừa hoàn tác. Trả về bước đã làm lại, hoặc None nếu không có gì."""
+        step = self.history.peek_redo() if self.history is not None else None
+        if step is None:
+            return None
+        written = self._travel([(task_id, before, after) for task_id, before, after in step.changes])
+        self.history.redone(step, written)
+        return step
+
+    def _travel(self, moves):
+        """Đưa từng công việc trong `moves` (id, bản mong đợi, bản đích; None = không có) về bản đích, một lần ghi.
+
+        Công việc hiện tại khác bản mong đợi (rev khác, hoặc bị thêm/xóa ở nơi
+        khác) thì bị bỏ qua và ghi vào danh sách xung đột. Thay đổi mang rev
+        mong đợi làm `base` để kiểu lưu trữ kiểm tra lại khi ghi. Trả về dict
+        id -> bản đã ghi (None nếu đã xóa) của các công việc đã áp dụng.
+        """
+        self._ensure_loaded()
+        self._unarchive([task_id for task_id, expected, _ in moves if expected is not None])
+        ops = []
+        written = {}
+        skipped = set()
+        with self._lock:
+            for task_id, expected, target in moves:
+                if task_id in skipped:
+                    continue
+                current = self._tasks.get(task_id)
+                if task_id not in written and ((current is None) != (expected is None) or
+                                               (current is not None and task_rev(current) != task_rev(expected))):
+                    skipped.add(task_id)
+                    continue
+                if target is None:
+                    if current is not None:
+                        ops.append(self._remove(task_id))
+                    written[task_id] = None
+                elif current is None:
+                    record = self._put(target.copy()) # Bản sao: bản trong lịch sử dùng lại được cho lần sau
+                    ops.append({"op": "add", "id": record.id, "task": record})
+                    written[task_id] = record
+                else:
+                    op = self._edit(target.copy()) # base = rev hiện tại, đã khớp rev mong đợi
+                    ops.append(op)
+                    written[task_id] = op["task"]
+            if skipped:
+                logger.info("Bỏ qua %d công việc đã bị sửa ở nơi khác khi hoàn tác/làm lại: %s", len(skipped), skipped)
+                self._conflicts.extend(skipped)
+            if not ops:
+                return written
+            flush_now = self._commit(ops, [op["id"] for op in ops if op["op"] == "delete"])
+            changed = dict.fromkeys(op["id"] for op in ops)
+            upserted = [self._tasks[task_id] for task_id in changed if task_id in self._tasks]
+            removed_ids = [task_id for task_id in changed if task_id not in self._tasks]
+        instrument.count("history.rows_applied", len(ops))
+        if flush_now:
+            self.flush()
+        self._notify(upserted, removed_ids)
+        return written
+
+    # --- Lưu trữ ---
+    def archive_candidates(self, after_days=ARCHIVE_AFTER_DAYS):
+        """Các công việc đã hoàn thành hơn `after_days` ngày (theo "completed_on", dữ liệu cũ theo ngày hết hạn)."""
+        cutoff = date.today().toordinal() - after_days
+        done = self.columns().select(FILTER_ALL, STATUS_LABELS[Status.DONE])
+        return [task for task in done if completed_ordinal(task) < cutoff]
+
+    def drop_archived(self, tasks):
+        """Bỏ khỏi dữ liệu chính các công việc vừa được ghi vào lưu trữ, trừ các công việc đã bị sửa sau đó.
+
+        Công việc đã bị sửa/xóa sau khi ghi vào lưu trữ thì bản lưu trữ bị bỏ
+        (bản trong dữ liệu chính, hoặc việc xóa nó, là mới nhất). Trả về số
+        công việc đã bỏ khỏi dữ liệu chính.
+        """
+        with self._lock:
+            task_ids = [task.id for task in tasks if self._tasks.get(task.id) is task] # Chưa bị thay bằng bản khác
+            stale_ids = [task.id for task in tasks if self._tasks.get(task.id) is not task]
+            if not tasks:
+                return 0
+            flush_now = self._commit([self._remove(task_id) for task_id in task_ids], stale_ids)
+        if flush_now:
+            self.flush()
+        if task_ids:
+            self._notify((), task_ids)
+        return len(task_ids)
+
+    def archive_completed(self, after_days=ARCHIVE_AFTER_DAYS):
+        """Chuyển công việc hoàn thành từ lâu sang lưu trữ. Trả về số công việc đã chuyển.
+
+        Ghi vào lưu trữ trước rồi mới xóa khỏi dữ liệu chính: dừng giữa chừng
+        thì công việc chỉ có thêm một bản trong lưu trữ, không bị mất.
+        """
+        tasks = self.archive_candidates(after_days)
+        if not tasks:
+            return 0
+        with instrument.span("archive.append"):
+            self.archive.append(tasks)
+        return self.drop_archived(tasks)
+
+    def _drop_archive_copies(self, task_ids):
+        """Bỏ bản lưu trữ (nếu có) của các công việc đã xóa hoặc đã đưa về dữ liệu chính, để bản cũ không quay lại."""
+        if self.archive is None:
+            return
+        task_ids = self.archive.archived_ids(task_ids)
+        if task_ids:
+            self.archive.remove(task_ids)
+
+    def _unarchive(self, task_ids):
+        """Đưa các công việc đang trong lưu trữ về dữ liệu chính (trước khi sửa/xóa chúng), giữ nguyên rev."""
+        if self.archive is None:
+            return
+        with self._lock:
+            missing = [task_id for task_id in task_ids if task_id not in self._tasks]
+        if not missing:
+            return
+        records = [record for record in map(self.archive.get, missing) if record is not None]
+        if not records:
+            return
+        with self._lock:
+            records = [record for record in records if record.id not in self._tasks]
+            for record in records:
+                record.seq = next(self._seq)
+                self._tasks[record.id] = record
+                self._index_add(record)
+            # Bản lưu trữ được bỏ ở lần ghi tới, sau khi đã có trong dữ liệu chính
+            flush_now = self._commit([{"op": "add", "id": record.id, "task": record} for record in records],
+                                     [record.id for record in records])
+        if flush_now:
+            self.flush()
+        self._notify(records, ())
+
+    def add(self, task):
+        self.add_many([task])
+
+    def add_many(self, tasks):
+        """Thêm nhiều công việc với một lần ghi."""
+        self._ensure_loaded()
+        with self._lock:
+            changes = []
+            for task in tasks:
+                old = self._tasks.get(task["id"])
+                changes.append((task["id"], old, self._put(task)))
+            tasks = [record for _, _, record in changes]
+            flush_now = self._commit([{"op": "add", "id": task.id, "task": task} for task in tasks])
+            self._record(changes)
+        if flush_now:
+            self.flush()
+        self._notify(tasks, ())
+
+    def update_many(self, tasks):
+        """Cập nhật nhiều công việc với một lần ghi; bỏ qua các ID không còn tồn tại hoặc đã bị sửa ở nơi khác.
+
+        Trả về số công việc đã cập nhật.
+        """
+        self._ensure_loaded()
+        self._unarchive([task["id"] for task in tasks])
+        with self._lock:
+            tasks = [task for task in tasks if task["id"] in self._tasks
+                     and task.get("rev") in (None, task_rev(self._tasks[task["id"]]))]
+            if not tasks:
+                return 0
+            olds = [self._tasks[task["id"]] for task in tasks]
+            ops = [self._edit(task) for task in tasks]
+            flush_now = self._commit(ops)
+            self._record([(op["id"], old, op["task"]) for old, op in zip(olds, ops)])
+        if flush_now:
+            self.flush()
+        self._notify([op["task"] for op in ops], ())
+        return len(ops)
+
+    def update(self, task):
+        """Cập nhật công việc theo ID. Trả về False nếu không tìm thấy.
+
+        Nếu `task` có "rev" (phiên bản lúc đọc ra để sửa) khác bản hiện tại thì
+        báo TaskConflictError thay vì ghi đè thay đổi của nơi khác.
+        """
+        self._ensure_loaded()
+        self._unarchive([task["id"]])
+        with self._lock:
+            if task["id"] not in self._tasks:
+                return False
+            self._check_rev(task)
+            old = self._tasks[task["id"]]
+            op = self._edit(task)
+            flush_now = self._commit([op])
+            self._record([(op["id"], old, op["task"])])
+        if flush_now:
+            self.flush()
+        self._notify([op["task"]], ())
+        return True
+
+    def delete(self, task_id):
+        """Xóa công việc theo ID. Trả về False nếu không tìm thấy."""
+        self._ensure_loaded()
+        self._unarchive([task_id])
+        with self._lock:
+            if task_id not in self._tasks:
+                return False
+            self._record([(task_id, self._tasks[task_id], None)])
+            flush_now = self._commit([self._remove(task_id)], [task_id]) # Cả bản còn sót trong lưu trữ (nếu có)
+        if flush_now:
+            self.flush()
+        self._notify((), [task_id])
+        return True
+
+    def delete_many(self, task_ids):
+        """Xóa nhiều công việc với một lần ghi. Trả về số công việc đã xóa."""
+        self._ensure_loaded()
+        task_ids = list(task_ids)
+        self._unarchive(task_ids)
+        with self._lock:
+            task_ids = [task_id for task_id in dict.fromkeys(task_ids) if task_id in self._tasks]
+            if not task_ids:
+                return 0
+            self._record([(task_id, self._tasks[task_id], None) for task_id in task_ids])
+            flush_now = self._commit([self._remove(task_id) for task_id in task_ids], task_ids)
+        if flush_now:
+            self.flush()
+        self._notify((), task_ids)
+        return len(task_ids)
+
+    def clear(self):
+        """Xóa mọi công việc, kể cả lưu trữ."""
+        self._ensure_loaded()
+        archived = []
+        if self.archive is not None:
+            if self.history is not None: # Hoàn tác được cả phần lưu trữ (đưa về dữ liệu chính)
+                archived = self.archive.query()
+            self.archive.clear()
+        with self._lock:
+            changes = [(task_id, record, None) for task_id, record in self._tasks.items()]
+            changes += [(record.id, record, None) for record in archived if record.id not in self._tasks]
+            self._reset([])
+            flush_now = self._commit([{"op": "clear"}])
+            self._record(changes)
+        if flush_now:
+            self.flush()
+        self._notify((), (), reset=True)
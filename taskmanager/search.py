@@ -0,0 +1,67 @@
+"""Chỉ mục tìm kiếm đảo (trigram) trên tiêu đề và mô tả."""
+from .model import normalize_text
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SearchIndex:
+    """Chỉ mục đảo (trigram -> tập ID) trên tiêu đề và mô tả, cập nhật tăng dần khi thêm/sửa/xóa."""
+
+    def __init__(self):
+        self._texts = {} # id -> văn bản đã chuẩn hóa
+        self._postings = {} # trigram -> tập ID
+        self.version = 0
+        self._last = None # (version, từ khóa, kết quả) của lần tìm gần nhất
+
+    def rebuild(self, tasks):
+        self._texts = {}
+        self._postings = {}
+        self.version += 1
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        """Thêm hoặc cập nhật chỉ mục cho một công việc."""
+        task_id = task["id"]
+        text = normalize_text(task.get("title", "") + "\n" + task.get("description", ""))
+        old_text = self._texts.get(task_id)
+        if old_text == text:
+            return
+        if old_text is not None:
+            self.remove(task_id)
+        self._texts[task_id] = text
+        for gram in trigrams(text):
+            self._postings.setdefault(gram, set()).add(task_id)
+        self.version += 1
+
+    def remove(self, task_id):
+        text = self._texts.pop(task_id, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self._postings[gram]
+        self.version += 1
+
+    def narrow(self, tasks, term):
+        """Các công việc trong `tasks` có tiêu đề hoặc mô tả chứa `term` (đã chuẩn hóa), giữ nguyên thứ tự."""
+        texts = self._texts
+        return [task for task in tasks if term in texts.get(task.id, "")]
+
+    def search(self, term):
+        """Trả về tập ID có tiêu đề hoặc mô tả chứa `term` (không phân biệt hoa thường, dấu)."""
+        term = normalize_text(term)
+        last = self._last
+        if last is not None and last[0] == self.version and term.startswith(last[1]):
+            candidates = last[2] # Gõ thêm ký tự: chỉ cần thu hẹp kết quả trước đó
+        elif len(term) >= 3:
+            posting_lists = sorted((self._postings.get(gram, set()) for gram in trigrams(term)), key=len)
+            candidates = set.intersection(*posting_lists) if posting_lists[0] else set()
+        else:
+            candidates = self._texts.keys() # Từ khóa quá ngắn để dùng trigram
+        result = {task_id for task_id in candidates if term in self._texts[task_id]}
+        self._last = (self.version, term, result)
+        return result
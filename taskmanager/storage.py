@@ -0,0 +1,501 @@
+"""Lưu trữ công việc: file JSON ghi nguyên tử, nhật ký chỉ ghi thêm và SQLite.
+
+Nhiều tiến trình có thể dùng chung dữ liệu: các lượt đọc-sửa-ghi được khóa
+(file .lock hoặc giao dịch SQLite). Nếu tiến trình khác đã ghi kể từ lần đọc
+trước, `commit` áp dụng thay đổi lên dữ liệu mới nhất trên đĩa và bỏ các thay
+đổi dựa trên phiên bản (`rev`) cũ của công việc; `commit` trả về ID của chúng.
+"""
+import json
+import logging
+import os
+import shutil
+import sqlite3 # Kiểu lưu trữ SQLite tùy chọn
+import tempfile # File tạm cho ghi nguyên tử
+import threading # Gộp nhật ký trên luồng nền
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import (BACKUP_SUFFIX, DATA_FILE, FILTER_ALL, JOURNAL_COMPACT_BYTES, JOURNAL_FILE, LOCK_SUFFIX,
+                     SQLITE_FILE, STORAGE_MODE)
+from . import instrument
+from .model import due_date_ordinal, normalize_text, priority_rank, task_rev, task_to_json
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+# --- Hàm quản lý File JSON ---
+def fsync_directory(directory):
+    """Đảm bảo thao tác đổi tên file trong thư mục đã được ghi xuống đĩa (chỉ trên POSIX)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+NEW_FILE_MODE = 0o666 & ~_current_umask() # Quyền của file mới tạo như open(..., 'w'); mkstemp luôn tạo 0600
+
+def copy_file_mode(path, tmp_path):
+    """Cho file tạm `tmp_path` quyền của `path` (hoặc quyền mặc định theo umask nếu `path` chưa có)."""
+    if os.path.exists(path):
+        shutil.copymode(path, tmp_path)
+    else:
+        os.chmod(tmp_path, NEW_FILE_MODE)
+
+def atomic_write_json(path, data):
+    """Ghi JSON an toàn: ghi ra file tạm, fsync rồi đổi tên. Bản cũ được giữ lại làm bản sao lưu.
+
+    Bản sao lưu được tạo bằng liên kết cứng (hoặc chép) trước khi đổi tên,
+    nên `path` luôn tồn tại: tiến trình khác không bao giờ thấy file bị thiếu.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    backup_tmp = tmp_path + BACKUP_SUFFIX
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4, default=task_to_json) # TaskRecord -> dict khi ghi
+            f.flush()
+            instrument.count("storage.bytes_written", f.tell())
+            os.fsync(f.fileno())
+        copy_file_mode(path, tmp_path)
+        if os.path.exists(path):
+            try:
+                os.link(path, backup_tmp) # Bản cũ trở thành bản sao lưu, không phải chép
+            except OSError: # Hệ thống file không hỗ trợ liên kết cứng
+                shutil.copy2(path, backup_tmp)
+            os.replace(backup_tmp, path + BACKUP_SUFFIX)
+        os.replace(tmp_path, path)
+    except BaseException:
+        for leftover in (tmp_path, backup_tmp):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    fsync_directory(directory)
+
+def read_task_file(path):
+    """Đọc danh sách công việc từ file JSON, báo lỗi ValueError nếu nội dung không hợp lệ."""
+    with open(path, 'r', encoding='utf-8') as f:
+        tasks = json.load(f)
+    if not isinstance(tasks, list):
+        raise ValueError("Dữ liệu công việc phải là một danh sách JSON")
+    return tasks
+
+def init_data_file(path=DATA_FILE):
+    """Khởi tạo file JSON nếu chưa tồn tại hoặc rỗng (ưu tiên khôi phục từ bản sao lưu nếu có)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        if os.path.exists(path + BACKUP_SUFFIX):
+            recover_tasks(path)
+            return
+        atomic_write_json(path, [])
+
+def recover_tasks(path=DATA_FILE):
+    """Khôi phục dữ liệu từ bản sao lưu gần nhất. File hỏng được giữ lại, không bị xóa."""
+    corrupt_path = None
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        corrupt_path = f"{path}.corrupt-{datetime.now():%Y%m%d%H%M%S}"
+        os.replace(path, corrupt_path)
+    kept_note = f"\nFile hỏng được giữ lại tại: {corrupt_path}" if corrupt_path else ""
+    try:
+        tasks = read_task_file(path + BACKUP_SUFFIX)
+    except (OSError, ValueError):
+        if corrupt_path:
+            logger.error("File JSON bị hỏng và không có bản sao lưu hợp lệ. Bắt đầu với danh sách rỗng." + kept_note)
+        atomic_write_json(path, [])
+        return []
+    atomic_write_json(path, tasks)
+    logger.warning(f"File JSON bị hỏng hoặc bị ghi dở. Đã khôi phục {len(tasks)} công việc từ bản sao lưu gần nhất." + kept_note)
+    return tasks
+
+def load_tasks(path=DATA_FILE):
+    """Đọc dữ liệu từ file JSON."""
+    init_data_file(path) # Đảm bảo file tồn tại trước khi đọc
+    try:
+        return read_task_file(path)
+    except ValueError: # Bao gồm cả json.JSONDecodeError
+        return recover_tasks(path) # Khôi phục thay vì ghi đè bằng danh sách rỗng
+
+def save_tasks(tasks, path=DATA_FILE):
+    """Lưu dữ liệu vào file JSON (ghi nguyên tử qua file tạm)."""
+    atomic_write_json(path, tasks)
+
+# --- Khóa và xung đột giữa các tiến trình ---
+@contextmanager
+def file_lock(path):
+    """Khóa độc quyền giữa các tiến trình (và luồng) qua file `path`.lock."""
+    with open(path + LOCK_SUFFIX, 'a+b') as f:
+        if os.name == 'nt':
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError: # LK_LOCK chỉ chờ khoảng 10 giây rồi báo lỗi
+                    continue
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def op_conflicts(current, op):
+    """Thay đổi `op` có dựa trên phiên bản cũ hơn `current` (công việc trên đĩa, None nếu không còn) không."""
+    if op["op"] == "edit":
+        return current is None or task_rev(current) != op.get("base", task_rev(current))
+    if op["op"] == "delete":
+        return current is not None and task_rev(current) != op.get("base", task_rev(current))
+    return False
+
+def merge_ops(tasks, ops):
+    """Áp dụng `ops` lên dict id -> task đọc từ đĩa, bỏ các thay đổi xung đột. Trả về (ops đã áp dụng, ID xung đột)."""
+    applied, conflicts = [], []
+    for op in ops:
+        if op_conflicts(tasks.get(op.get("id")), op):
+            conflicts.append(op["id"])
+        else:
+            apply_journal_record(tasks, op)
+            applied.append(op)
+    return applied, conflicts
+
+def tasks_by_id(tasks):
+    return {task.get("id") or str(uuid.uuid4()): task for task in tasks}
+
+# --- Các kiểu lưu trữ ---
+def file_stamp(path):
+    """Trả về (mtime_ns, size) của file, hoặc None nếu file không tồn tại."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class JsonStorage:
+    """Lưu toàn bộ danh sách vào một file JSON (ghi lại cả file mỗi lần thay đổi)."""
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self._stamp = None # Dấu vết file ở lần đọc/ghi gần nhất
+
+    def is_stale(self):
+        """File đã bị sửa từ bên ngoài kể từ lần đọc/ghi gần nhất hay chưa."""
+        stamp = file_stamp(self.path)
+        return stamp is None or stamp != self._stamp
+
+    def load(self):
+        with file_lock(self.path):
+            tasks = load_tasks(self.path)
+            self._stamp = file_stamp(self.path)
+        return tasks
+
+    def commit(self, ops, tasks):
+        """Ghi thay đổi. `tasks` là dict id -> task sau khi đã áp dụng `ops`. Trả về ID các công việc xung đột."""
+        with file_lock(self.path):
+            if not self.is_stale():
+                save_tasks(list(tasks.values()), self.path)
+                self._stamp = file_stamp(self.path)
+                return []
+            # Tiến trình khác đã ghi: áp dụng ops lên bản trên đĩa thay vì ghi đè bằng bản trong bộ nhớ
+            disk = tasks_by_id(load_tasks(self.path))
+            applied, conflicts = merge_ops(disk, ops)
+            if applied:
+                save_tasks(list(disk.values()), self.path)
+            # Không cập nhật _stamp: lần đọc tới sẽ lấy cả thay đổi của tiến trình khác
+            return conflicts
+
+class JournalStorage:
+    """Snapshot (định dạng tasks.json) + nhật ký JSON-lines chỉ ghi nối thêm.
+
+    Mỗi thay đổi chỉ ghi thêm một dòng vào nhật ký. Khi nhật ký vượt quá
+    `compact_bytes`, một luồng nền gộp lại thành snapshot mới.
+    """
+
+    def __init__(self, path=DATA_FILE, journal_path=JOURNAL_FILE, compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.journal_path = journal_path
+        self.old_journal_path = journal_path + ".old" # Nhật ký đang được gộp
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._compactor = None
+        self._stamps = {}
+
+    def _paths(self):
+        return (self.path, self.old_journal_path, self.journal_path)
+
+    def _touch(self, path):
+        self._stamps[path] = file_stamp(path)
+
+    def is_stale(self):
+        with self._lock:
+            return any(file_stamp(p) != self._stamps.get(p) for p in self._paths()) or not self._stamps
+
+    def load(self):
+        with file_lock(self.path), self._lock:
+            tasks = self._read(self.old_journal_path, self.journal_path)
+            for path in self._paths():
+                self._touch(path)
+        if os.path.exists(self.old_journal_path):
+            # Lần gộp trước bị gián đoạn: gộp lại ngay
+            self._start_compaction()
+        return list(tasks.values())
+
+    def _read(self, *journal_paths):
+        """Snapshot cộng các nhật ký, dạng dict id -> task (gọi khi đang giữ khóa file)."""
+        tasks = tasks_by_id(load_tasks(self.path))
+        for path in journal_paths:
+            self._replay(path, tasks)
+        return tasks
+
+    def _replay(self, path, tasks):
+        """Áp dụng các bản ghi trong nhật ký lên `tasks`. Cắt bỏ dòng cuối bị ghi dở."""
+        if not os.path.exists(path):
+            return
+        good_offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                apply_journal_record(tasks, record)
+                good_offset += len(line)
+        if good_offset < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good_offset)
+
+    def commit(self, ops, tasks):
+        """Ghi thêm các thay đổi vào nhật ký. Trả về ID các công việc xung đột."""
+        conflicts = []
+        with file_lock(self.path):
+            stale = self.is_stale()
+            if stale: # Tiến trình khác đã ghi: kiểm tra phiên bản trên dữ liệu mới nhất
+                with self._lock:
+                    ops, conflicts = merge_ops(self._read(self.old_journal_path, self.journal_path), ops)
+            lines = "".join(json.dumps(op, ensure_ascii=False, default=task_to_json) + "\n" for op in ops)
+            with self._lock:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    start = f.tell()
+                    f.write(lines)
+                    f.flush()
+                    instrument.count("storage.bytes_written", f.tell() - start)
+                    os.fsync(f.fileno()) # Một lần fsync cho cả nhóm thay đổi
+                self._touch(self.journal_path)
+                journal_size = self._stamps[self.journal_path][1]
+                if stale:
+                    self._stamps.clear() # Lần đọc tới sẽ lấy cả thay đổi của tiến trình khác
+        if journal_size >= self.compact_bytes:
+            self._start_compaction()
+        return conflicts
+
+    def _start_compaction(self):
+        """Đổi tên nhật ký hiện tại rồi gộp vào snapshot trên luồng nền."""
+        with file_lock(self.path), self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if not os.path.exists(self.old_journal_path):
+                if not os.path.exists(self.journal_path):
+                    return
+                os.replace(self.journal_path, self.old_journal_path)
+                self._touch(self.journal_path)
+                self._touch(self.old_journal_path)
+            self._compactor = threading.Thread(target=self._compact, name="journal-compaction")
+            self._compactor.start()
+
+    def _compact(self):
+        # Gộp từ dữ liệu trên đĩa (không dùng bản trong bộ nhớ): nhật ký cũ có thể chứa thay đổi của tiến trình khác
+        with file_lock(self.path):
+            with self._lock:
+                tasks = self._read(self.old_journal_path)
+            save_tasks(list(tasks.values()), self.path)
+            with self._lock:
+                self._touch(self.path)
+                try:
+                    os.remove(self.old_journal_path)
+                except FileNotFoundError:
+                    pass
+                self._touch(self.old_journal_path)
+
+class SqliteStorage:
+    """Lưu công việc trong SQLite (thư viện chuẩn), có chỉ mục theo ưu tiên, trạng thái và ngày hết hạn.
+
+    Lọc và sắp xếp mặc định được thực hiện bằng SQL. Lần mở đầu tiên sẽ tự
+    chuyển dữ liệu từ tasks.json sang.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,          -- Thứ tự thêm vào, giữ sắp xếp ổn định
+            priority TEXT,
+            priority_rank INTEGER NOT NULL,
+            status TEXT,
+            due_date TEXT,
+            due_ordinal INTEGER NOT NULL,  -- date.toordinal() của ngày hết hạn
+            search_text TEXT NOT NULL,     -- Tiêu đề + mô tả đã chuẩn hóa (normalize_text)
+            data TEXT NOT NULL             -- Toàn bộ công việc dạng JSON
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+        CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due_ordinal);
+        CREATE INDEX IF NOT EXISTS idx_tasks_default_order ON tasks(priority_rank, due_ordinal, seq);
+        CREATE INDEX IF NOT EXISTS idx_tasks_seq ON tasks(seq);  -- MAX(seq) khi thêm mới không phải quét cả bảng
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, path=SQLITE_FILE, json_path=DATA_FILE):
+        self.path = path
+        self.json_path = json_path
+        self._lock = threading.Lock() # Kết nối được dùng chung với luồng ghi nền
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+        self._data_version = None
+        self._migrate_from_json()
+        self._normalize_search_text()
+
+    def _migrate_from_json(self):
+        """Chuyển dữ liệu từ tasks.json sang SQLite một lần duy nhất."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+                return
+        tasks = load_tasks(self.json_path) if os.path.exists(self.json_path) else []
+        for task in tasks:
+            task.setdefault("id", str(uuid.uuid4()))
+        with self._lock, self._conn:
+            self._conn.executemany(self._UPSERT, [self._row(task) for task in tasks])
+            self._conn.execute("INSERT INTO meta VALUES ('migrated_from_json', ?)", (datetime.now().isoformat(),))
+
+    def _normalize_search_text(self):
+        """CSDL tạo trước khi tìm kiếm bỏ dấu: tính lại cột search_text một lần."""
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'search_text_normalized'").fetchone():
+                return
+            rows = self._conn.execute("SELECT id, data FROM tasks").fetchall()
+            self._conn.executemany("UPDATE tasks SET search_text = ? WHERE id = ?", [
+                (normalize_text(task.get("title", "") + "\n" + task.get("description", "")), task_id)
+                for task_id, task in ((task_id, json.loads(data)) for task_id, data in rows)
+            ])
+            self._conn.execute("INSERT INTO meta VALUES ('search_text_normalized', '1')")
+
+    _UPSERT = """
+        INSERT INTO tasks (id, seq, priority, priority_rank, status, due_date, due_ordinal, search_text, data)
+        VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks), ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            priority = excluded.priority, priority_rank = excluded.priority_rank,
+            status = excluded.status, due_date = excluded.due_date, due_ordinal = excluded.due_ordinal,
+            search_text = excluded.search_text, data = excluded.data
+    """
+
+    @staticmethod
+    def _row(task):
+        return (
+            task["id"],
+            task.get("priority"),
+            priority_rank(task.get("priority")),
+            task.get("status"),
+            task.get("due_date"),
+            due_date_ordinal(task.get("due_date")),
+            normalize_text(task.get("title", "") + "\n" + task.get("description", "")),
+            json.dumps(task, ensure_ascii=False, default=task_to_json),
+        )
+
+    def _current_data_version(self):
+        # data_version thay đổi khi một kết nối khác (tiến trình khác) ghi vào CSDL
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def is_stale(self):
+        with self._lock:
+            return self._data_version != self._current_data_version()
+
+    def load(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM tasks ORDER BY seq").fetchall()
+            self._data_version = self._current_data_version()
+        return [json.loads(data) for (data,) in rows]
+
+    def commit(self, ops, tasks):
+        """Ghi các thay đổi trong một giao dịch. Trả về ID các công việc xung đột."""
+        conflicts = []
+        with self._lock, self._conn: # Một giao dịch cho cả nhóm thay đổi
+            self._conn.execute("BEGIN IMMEDIATE") # Giữ khóa ghi từ lúc kiểm tra xung đột đến khi ghi xong
+            check = self._data_version != self._current_data_version() # Tiến trình khác đã ghi
+            for op in ops:
+                if check and op["op"] in ("edit", "delete"):
+                    row = self._conn.execute("SELECT data FROM tasks WHERE id = ?", (op["id"],)).fetchone()
+                    if op_conflicts(json.loads(row[0]) if row else None, op):
+                        conflicts.append(op["id"])
+                        continue
+                if op["op"] in ("add", "edit"):
+                    self._conn.execute(self._UPSERT, self._row(op["task"]))
+                elif op["op"] == "delete":
+                    self._conn.execute("DELETE FROM tasks WHERE id = ?", (op["id"],))
+                elif op["op"] == "clear":
+                    self._conn.execute("DELETE FROM tasks")
+        if conflicts:
+            self._data_version = None # Đọc lại để lấy bản trên đĩa của các công việc xung đột
+        return conflicts
+
+    def query(self, search_term="", filter_priority=FILTER_ALL, filter_status=FILTER_ALL):
+        """Trả về danh sách ID đã lọc và sắp xếp theo (ưu tiên, ngày hết hạn) bằng SQL."""
+        where, params = [], []
+        if search_term:
+            where.append("instr(search_text, ?) > 0")
+            params.append(normalize_text(search_term))
+        if filter_priority != FILTER_ALL:
+            where.append("priority = ?")
+            params.append(filter_priority)
+        if filter_status != FILTER_ALL:
+            where.append("status = ?")
+            params.append(filter_status)
+        sql = "SELECT id FROM tasks"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY priority_rank, due_ordinal, seq"
+        with self._lock:
+            return [task_id for (task_id,) in self._conn.execute(sql, params)]
+
+def apply_journal_record(tasks, record):
+    """Áp dụng một bản ghi nhật ký (add/edit/delete/clear) lên dict id -> task."""
+    op = record.get("op")
+    if op in ("add", "edit"):
+        tasks[record["id"]] = record["task"]
+    elif op == "delete":
+        tasks.pop(record["id"], None)
+    elif op == "clear":
+        tasks.clear()
+
+def sibling_path(data_file, suffix, default):
+    """File phụ nằm cạnh `data_file`: tên gốc + `suffix` (tasks.json -> tasks.journal.jsonl).
+
+    Với file dữ liệu mặc định (so theo đường dẫn tuyệt đối, nên ./tasks.json
+    cũng vậy) thì dùng `default` trong cấu hình.
+    """
+    if os.path.abspath(data_file) == os.path.abspath(DATA_FILE):
+        return default
+    return os.path.splitext(data_file)[0] + suffix
+
+def create_storage(mode=STORAGE_MODE, data_file=DATA_FILE):
+    """Tạo đối tượng lưu trữ theo cấu hình TASK_STORAGE.
+
+    Nhật ký và CSDL nằm cạnh `data_file` (tasks.json -> tasks.journal.jsonl, tasks.db).
+    """
+    journal_file = sibling_path(data_file, '.journal.jsonl', JOURNAL_FILE)
+    sqlite_file = sibling_path(data_file, '.db', SQLITE_FILE)
+    if mode == "journal":
+        return JournalStorage(data_file, journal_file, JOURNAL_COMPACT_BYTES)
+    if mode == "sqlite":
+        return SqliteStorage(sqlite_file, data_file)
+    return JsonStorage(data_file)
@@ -0,0 +1,252 @@
+"""Đồng bộ công việc từ API todos mẫu.
+
+`requests` chỉ được import khi thực sự gọi API, để phần lõi và CLI khởi động nhanh.
+"""
+import hashlib
+import json
+import sys
+import queue # Chuyển kết quả từ luồng tải API về giao diện
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from . import instrument
+from .config import (API_BACKOFF_SECONDS, API_CONNECT_TIMEOUT, API_PAGE_SIZE, API_READ_TIMEOUT, API_RETRIES,
+                     API_URL, DATA_FILE, SYNC_STATE_FILE)
+from .recurrence import make_repeat
+from .storage import atomic_write_json, sibling_path
+from .transfer import iter_json_array
+
+api_session = None # requests.Session dùng chung cho mọi lần tải (giữ kết nối)
+
+def get_api_session():
+    """Tạo (một lần) phiên HTTP có tự thử lại với thời gian chờ tăng dần."""
+    global api_session
+    if api_session is None:
+        import requests # Chỉ import khi thực sự gọi API
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retry = Retry(total=API_RETRIES, backoff_factor=API_BACKOFF_SECONDS,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        api_session = requests.Session()
+        api_session.mount("http://", HTTPAdapter(max_retries=retry))
+        api_session.mount("https://", HTTPAdapter(max_retries=retry))
+    return api_session
+
+def transform_api_item(item):
+    """Biến một mục từ API thành công việc với nội dung tùy chỉnh; trả về None nếu bỏ qua."""
+    original_id = item.get("id", "N/A")
+
+    # --- BẮT ĐẦU PHẦN TÙY CHỈNH NỘI DUNG VÀ LỌC ---
+
+    custom_title = ""
+    custom_description = ""
+    custom_due_date = ""
+    custom_priority = ""
+    custom_status = ""
+    custom_repeat = None
+
+    if original_id == 1:
+        custom_title = "Đi học"
+        custom_description = "Chuẩn bị sách vở, đồng phục và đến trường đúng giờ. Đừng quên bài tập về nhà!"
+        custom_due_date = (datetime.now() + timedelta(days=1)).strftime('%d/%m/%Y') 
+        custom_priority = "Cao"
+        custom_status = "Cần thực hiện"
+        custom_repeat = make_repeat("daily") # Một công việc lặp hằng ngày thay vì mỗi ngày một bản sao
+    elif original_id == 2:
+        custom_title = "Đi làm thêm ca tối"
+        custom_description = "Hoàn thành các nhiệm vụ được giao tại nơi làm thêm. Giao tiếp tốt với đồng nghiệp và về nhà an toàn."
+        custom_due_date = (datetime.now() + timedelta(days=3)).strftime('%d/%m/%Y') 
+        custom_priority = "Cao"
+        custom_status = "Đang thực hiện"
+    elif original_id == 3:
+        custom_title = "đi chơi "
+        custom_description = "giải trính."
+        custom_due_date = (datetime.now() + timedelta(days=6)).strftime('%d/%m/%Y') 
+        custom_priority = "Thấp"
+        custom_status = "Hoàn thành"
+    else:
+        # Nếu không khớp với bất kỳ ID cụ thể nào, BỎ QUA công việc này
+        return None
+
+    # --- KẾT THÚC PHẦN TÙY CHỈNH NỘI DUNG VÀ LỌC ---
+
+    task = {
+        "id": str(uuid.uuid4()), # Luôn tạo ID duy nhất cho ứng dụng
+        "title": custom_title,
+        "description": custom_description,
+        "due_date": custom_due_date,
+        "priority": custom_priority,
+        "status": custom_status
+    }
+    if custom_repeat:
+        task["repeat"] = custom_repeat
+    return task
+
+def is_request_error(exc):
+    """Lỗi kết nối/HTTP của requests (không import requests nếu chưa từng gọi API)."""
+    requests = sys.modules.get("requests")
+    return requests is not None and isinstance(exc, requests.exceptions.RequestException)
+
+class ApiCancelled(Exception):
+    """Người dùng đã hủy việc tải từ API."""
+
+def sync_state_path(data_file=DATA_FILE):
+    """File trạng thái đồng bộ nằm cạnh `data_file` (tasks.json -> api_sync.json, khac.json -> khac.api_sync.json)."""
+    return sibling_path(data_file, '.api_sync.json', SYNC_STATE_FILE)
+
+def load_sync_state(path=SYNC_STATE_FILE):
+    """Trạng thái đồng bộ: ETag/Last-Modified theo trang và ánh xạ ID từ xa -> ID công việc."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("pages", {}) # "_start:_limit" -> {"etag", "last_modified", "count"}
+    state.setdefault("items", {}) # ID từ xa -> {"task_id", "hash"}
+    return state
+
+def api_item_hash(item):
+    return hashlib.sha1(json.dumps(item, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+@instrument.timed("api.sync")
+def sync_api_tasks(cancel_event, report_progress, url=API_URL, state_path=SYNC_STATE_FILE):
+    """Đồng bộ tăng dần từ API (chạy trên luồng phụ, không được chạm vào Tk).
+
+    Tải theo trang (_start/_limit) với yêu cầu có điều kiện (ETag/If-Modified-Since),
+    phân tích từng phần tử ngay khi nhận được và chỉ trả về các mục đã thay đổi
+    so với lần đồng bộ trước.
+    """
+    state = load_sync_state(state_path)
+    known_items = state["items"]
+    changes = [] # (ID từ xa, hash, công việc đã biến đổi)
+    unchanged = 0
+    seen = set()
+
+    def chunks(response):
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if cancel_event.is_set():
+                raise ApiCancelled()
+            yield chunk
+
+    start = 0
+    while True:
+        page_key = f"{start}:{API_PAGE_SIZE}"
+        page_state = state["pages"].get(page_key, {})
+        headers = {}
+        if page_state.get("etag"):
+            headers["If-None-Match"] = page_state["etag"]
+        if page_state.get("last_modified"):
+            headers["If-Modified-Since"] = page_state["last_modified"]
+        response = get_api_session().get(url, params={"_start": start, "_limit": API_PAGE_SIZE}, headers=headers,
+                                         timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT), stream=True)
+        with response:
+            if response.status_code == 304: # Trang không đổi kể từ lần trước
+                count = page_state.get("count", 0)
+                unchanged += count
+            else:
+                response.raise_for_status() # Kiểm tra lỗi HTTP (ví dụ: 404, 500)
+                count = 0
+                for item in iter_json_array(chunks(response)):
+                    count += 1
+                    remote_id = str(item.get("id"))
+                    if remote_id in seen:
+                        continue
+                    seen.add(remote_id)
+                    task = transform_api_item(item)
+                    if task is None:
+                        continue
+                    item_hash = api_item_hash(item)
+                    if known_items.get(remote_id, {}).get("hash") == item_hash:
+                        unchanged += 1
+                    else:
+                        changes.append((remote_id, item_hash, task))
+                state["pages"][page_key] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "count": count,
+                }
+        instrument.count("api.page_items", count)
+        report_progress(f"Đang đồng bộ từ API... đã xử lý {start + count} mục")
+        # Dừng khi hết dữ liệu, hoặc máy chủ bỏ qua phân trang và trả về tất cả
+        if count == 0 or count != API_PAGE_SIZE:
+            break
+        start += API_PAGE_SIZE
+    return {"state": state, "changes": changes, "unchanged": unchanged}
+
+@instrument.timed("api.apply")
+def apply_api_sync(result, repo, state_path=SYNC_STATE_FILE):
+    """Upsert kết quả đồng bộ vào kho dữ liệu (luồng giao diện). Trả về (số thêm, số cập nhật)."""
+    state = result["state"]
+    known_items = state["items"]
+    legacy = None # (tiêu đề, mô tả) -> ID của công việc đã nhập trước khi có ánh xạ
+    to_add, to_update = [], []
+    for remote_id, item_hash, task in result["changes"]:
+        known = known_items.get(remote_id)
+        if known is None:
+            if legacy is None:
+                legacy = {(t.get("title"), t.get("description")): t["id"] for t in repo.all()}
+            existing_id = legacy.get((task["title"], task["description"]))
+            if existing_id is not None: # Nhận lại công việc đã nhập từ trước thay vì tạo bản sao
+                known_items[remote_id] = {"task_id": existing_id, "hash": item_hash}
+                continue
+            to_add.append(task)
+        else:
+            task["id"] = known["task_id"] # Giữ nguyên ID cục bộ
+            (to_update if repo.get(task["id"]) is not None else to_add).append(task)
+        known_items[remote_id] = {"task_id": task["id"], "hash": item_hash}
+    if to_add:
+        repo.add_many(to_add)
+    if to_update:
+        repo.update_many(to_update)
+    atomic_write_json(state_path, state)
+    return len(to_add), len(to_update)
+
+class ApiImportJob:
+    """Chạy việc tải từ API trên luồng phụ; kết quả gửi về luồng giao diện qua hàng đợi được root.after đọc định kỳ."""
+
+    POLL_MS = 100
+
+    def __init__(self, root, work, on_progress, on_finish):
+        self.root = root
+        self.work = work # work(cancel_event, report_progress) -> kết quả
+        self.on_progress = on_progress
+        self.on_finish = on_finish # on_finish(kind, payload), kind là "done"/"error"/"cancelled"
+        self.cancel_event = threading.Event()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="api-import", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _run(self):
+        try:
+            result = self.work(self.cancel_event, lambda text: self._queue.put(("progress", text)))
+        except ApiCancelled:
+            self._queue.put(("cancelled", None))
+        except Exception as e: # Gửi mọi lỗi về luồng giao diện để hiển thị
+            self._queue.put(("error", e))
+        else:
+            self._queue.put(("cancelled", None) if self.cancel_event.is_set() else ("done", result))
+
+    def _poll(self):
+        try:
+            while True:
+                kind, payload = self._queue.get_nowait()
+                if kind == "progress":
+                    self.on_progress(payload)
+                else:
+                    self.on_finish(kind, payload)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self._poll)
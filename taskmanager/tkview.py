@@ -0,0 +1,234 @@
+"""Hiển thị danh sách công việc trên ttk.Treeview: đồng bộ tăng dần và danh sách ảo.
+
+Module không import tkinter, nên có thể chạy với một Treeview giả (ví dụ khi đo hiệu năng).
+"""
+import bisect
+
+from . import instrument
+from .config import ROW_HEIGHT, VIRTUAL_BUFFER_ROWS, VIRTUAL_LIST_THRESHOLD
+
+def task_row(task):
+    """Trả về (values, tags) của một hàng Treeview cho công việc."""
+    # Đảm bảo các trường tồn tại trước khi truy cập
+    task_id = task.get("id", "")
+    title = task.get("title", "")
+    due_date = task.get("due_date", "")
+    priority = task.get("priority", "")
+    status = task.get("status", "")
+    description = task.get("description", "") # Cột mô tả sẽ được ẩn
+
+    # Xác định màu sắc dựa trên ưu tiên và trạng thái
+    tags = (task_id,) # Tag đầu tiên là ID của công việc
+    if status == "Hoàn thành":
+        tags += ("done_task",) # Màu xanh lá
+    elif priority == "Cao":
+        tags += ("high_priority",) # Màu đỏ
+    elif priority == "Thấp":
+        tags += ("low_priority",) # Màu xanh dương nhạt
+    return (title, due_date, priority, status, description), tags
+
+def longest_increasing_subsequence(seq):
+    """Trả về tập chỉ số (trong seq) của một dãy con tăng dài nhất, O(n log n)."""
+    tails, tails_idx, prev = [], [], [None] * len(seq)
+    for i, value in enumerate(seq):
+        pos = bisect.bisect_left(tails, value)
+        if pos == len(tails):
+            tails.append(value)
+            tails_idx.append(i)
+        else:
+            tails[pos] = value
+            tails_idx[pos] = i
+        prev[i] = tails_idx[pos - 1] if pos > 0 else None
+    result = set()
+    i = tails_idx[-1] if tails_idx else None
+    while i is not None:
+        result.add(i)
+        i = prev[i]
+    return result
+
+class TreeviewSync:
+    """Đồng bộ Treeview với danh sách công việc, chỉ gửi các lệnh insert/item/delete/move cần thiết.
+
+    Mỗi hàng dùng ID công việc làm iid, nên không cần dò tìm hàng theo tags.
+    """
+
+    BULK_REORDER_THRESHOLD = 64 # Nhiều hàng đổi chỗ hơn mức này thì sắp lại bằng một lệnh set_children
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._rows = {} # id -> (values, tags) đang hiển thị
+        self._order = [] # Thứ tự ID đang hiển thị
+
+    def sync(self, tasks):
+        """Đưa Treeview về đúng danh sách `tasks` (đã lọc và sắp xếp)."""
+        with instrument.span("view.sync"):
+            self._sync(tasks)
+
+    def _sync(self, tasks):
+        tree = self.tree
+        new_rows = {}
+        for task in tasks:
+            new_rows[task["id"]] = task_row(task)
+        new_order = list(new_rows)
+
+        removed = [task_id for task_id in self._order if task_id not in new_rows]
+        if removed:
+            tree.delete(*removed)
+            for task_id in removed:
+                del self._rows[task_id]
+        kept = [task_id for task_id in self._order if task_id in new_rows]
+
+        # Cập nhật nội dung các hàng đã thay đổi
+        changed = 0
+        for task_id in kept:
+            row = new_rows[task_id]
+            if self._rows[task_id] != row:
+                tree.item(task_id, values=row[0], tags=row[1])
+                changed += 1
+
+        # Các hàng giữ nguyên vị trí tương đối là một dãy con tăng dài nhất
+        position = {task_id: index for index, task_id in enumerate(new_order)}
+        stable_idx = longest_increasing_subsequence([position[task_id] for task_id in kept])
+        moved = [task_id for i, task_id in enumerate(kept) if i not in stable_idx]
+        added = [task_id for task_id in new_order if task_id not in self._rows]
+
+        if len(moved) > self.BULK_REORDER_THRESHOLD:
+            for task_id in added:
+                values, tags = new_rows[task_id]
+                tree.insert("", "end", iid=task_id, values=values, tags=tags)
+            tree.set_children("", *new_order)
+        elif moved or added:
+            if moved:
+                tree.detach(*moved) # Chỉ còn các hàng ổn định, đúng thứ tự tương đối
+            moved_set = set(moved)
+            for index, task_id in enumerate(new_order):
+                if task_id in moved_set:
+                    tree.move(task_id, "", index)
+                elif task_id not in self._rows:
+                    values, tags = new_rows[task_id]
+                    tree.insert("", index, iid=task_id, values=values, tags=tags)
+
+        self._rows = new_rows
+        self._order = new_order
+        if instrument.enabled:
+            instrument.count("view.rows_rendered", len(added) + changed) # Số hàng gửi xuống Tk (insert/item)
+            instrument.count("view.rows_moved", len(moved))
+            instrument.count("view.rows_removed", len(removed))
+
+    def remove(self, task_id):
+        """Xóa một hàng mà không cần làm mới cả danh sách."""
+        if task_id in self._rows:
+            self.tree.delete(task_id)
+            del self._rows[task_id]
+            self._order.remove(task_id)
+
+    def clear(self):
+        if self._order:
+            self.tree.delete(*self._order)
+        self._rows = {}
+        self._order = []
+
+class VirtualTaskView:
+    """Danh sách ảo: khi có nhiều công việc, Treeview chỉ chứa các hàng trong vùng nhìn thấy (cộng một ít dự phòng).
+
+    Thanh cuộn được điều khiển theo vị trí trong danh sách đã lọc/sắp xếp,
+    dữ liệu hàng chỉ được lấy ra khi cần hiển thị.
+    """
+
+    def __init__(self, tree, scrollbar, threshold=VIRTUAL_LIST_THRESHOLD, buffer_rows=VIRTUAL_BUFFER_ROWS):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.threshold = threshold
+        self.buffer_rows = buffer_rows
+        self.rows = TreeviewSync(tree)
+        self._tasks = [] # Toàn bộ kết quả đã lọc/sắp xếp (chưa hiển thị hết)
+        self.offset = 0 # Chỉ số hàng đầu tiên đang hiển thị
+        self.virtual = False
+        tree.configure(yscrollcommand=self._on_tree_scroll)
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", lambda event: self._render())
+        tree.bind("<MouseWheel>", self._on_mousewheel) # Windows/macOS
+        tree.bind("<Button-4>", lambda event: self._on_wheel_units(-1)) # Linux
+        tree.bind("<Button-5>", lambda event: self._on_wheel_units(1))
+        tree.bind("<Up>", lambda event: self._on_arrow(-1))
+        tree.bind("<Down>", lambda event: self._on_arrow(1))
+
+    def set_tasks(self, tasks):
+        """Hiển thị danh sách đã lọc/sắp xếp (toàn bộ, hoặc chỉ vùng nhìn thấy nếu quá lớn)."""
+        self._tasks = tasks
+        self.virtual = len(tasks) > self.threshold
+        self._render()
+
+    def visible_count(self):
+        # Trừ một hàng cho phần tiêu đề cột
+        return max(1, self.tree.winfo_height() // ROW_HEIGHT - 1)
+
+    def _render(self):
+        if not self.virtual:
+            self.offset = 0
+            self.rows.sync(self._tasks)
+            return
+        visible = self.visible_count()
+        max_offset = max(0, len(self._tasks) - visible)
+        self.offset = min(max(0, self.offset), max_offset)
+        self.rows.sync(self._tasks[self.offset:self.offset + visible + self.buffer_rows])
+        self.tree.yview_moveto(0)
+        total = len(self._tasks)
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+
+    def _on_tree_scroll(self, first, last):
+        if not self.virtual: # Danh sách nhỏ: để Treeview tự cuộn như bình thường
+            self.scrollbar.set(first, last)
+
+    def yview(self, *args):
+        """Thay cho treeview.yview khi được gọi từ thanh cuộn."""
+        if not self.virtual:
+            return self.tree.yview(*args)
+        visible = self.visible_count()
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self._tasks))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (visible if args[2] == "pages" else 1)
+            self.offset += step
+        self._render()
+
+    def _on_mousewheel(self, event):
+        return self._on_wheel_units(-1 if event.delta > 0 else 1)
+
+    def _on_wheel_units(self, units):
+        if not self.virtual:
+            return None
+        self.yview("scroll", units * 3, "units")
+        return "break"
+
+    def _on_arrow(self, step):
+        """Cuộn danh sách ảo khi dùng phím mũi tên ở mép vùng nhìn thấy."""
+        if not self.virtual:
+            return None
+        focus = self.tree.focus()
+        children = self.tree.get_children("")
+        if not focus or focus not in children:
+            return None
+        index = children.index(focus) + step
+        if 0 <= index < self.visible_count():
+            return None # Treeview tự xử lý khi chưa chạm mép
+        self.yview("scroll", step, "units")
+        new_index = self.offset + min(max(0, index), self.visible_count() - 1)
+        if 0 <= new_index < len(self._tasks):
+            task_id = self._tasks[new_index]["id"]
+            self.tree.focus(task_id)
+            self.tree.selection_set(task_id)
+        return "break"
+
+    def remove(self, task_id):
+        """Xóa một công việc khỏi danh sách đang hiển thị."""
+        self._tasks = [task for task in self._tasks if task["id"] != task_id]
+        if self.virtual:
+            self._render()
+        else:
+            self.rows.remove(task_id)
+
+    def clear(self):
+        self._tasks = []
+        self.rows.clear()
+        self.scrollbar.set(0, 1)
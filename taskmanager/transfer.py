@@ -0,0 +1,144 @@
+"""Nhập/xuất công việc dạng CSV, JSON-lines và JSON theo kiểu luồng (từng bản ghi một)."""
+import codecs # Giải mã UTF-8 dần khi đọc luồng dữ liệu
+import csv
+import itertools
+import json
+import os
+import textwrap
+import uuid
+
+from .model import task_to_json
+
+TASK_FIELDS = ["id", "title", "description", "due_date", "priority", "status"]
+TASK_DEFAULTS = {"title": "", "description": "", "due_date": "", "priority": "Cao", "status": "Cần thực hiện"} # Giống giá trị mặc định trên form
+IMPORT_CHUNK_SIZE = 10000 # Số bản ghi đưa vào kho mỗi lần khi nhập
+READ_CHUNK_CHARS = 64 * 1024
+
+def iter_json_array(chunks):
+    """Phân tích dần một mảng JSON từ các khối bytes/str, trả về từng phần tử ngay khi đọc đủ.
+
+    Số/chuỗi/true/false/null chỉ được coi là đủ khi đã thấy ',' hoặc ']' sau
+    nó (số có thể bị cắt giữa chừng, vd. "2." rồi "5"), hoặc khi đã hết dữ liệu.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf, pos, started = '', 0, False
+    for chunk in itertools.chain(chunks, [None]): # None: đã hết dữ liệu
+        final = chunk is None
+        if final:
+            text = text_decoder.decode(b'', final=True)
+        else:
+            text = text_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        buf = buf[pos:] + text
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != '[':
+                    raise json.JSONDecodeError("Expecting '['", buf, pos)
+                started = True
+                pos += 1
+            elif buf[pos] == ',':
+                pos += 1
+            elif buf[pos] == ']':
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break # Phần tử chưa nhận đủ, chờ khối tiếp theo
+                if not final and not isinstance(item, (dict, list)) and not _followed_by_separator(buf, end):
+                    break # Có thể còn tiếp ở khối sau
+                yield item
+                pos = end
+    raise json.JSONDecodeError("Unexpected end of JSON array", buf, pos)
+
+def _followed_by_separator(buf, pos):
+    """Sau vị trí `pos` (bỏ khoảng trắng) là ',' hoặc ']'."""
+    while pos < len(buf) and buf[pos] in ' \t\r\n':
+        pos += 1
+    return pos < len(buf) and buf[pos] in ',]'
+
+def iter_lines(chunks):
+    """Tách các khối văn bản thành từng dòng."""
+    buf = ""
+    for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split("\n")
+        yield from lines
+    if buf:
+        yield buf
+
+def iter_task_records(stream, fmt=None):
+    """Đọc từng bản ghi từ luồng văn bản theo định dạng "csv", "jsonl" hoặc "json" (mảng).
+
+    Nếu không biết định dạng, nhìn ký tự đầu tiên: '[' là mảng JSON, còn lại là JSON-lines.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    head = stream.read(READ_CHUNK_CHARS)
+    chunks = itertools.chain([head], iter(lambda: stream.read(READ_CHUNK_CHARS), ""))
+    if fmt is None:
+        fmt = "json" if head.lstrip()[:1] == "[" else "jsonl"
+    if fmt == "json":
+        yield from iter_json_array(chunks)
+    else:
+        for line in iter_lines(chunks):
+            if line.strip():
+                yield json.loads(line)
+
+def detect_format(path):
+    """Đoán định dạng theo đuôi file; None nghĩa là tự nhận biết JSON/JSON-lines từ nội dung."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return None
+
+def normalize_record(record):
+    """Đưa một bản ghi nhập vào về đúng dạng công việc, bổ sung ID và giá trị mặc định."""
+    task = {field: record.get(field) or default for field, default in TASK_DEFAULTS.items()}
+    task["id"] = record.get("id") or str(uuid.uuid4())
+    for key, value in record.items(): # Giữ lại các trường khác (nếu có)
+        task.setdefault(key, value)
+    return task
+
+def import_tasks(repo, stream, fmt=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Nhập công việc theo từng khối, bộ nhớ đệm không phụ thuộc kích thước file; ghi một lần ở cuối."""
+    count = 0
+    chunk = []
+    with repo.batch():
+        for record in iter_task_records(stream, fmt):
+            chunk.append(normalize_record(record))
+            if len(chunk) >= chunk_size:
+                repo.add_many(chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            repo.add_many(chunk)
+            count += len(chunk)
+    return count
+
+def export_tasks(tasks, stream, fmt):
+    """Ghi công việc ra luồng theo từng bản ghi (không dựng toàn bộ nội dung trong bộ nhớ)."""
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=TASK_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for task in tasks:
+            writer.writerow(task)
+    elif fmt == "jsonl":
+        for task in tasks:
+            stream.write(json.dumps(task, ensure_ascii=False, default=task_to_json) + "\n")
+    else: # Mảng JSON cùng định dạng với tasks.json
+        stream.write("[")
+        for index, task in enumerate(tasks):
+            stream.write(",\n" if index else "\n")
+            stream.write(textwrap.indent(json.dumps(task, ensure_ascii=False, indent=4, default=task_to_json), "    "))
+        stream.write("\n]\n")
@@ -0,0 +1,5 @@
+"""Kiểm thử tự động cho phần lõi (không cần màn hình, không cần mạng).
+
+    python -m pytest -q tests
+    python -m unittest discover -s tests -t .
+"""
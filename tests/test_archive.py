@@ -0,0 +1,78 @@
+"""Lưu trữ công việc hoàn thành từ lâu: chuyển sang file nén, sửa/xóa sau đó không để bản cũ quay lại."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from taskmanager.archive import TaskArchive, archive_path, read_archive
+from taskmanager.repository import TaskRepository
+from taskmanager.storage import create_storage
+
+DONE = "Hoàn thành"
+
+def old_done_task(task_id, title):
+    return {"id": task_id, "title": title, "status": DONE, "due_date": "01/01/2020"}
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="taskarchive-")
+        self.data_file = os.path.join(self.work_dir, "tasks.json")
+        self.repo = self.open()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def open(self):
+        return TaskRepository(create_storage("json", self.data_file), commit_window_ms=0,
+                              archive=TaskArchive(archive_path(self.data_file)))
+
+    def done_titles(self, repo):
+        return sorted(task["title"] for task in repo.query(filter_status=DONE))
+
+    def archived_ids(self):
+        return sorted(read_archive(archive_path(self.data_file)))
+
+    def test_archive_moves_old_done_tasks(self):
+        self.repo.add_many([old_done_task("1", "cũ"), {"id": "2", "title": "đang làm", "status": "Cần thực hiện"}])
+        self.assertEqual(self.repo.archive_completed(), 1)
+        self.assertEqual([task.id for task in self.repo.all()], ["2"])
+        self.assertEqual(self.archived_ids(), ["1"])
+        self.assertEqual(self.done_titles(self.repo), ["cũ"]) # Lọc "Hoàn thành" có cả lưu trữ
+        self.assertEqual(self.done_titles(self.open()), ["cũ"])
+
+    def test_edit_archived_task_moves_it_back(self):
+        self.repo.add(old_done_task("1", "cũ"))
+        self.repo.archive_completed()
+        task = self.repo.archive.get("1").to_dict()
+        self.assertTrue(self.repo.update(dict(task, title="mở lại", status="Cần thực hiện")))
+        self.assertEqual(self.archived_ids(), [])
+        self.assertEqual([task["title"] for task in self.open().all()], ["mở lại"])
+
+    def test_delete_archived_task(self):
+        self.repo.add(old_done_task("1", "cũ"))
+        self.repo.archive_completed()
+        self.assertEqual(self.repo.delete_many(["1"]), 1)
+        self.assertEqual(self.archived_ids(), [])
+        self.assertEqual(self.done_titles(self.open()), [])
+
+    def test_task_edited_while_archiving_stays_deleted(self):
+        self.repo.add(old_done_task("1", "cũ"))
+        tasks = self.repo.archive_candidates()
+        self.repo.archive.append(tasks)
+        self.repo.update(dict(self.repo.get("1").to_dict(), title="sửa trong lúc lưu trữ"))
+        self.assertEqual(self.repo.drop_archived(tasks), 0) # Đã bị sửa: giữ trong dữ liệu chính
+        self.assertEqual(self.archived_ids(), [])
+        self.assertTrue(self.repo.delete("1"))
+        self.assertEqual(self.done_titles(self.repo), [])
+        self.assertEqual(self.done_titles(self.open()), [])
+
+    def test_leftover_archive_copy_is_removed_on_delete(self):
+        self.repo.add(old_done_task("1", "cũ"))
+        self.repo.archive.append(self.repo.archive_candidates()) # Dừng trước khi bỏ khỏi dữ liệu chính
+        repo = self.open()
+        self.assertTrue(repo.delete("1"))
+        self.assertEqual(self.archived_ids(), [])
+        self.assertEqual(self.done_titles(self.open()), [])
+
+if __name__ == "__main__":
+    unittest.main()
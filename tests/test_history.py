@@ -0,0 +1,90 @@
+"""Hoàn tác/làm lại: dùng lại được sau khi mở lại, không ghi đè thay đổi của nơi khác, bỏ bước quá lớn."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from taskmanager.history import UndoHistory, history_path
+from taskmanager.repository import TaskRepository
+from taskmanager.storage import create_storage
+
+STORAGE_MODES = ("json", "journal", "sqlite")
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="taskhistory-")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def open(self, mode="json", history=True, **history_options):
+        """Kho kèm lịch sử ghi ra file, như mỗi lần mở ứng dụng hoặc chạy một lệnh."""
+        data_file = os.path.join(self.work_dir, mode + ".json")
+        return TaskRepository(create_storage(mode, data_file), commit_window_ms=0,
+                              history=UndoHistory(history_path(data_file), **history_options) if history else None)
+
+    def titles(self, repo):
+        return sorted(task["title"] for task in repo.all())
+
+    def test_undo_and_redo_after_restart(self):
+        for mode in STORAGE_MODES:
+            with self.subTest(mode=mode):
+                repo = self.open(mode)
+                repo.add_many([{"id": "1", "title": "a"}, {"id": "2", "title": "b"}])
+                repo.update(dict(repo.get("1").to_dict(), title="a2"))
+                repo.delete("2")
+                repo = self.open(mode)
+                self.assertIsNotNone(repo.undo()) # Xóa
+                self.assertEqual(self.titles(self.open(mode)), ["a2", "b"])
+                repo = self.open(mode)
+                self.assertIsNotNone(repo.undo()) # Sửa
+                self.assertEqual(self.titles(self.open(mode)), ["a", "b"])
+                repo = self.open(mode)
+                self.assertIsNotNone(repo.redo())
+                self.assertIsNotNone(repo.redo())
+                self.assertIsNone(repo.redo())
+                self.assertEqual(self.titles(self.open(mode)), ["a2"])
+                repo = self.open(mode)
+                self.assertIsNotNone(repo.undo())
+                self.assertIsNotNone(repo.undo())
+                self.assertIsNotNone(repo.undo()) # Thêm
+                self.assertIsNone(repo.undo())
+                self.assertEqual(self.titles(self.open(mode)), [])
+                self.assertEqual(repo.check_external_changes(), [])
+
+    def test_undo_skips_task_changed_elsewhere(self):
+        for mode in STORAGE_MODES:
+            with self.subTest(mode=mode):
+                repo = self.open(mode)
+                repo.add_many([{"id": "1", "title": "a"}, {"id": "2", "title": "b"}])
+                repo.update_many([dict(repo.get(task_id).to_dict(), title=title)
+                                  for task_id, title in (("1", "a2"), ("2", "b2"))])
+                other = self.open(mode, history=False) # Tiến trình khác không ghi lịch sử (vd. TASK_HISTORY_PERSIST=0)
+                other.update(dict(other.get("2").to_dict(), title="b ở nơi khác"))
+                self.assertIsNotNone(repo.undo())
+                self.assertEqual(repo.check_external_changes(), ["2"])
+                self.assertEqual(self.titles(self.open(mode)), ["a", "b ở nơi khác"])
+
+    def test_oversized_step_clears_history(self):
+        repo = self.open(max_step_bytes=10000)
+        repo.add({"id": "0", "title": "nhỏ"})
+        repo.add_many([{"id": str(i), "title": f"công việc {i}"} for i in range(1, 200)])
+        self.assertFalse(repo.history.can_undo())
+        self.assertEqual(os.path.getsize(repo.history.path), 0)
+        repo.add({"id": "x", "title": "sau đó"})
+        repo = self.open(max_step_bytes=10000)
+        self.assertIsNotNone(repo.undo())
+        self.assertIsNone(repo.undo())
+        self.assertEqual(len(repo.all()), 200)
+
+    def test_button_state_without_reading_file(self):
+        repo = self.open()
+        history = UndoHistory(repo.history.path)
+        self.assertFalse(history.may_undo()) # Chưa có file lịch sử
+        repo.add({"id": "1", "title": "a"})
+        self.assertTrue(history.may_undo())
+        history.push([("1", None, repo.get("1"))])
+        self.assertFalse(history.may_redo()) # Thêm bước mới thì không còn gì để làm lại
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Lịch nhắc nhở: nhắc đúng các công việc sắp đến hạn, mỗi ngày hết hạn một lần, theo dõi thay đổi của kho."""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from taskmanager.reminders import ReminderScheduler
+from taskmanager.repository import TaskRepository
+from taskmanager.storage import create_storage
+
+def due_in(days):
+    return (date.today() + timedelta(days=days)).strftime('%d/%m/%Y')
+
+class FakeRoot:
+    """Thay cho Tk: giữ lần hẹn after() gần nhất để chạy khi cần."""
+
+    def __init__(self):
+        self.pending = None
+
+    def after(self, delay_ms, callback):
+        self.pending = (delay_ms, callback)
+        return id(callback)
+
+    def after_cancel(self, after_id):
+        self.pending = None
+
+    def run_due(self):
+        """Chạy lần hẹn nếu đã đến lúc (độ trễ 0)."""
+        if self.pending is not None and self.pending[0] == 0:
+            self.pending[1]()
+
+class ReminderTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="taskreminder-")
+        self.repo = TaskRepository(create_storage("json", os.path.join(self.work_dir, "tasks.json")),
+                                   commit_window_ms=0)
+        self.root = FakeRoot()
+        self.notified = []
+        self.path = os.path.join(self.work_dir, "reminders.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def start(self):
+        scheduler = ReminderScheduler(self.root, self.repo, self.notify, self.path)
+        scheduler.start()
+        return scheduler
+
+    def notify(self, due_now):
+        self.notified.append([(days_left, task["title"]) for days_left, task in due_now])
+
+    def test_due_tasks_are_notified_once(self):
+        self.repo.add_many([{"id": "1", "title": "sắp đến hạn", "due_date": due_in(2)},
+                            {"id": "2", "title": "còn xa", "due_date": due_in(20)},
+                            {"id": "3", "title": "đã xong", "due_date": due_in(1), "status": "Hoàn thành"}])
+        self.start()
+        self.root.run_due()
+        self.assertEqual(self.notified, [[(2, "sắp đến hạn")]])
+        self.root.run_due()
+        self.start() # Mở lại ứng dụng: nhắc nhở đã hiện không lặp lại
+        self.root.run_due()
+        self.assertEqual(len(self.notified), 1)
+
+    def test_changes_update_the_schedule(self):
+        self.repo.add({"id": "1", "title": "còn xa", "due_date": due_in(20)})
+        self.start()
+        self.root.run_due()
+        self.assertEqual(self.notified, [])
+        self.repo.update(dict(self.repo.get("1").to_dict(), due_date=due_in(1)))
+        self.repo.add({"id": "2", "title": "mới thêm", "due_date": due_in(0)})
+        self.root.run_due()
+        self.assertEqual(self.notified, [[(0, "mới thêm"), (1, "còn xa")]])
+
+    def test_deleted_task_is_not_notified(self):
+        self.repo.add({"id": "1", "title": "sắp đến hạn", "due_date": due_in(1)})
+        self.start()
+        self.repo.delete("1")
+        self.root.run_due()
+        self.assertEqual(self.notified, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Kho công việc: ghi lỗi không làm mất thay đổi, xung đột giữa hai tiến trình, kết quả truy vấn sau khi sửa."""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from taskmanager.repository import TaskConflictError, TaskRepository
+from taskmanager.storage import create_storage
+
+STORAGE_MODES = ("json", "journal", "sqlite")
+
+def fail_next_commit(storage):
+    """Lần commit kế tiếp của `storage` báo OSError (như khi đĩa đầy); trả về Event được đặt khi lỗi xảy ra."""
+    commit = storage.commit
+    failed = threading.Event()
+
+    def fail(ops, tasks):
+        storage.commit = commit
+        failed.set()
+        raise OSError("đĩa đầy")
+    storage.commit = fail
+    return failed
+
+class RepositoryTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="taskrepo-")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def open(self, mode, commit_window_ms=0):
+        """Kho trên file dữ liệu riêng của kiểu lưu trữ `mode`; mở lại nhiều lần như nhiều tiến trình."""
+        data_file = os.path.join(self.work_dir, mode + ".json")
+        return TaskRepository(create_storage(mode, data_file), commit_window_ms=commit_window_ms)
+
+    def stored_titles(self, mode):
+        """Tiêu đề các công việc đang có trên đĩa, đọc bằng một kho mới (như một tiến trình khác)."""
+        return sorted(task["title"] for task in self.open(mode).all())
+
+    def test_failed_commit_keeps_changes(self):
+        for mode in STORAGE_MODES:
+            with self.subTest(mode=mode):
+                repo = self.open(mode)
+                fail_next_commit(repo.storage)
+                with self.assertRaises(OSError):
+                    repo.add({"id": "1", "title": "first"})
+                repo.add({"id": "2", "title": "second"}) # Lần ghi này ghi cả thay đổi bị lỗi trước đó
+                self.assertEqual(self.stored_titles(mode), ["first", "second"])
+
+    def test_background_commit_error_is_reported(self):
+        repo = self.open("journal", commit_window_ms=10)
+        failed = fail_next_commit(repo.storage)
+        repo.add({"id": "1", "title": "first"})
+        self.assertTrue(failed.wait(5))
+        error = None
+        for _ in range(500): # Lỗi được giữ ngay sau khi commit báo lỗi trên luồng hẹn giờ
+            try:
+                repo.check_external_changes()
+            except OSError as e:
+                error = e
+                break
+            time.sleep(0.01)
+        self.assertIsNotNone(error)
+        self.assertEqual(repo.check_external_changes(), []) # Chỉ báo một lần
+        repo.flush()
+        self.assertEqual(self.stored_titles("journal"), ["first"])
+
+    def test_stale_edit_raises_conflict(self):
+        for mode in STORAGE_MODES:
+            with self.subTest(mode=mode):
+                repo = self.open(mode)
+                repo.add({"id": "1", "title": "gốc"})
+                task = repo.get("1").to_dict() # Đọc ra để sửa (kèm rev)
+                other = self.open(mode)
+                other.update(dict(other.get("1").to_dict(), title="sửa ở nơi khác"))
+                with self.assertRaises(TaskConflictError):
+                    repo.update(dict(task, title="sửa ở đây"))
+                self.assertEqual(repo.get("1")["title"], "sửa ở nơi khác")
+
+    def test_concurrent_commit_conflict_is_reported(self):
+        for mode in STORAGE_MODES:
+            with self.subTest(mode=mode):
+                repo = self.open(mode, commit_window_ms=60000) # Thay đổi còn chờ ghi khi tiến trình khác ghi
+                repo.add({"id": "1", "title": "gốc"})
+                repo.flush()
+                repo.update(dict(repo.get("1").to_dict(), title="sửa ở đây"))
+                other = self.open(mode)
+                other.update(dict(other.get("1").to_dict(), title="sửa ở nơi khác"))
+                repo.flush()
+                self.assertEqual(repo.check_external_changes(), ["1"])
+                self.assertEqual(repo.get("1")["title"], "sửa ở nơi khác") # Bản trên đĩa được giữ
+                self.assertEqual(self.stored_titles(mode), ["sửa ở nơi khác"])
+
+    def test_query_sees_changes(self):
+        repo = self.open("json")
+        repo.add_many([{"id": "1", "title": "mua sữa"}, {"id": "2", "title": "mua bánh"}])
+        self.assertEqual([task.id for task in repo.query("sữa")], ["1"])
+        self.assertEqual([task.id for task in repo.query("sua")], ["1"]) # Không dấu
+        repo.update(dict(repo.get("2").to_dict(), title="mua sữa chua"))
+        self.assertEqual(sorted(task.id for task in repo.query("sua")), ["1", "2"])
+        self.assertEqual([task.id for task in repo.query("sua chua")], ["2"]) # Thu hẹp kết quả đã có
+        repo.delete("1")
+        self.assertEqual([task.id for task in repo.query("sua")], ["2"])
+
+if __name__ == "__main__":
+    unittest.main()
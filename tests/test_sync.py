@@ -0,0 +1,110 @@
+"""Đồng bộ API với một máy chủ HTTP giả chạy cục bộ: phân trang, ETag/304 và áp dụng tăng dần."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from taskmanager.config import API_PAGE_SIZE
+from taskmanager.repository import TaskRepository
+from taskmanager.storage import create_storage
+from taskmanager.sync import apply_api_sync, sync_api_tasks
+from taskmanager.transfer import iter_json_array
+
+ITEM_COUNT = 2 * API_PAGE_SIZE + 20 # Ba trang, trang cuối thiếu
+
+class TodosHandler(BaseHTTPRequestHandler):
+    """GET /todos?_start=&_limit= như jsonplaceholder, có ETag và trả 304 khi If-None-Match khớp."""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        start, limit = int(query["_start"][0]), int(query["_limit"][0])
+        body = json.dumps(self.server.items[start:start + limit]).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.server.requests.append((start, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), TodosHandler)
+        self.server.items = [{"userId": 1, "id": i, "title": f"todo {i}", "completed": False}
+                             for i in range(1, ITEM_COUNT + 1)]
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/todos"
+        self.work_dir = tempfile.mkdtemp(prefix="tasksync-")
+        self.state_path = os.path.join(self.work_dir, "api_sync.json")
+        self.repo = TaskRepository(create_storage("json", os.path.join(self.work_dir, "tasks.json")),
+                                   commit_window_ms=0)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def sync(self):
+        self.server.requests.clear()
+        result = sync_api_tasks(threading.Event(), lambda text: None, url=self.url, state_path=self.state_path)
+        return result, apply_api_sync(result, self.repo, state_path=self.state_path)
+
+    def test_first_sync_reads_every_page(self):
+        result, (added, updated) = self.sync()
+        self.assertEqual([start for start, _ in self.server.requests], [0, API_PAGE_SIZE, 2 * API_PAGE_SIZE])
+        self.assertEqual((added, updated), (3, 0)) # Chỉ các mục 1-3 được biến thành công việc
+        self.assertEqual(len(self.repo.all()), 3)
+
+    def test_unchanged_pages_are_conditional(self):
+        self.sync()
+        result, (added, updated) = self.sync()
+        self.assertTrue(all(etag for _, etag in self.server.requests)) # Mọi trang đều gửi If-None-Match
+        self.assertEqual(result["changes"], [])
+        self.assertEqual((added, updated), (0, 0))
+        self.assertEqual(len(self.repo.all()), 3)
+
+    def test_changed_item_updates_same_task(self):
+        self.sync()
+        task_ids = {task["title"]: task["id"] for task in self.repo.all()}
+        self.server.items[1]["completed"] = True # Mục 2 đổi: chỉ trang đầu không còn khớp ETag
+        result, (added, updated) = self.sync()
+        self.assertEqual([remote_id for remote_id, _, _ in result["changes"]], ["2"])
+        self.assertEqual((added, updated), (0, 1))
+        self.assertEqual({task["title"]: task["id"] for task in self.repo.all()}, task_ids)
+
+class IterJsonArrayTest(unittest.TestCase):
+    """Phản hồi API được đọc theo từng khối: phần tử bị cắt ở bất kỳ đâu vẫn phải được ghép đúng."""
+
+    def test_number_split_after_dot(self):
+        chunks = [b'[', b'1', b',', b' ', b'2', b'.', b'5', b']']
+        self.assertEqual(list(iter_json_array(chunks)), [1, 2.5])
+
+    def test_every_chunk_size(self):
+        text = '[1, 2.5e-3, -0.75, 1E+2, "\u00e9 \\"x\\"", true, null, {"a": [1, 2]}, "đã xong"]'
+        raw = text.encode("utf-8")
+        for size in range(1, 8):
+            with self.subTest(size=size):
+                chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+                self.assertEqual(list(iter_json_array(chunks)), json.loads(text))
+
+    def test_truncated_array(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array([b'[1, 2', b'.5']))
+
+if __name__ == "__main__":
+    unittest.main()